@@ -1,5 +1,14 @@
+import secrets
+
+from fastapi import Depends, Header, HTTPException, status
+
 from app.auth.oauth_manager import OAuthManager
-from app.config.settings import get_settings
+from app.config.settings import (
+    Settings,
+    get_settings,
+    subscribe_settings,
+    unsubscribe_settings,
+)
 
 _oauth_manager: OAuthManager | None = None
 
@@ -8,4 +17,34 @@ def get_oauth_manager() -> OAuthManager:
     global _oauth_manager
     if _oauth_manager is None:
         _oauth_manager = OAuthManager(get_settings())
+        subscribe_settings(_oauth_manager.on_settings_reload)
     return _oauth_manager
+
+
+async def close_oauth_manager() -> None:
+    global _oauth_manager
+    if _oauth_manager is not None:
+        unsubscribe_settings(_oauth_manager.on_settings_reload)
+        await _oauth_manager.aclose()
+        _oauth_manager = None
+
+
+def require_admin(
+    settings: Settings = Depends(get_settings),
+    x_admin_token: str | None = Header(default=None),
+) -> bool:
+    """
+    Guard for operational endpoints. Disabled unless ADMIN_TOKEN is set.
+    """
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled",
+        )
+    # Bytes: compare_digest rejects non-ASCII str (header values are latin-1).
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token",
+        )
+    return True
@@ -31,11 +31,22 @@ class TokenResponse(BaseModel):
     scope: Optional[str] = None
 
 
+class TokenKeyHealth(BaseModel):
+    token_url: str
+    client_id: str
+    username: str
+    scope: Optional[str] = None
+    expires_at: datetime
+    expires_in_seconds: int
+    expires_soon: bool
+
+
 class TokenHealth(BaseModel):
     token_present: bool
     expires_at: Optional[datetime]
     expires_in_seconds: Optional[int]
     expires_soon: bool
+    entries: list[TokenKeyHealth] = Field(default_factory=list)
 
 
 class TokenDecodeRequest(BaseModel):
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-import httpx
 from fastapi import HTTPException
 
 from app.auth.models import (
@@ -13,19 +14,40 @@ from app.auth.models import (
     TokenCache,
     TokenResponse,
     TokenHealth,
+    TokenKeyHealth,
 )
+from app.auth.token_cache import TokenKey
+from app.auth.token_store import build_token_store
 from app.config.settings import Settings
+from app.utils.http_clients import OPENEMR, get_http_clients
+
+logger = logging.getLogger("auth.oauth")
+
+# Delay before retrying a failed background refresh while the
+# current token is still usable.
+REFRESH_RETRY_SECONDS = 15
 
 
 class OAuthManager:
     """
     Manages SYSTEM OAuth tokens using OpenEMR's OAuth2 Password Grant.
     SMART / FHIR authorization flows are intentionally NOT implemented yet.
+
+    Tokens are cached per client identity (token_url, client_id, username,
+    scope) in a bounded token store, renewed in the background
+    ``expires_soon_seconds`` before they expire, and concurrent issuance
+    requests for one identity share a single in-flight fetch. With a
+    shared store (``TOKEN_STORE_BACKEND=sqlite``) refreshes are also
+    serialised across worker processes.
     """
 
     def __init__(self, settings: Settings):
         self.settings = settings
-        self._cache: Optional[TokenCache] = None
+        self._cache = build_token_store(settings, on_evict=self._forget)
+        self._credentials: dict[TokenKey, OAuthCredentials] = {}
+        self._inflight: dict[TokenKey, tuple[OAuthCredentials, asyncio.Task]] = {}
+        self._refresh_tasks: dict[TokenKey, asyncio.Task] = {}
+        self._system_key: Optional[TokenKey] = None
 
     # ------------------------------------------------------------------
     # PUBLIC API
@@ -70,6 +92,15 @@ class OAuthManager:
             password=self.settings.oauth_password,
             scope=self.settings.oauth_scope,
         )
+        key = TokenKey.from_credentials(creds)
+        self._system_key = key
+
+        cached = self._cache.get(key)
+        known = self._credentials.get(key)
+        if cached is not None and known in (None, creds) and self._is_fresh(cached):
+            # May have been issued by another worker sharing the store.
+            self._adopt(key, creds, cached)
+            return self._to_response(cached)
 
         return await self._issue_token(creds)
 
@@ -79,74 +110,279 @@ class OAuthManager:
         Allows issuing a token using credentials supplied in the request body.
         SHOULD NOT be enabled in production UIs.
         """
-        return await self._issue_token(request)
+        return await self._issue_token(request, adopt=False)
 
-    async def get_token(self) -> TokenResponse:
+    async def get_token(self, key: Optional[TokenKey] = None) -> TokenResponse:
         """
         Return cached token if valid.
+        Defaults to the system (env) identity, else the most recently used one.
+        Refreshes first when the token is expired or about to expire and
+        the credentials that issued it are known.
         """
-        if not self._cache:
+        key = key or self._default_key()
+        creds = self._credentials.get(key) if key is not None else None
+        cached = self._cache.get(key) if key is not None else None
+
+        if cached is None and creds is None:
             raise HTTPException(status_code=404, detail="No token cached")
 
-        if self._cache.expires_at <= datetime.now(tz=timezone.utc):
+        if cached is not None and self._is_fresh(cached):
+            return self._to_response(cached)
+
+        if creds is not None:
+            try:
+                return await self._issue_token(creds)
+            except HTTPException:
+                if cached is None or self._is_expired(cached):
+                    raise
+                # Refresh failed but the current token is still usable.
+                return self._to_response(cached)
+
+        if cached is None or self._is_expired(cached):
             raise HTTPException(status_code=401, detail="Cached token expired")
 
-        return self._to_response()
+        return self._to_response(cached)
 
     def token_health(self) -> TokenHealth:
         """
         Lightweight token health view.
         Safe to call even when no token exists.
+        Top-level fields describe the default identity; ``entries`` lists
+        every cached identity.
         """
-        if not self._cache:
+        now = datetime.now(tz=timezone.utc)
+        entries = []
+        for key, cached in self._cache.items():
+            remaining = int((cached.expires_at - now).total_seconds())
+            entries.append(
+                TokenKeyHealth(
+                    token_url=key.token_url,
+                    client_id=key.client_id,
+                    username=key.username,
+                    scope=key.scope,
+                    expires_at=cached.expires_at,
+                    expires_in_seconds=remaining,
+                    expires_soon=remaining < self.settings.expires_soon_seconds,
+                )
+            )
+
+        key = self._default_key()
+        cached = self._cache.get(key, touch=False) if key is not None else None
+        if not cached:
             return TokenHealth(
                 token_present=False,
                 expires_at=None,
                 expires_in_seconds=None,
                 expires_soon=False,
+                entries=entries,
             )
 
-        now = datetime.now(tz=timezone.utc)
-        remaining = int((self._cache.expires_at - now).total_seconds())
+        remaining = int((cached.expires_at - now).total_seconds())
 
         return TokenHealth(
             token_present=True,
-            expires_at=self._cache.expires_at,
+            expires_at=cached.expires_at,
             expires_in_seconds=remaining,
             expires_soon=remaining < self.settings.expires_soon_seconds,
+            entries=entries,
         )
 
+    def on_settings_reload(self, settings: Settings) -> None:
+        """
+        Adopt a reloaded settings snapshot.
+        Cached tokens are kept; a changed env identity is picked up on the
+        next issuance. Store backend changes take effect on restart.
+        """
+        self.settings = settings
+        self._cache.max_entries = settings.token_cache_max_entries
+
+    async def aclose(self) -> None:
+        """
+        Cancel background refreshes and any in-flight fetches.
+        """
+        tasks = list(self._refresh_tasks.values())
+        tasks += [task for _, task in self._inflight.values()]
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        self._refresh_tasks.clear()
+        self._inflight.clear()
+        self._cache.close()
+
     # ------------------------------------------------------------------
     # INTERNALS
     # ------------------------------------------------------------------
 
-    async def _issue_token(self, creds: OAuthCredentials) -> TokenResponse:
+    def _default_key(self) -> Optional[TokenKey]:
+        if self._system_key is not None and (
+            self._system_key in self._cache or self._system_key in self._credentials
+        ):
+            return self._system_key
+        return self._cache.most_recent()
+
+    @staticmethod
+    def _is_expired(cached: TokenCache) -> bool:
+        return cached.expires_at <= datetime.now(tz=timezone.utc)
+
+    def _is_fresh(self, cached: TokenCache) -> bool:
         """
-        Core issuance logic shared by env + manual paths.
+        True when the token is outside the refresh window.
+        """
+        remaining = (cached.expires_at - datetime.now(tz=timezone.utc)).total_seconds()
+        return remaining > self.settings.expires_soon_seconds
+
+    def _forget(self, key: TokenKey) -> None:
+        """
+        Drop per-key state once an identity is evicted from the cache.
         """
-        data = await self._fetch_token(creds)
+        self._credentials.pop(key, None)
+        task = self._refresh_tasks.pop(key, None)
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
 
+    def _prune_credentials(self) -> None:
+        """
+        Credentials outlive their token's expiry so ``get_token`` can
+        re-issue it; forget the oldest expired identities beyond the cache
+        size so they do not pile up.
+        """
+        excess = len(self._credentials) - self.settings.token_cache_max_entries
+        if excess <= 0:
+            return
+        stale = [key for key in self._credentials if key not in self._cache]
+        for key in stale[:excess]:
+            self._forget(key)
+
+    async def _issue_token(
+        self,
+        creds: OAuthCredentials,
+        adopt: bool = True,
+    ) -> TokenResponse:
+        """
+        Single-flight wrapper around token issuance.
+        Concurrent callers with the same credentials await one fetch.
+        """
+        key = TokenKey.from_credentials(creds)
+        inflight = self._inflight.get(key)
+        if inflight is None or inflight[1].done() or inflight[0] != creds:
+            inflight = (creds, asyncio.create_task(self._refresh(key, creds, adopt)))
+            self._inflight[key] = inflight
+
+        # Shield so one cancelled caller does not abort the shared fetch.
+        return await asyncio.shield(inflight[1])
+
+    async def _refresh(
+        self,
+        key: TokenKey,
+        creds: OAuthCredentials,
+        adopt: bool = True,
+    ) -> TokenResponse:
+        """
+        Core issuance logic shared by env + manual paths.
+        """
+        try:
+            async with self._cache.refresh_lock(key):
+                # Another worker may have refreshed while we waited.
+                cached = self._cache.get(key, touch=False)
+                if adopt and cached is not None and self._is_fresh(cached):
+                    self._adopt(key, creds, cached)
+                    return self._to_response(cached)
+
+                data = await self._fetch_token(creds)
+                cached = self._store(key, data)
+        finally:
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight[1] is asyncio.current_task():
+                del self._inflight[key]
+
+        self._adopt(key, creds, cached)
+        return self._to_response(cached)
+
+    def _store(self, key: TokenKey, data: dict) -> TokenCache:
         expires_in = int(data.get("expires_in", 0))
         expires_at = datetime.now(tz=timezone.utc) + timedelta(seconds=expires_in)
 
-        self._cache = TokenCache(
+        cached = TokenCache(
             access_token=data["access_token"],
             token_type=data.get("token_type", "bearer"),
             expires_at=expires_at,
             scope=data.get("scope"),
             raw_response=data,
         )
+        self._cache.put(key, cached)
+        return cached
+
+    def _adopt(self, key: TokenKey, creds: OAuthCredentials, cached: TokenCache) -> None:
+        """
+        Remember the credentials for a cached identity and arm its refresh.
+        """
+        if key not in self._cache:
+            return
+        self._credentials[key] = creds
+        self._prune_credentials()
+        task = self._refresh_tasks.get(key)
+        if task is None or task.done() or task is asyncio.current_task():
+            self._schedule_refresh(key, cached)
+
+    def _schedule_refresh(
+        self,
+        key: TokenKey,
+        cached: TokenCache,
+        delay: Optional[float] = None,
+    ) -> None:
+        """
+        (Re)arm the background task that renews a token ahead of expiry.
+        """
+        task = self._refresh_tasks.get(key)
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+
+        if delay is None:
+            remaining = (cached.expires_at - datetime.now(tz=timezone.utc)).total_seconds()
+            delay = remaining - self.settings.expires_soon_seconds
+            if delay <= 0:
+                # Token lifetime is shorter than the refresh window;
+                # refresh at the halfway point instead of spinning.
+                delay = max(remaining / 2, 1)
+
+        self._refresh_tasks[key] = asyncio.create_task(self._refresh_later(key, delay))
 
-        return self._to_response()
+    async def _refresh_later(self, key: TokenKey, delay: float) -> None:
+        await asyncio.sleep(delay)
 
-    def _to_response(self) -> TokenResponse:
-        assert self._cache is not None
+        creds = self._credentials.get(key)
+        if creds is None:
+            return
 
+        # Identities nobody has asked for recently are left to expire
+        # and fall out of the cache instead of being renewed forever.
+        if self._cache.idle_seconds(key) > self.settings.token_cache_idle_seconds:
+            return
+
+        try:
+            await self._issue_token(creds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Background token refresh failed for %s: %r", key.client_id, e)
+            cached = self._cache.get(key, touch=False)
+            if cached is not None:
+                self._schedule_refresh(key, cached, REFRESH_RETRY_SECONDS)
+            return
+
+        # The issuing task's ``_adopt`` saw this task still pending and left
+        # the schedule alone: arm the next refresh here.
+        cached = self._cache.get(key, touch=False)
+        if cached is not None and key in self._credentials:
+            self._schedule_refresh(key, cached)
+
+    @staticmethod
+    def _to_response(cached: TokenCache) -> TokenResponse:
         return TokenResponse(
-            access_token=self._cache.access_token,
-            token_type=self._cache.token_type,
-            expires_at=self._cache.expires_at,
-            scope=self._cache.scope,
+            access_token=cached.access_token,
+            token_type=cached.token_type,
+            expires_at=cached.expires_at,
+            scope=cached.scope,
         )
 
     async def _fetch_token(self, creds: OAuthCredentials) -> dict:
@@ -167,12 +403,12 @@ class OAuthManager:
         if creds.scope:
             payload["scope"] = creds.scope
 
-        async with httpx.AsyncClient(timeout=15) as client:
-            response = await client.post(
-                creds.token_url,
-                data=payload,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
+        client = get_http_clients().get(OPENEMR)
+        response = await client.post(
+            creds.token_url,
+            data=payload,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
 
         if response.status_code != 200:
             raise HTTPException(
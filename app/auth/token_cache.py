@@ -0,0 +1,155 @@
+"""
+Token stores: OAuth tokens keyed by client identity.
+
+``TokenCacheStore`` (in-process LRU) is the default. Shared backends for
+multi-worker deployments live in ``app.auth.token_store``.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Iterator, NamedTuple, Optional
+
+from app.auth.models import OAuthCredentials, TokenCache
+
+
+class TokenKey(NamedTuple):
+    token_url: str
+    client_id: str
+    username: str
+    scope: Optional[str]
+
+    @classmethod
+    def from_credentials(cls, creds: OAuthCredentials) -> "TokenKey":
+        return cls(
+            token_url=creds.token_url,
+            client_id=creds.client_id,
+            username=creds.username,
+            scope=creds.scope,
+        )
+
+
+class TokenStore(ABC):
+    """
+    Interface shared by token store backends.
+
+    ``refresh_lock`` serialises token refreshes for one identity. For the
+    in-process store it is an asyncio lock; shared stores extend it across
+    worker processes so exactly one worker logs in per refresh.
+    """
+
+    def __init__(self) -> None:
+        self._refresh_locks: dict[TokenKey, asyncio.Lock] = {}
+
+    @abstractmethod
+    def get(self, key: TokenKey, touch: bool = True) -> Optional[TokenCache]:
+        ...
+
+    @abstractmethod
+    def put(self, key: TokenKey, entry: TokenCache) -> None:
+        ...
+
+    @abstractmethod
+    def idle_seconds(self, key: TokenKey) -> float:
+        ...
+
+    @abstractmethod
+    def most_recent(self) -> Optional[TokenKey]:
+        ...
+
+    @abstractmethod
+    def items(self) -> Iterator[tuple[TokenKey, TokenCache]]:
+        ...
+
+    @abstractmethod
+    def __contains__(self, key: object) -> bool:
+        ...
+
+    @asynccontextmanager
+    async def refresh_lock(self, key: TokenKey) -> AsyncIterator[None]:
+        lock = self._refresh_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            yield
+
+    def close(self) -> None:
+        pass
+
+
+class TokenCacheStore(TokenStore):
+    """
+    LRU map of TokenKey -> TokenCache.
+
+    - Holds at most ``max_entries`` identities; the least recently used
+      one is evicted when a new identity is added.
+    - Entries whose token has expired are dropped on access (TTL).
+    - ``on_evict`` is called with the key of every entry evicted for
+      capacity so the owner can drop per-key state (credentials, refresh
+      tasks). Expiry does not call it: the owner still needs the
+      credentials to re-issue the token.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        on_evict: Optional[Callable[[TokenKey], None]] = None,
+    ):
+        super().__init__()
+        self.max_entries = max_entries
+        self._on_evict = on_evict
+        self._entries: OrderedDict[TokenKey, TokenCache] = OrderedDict()
+        self._last_used: dict[TokenKey, float] = {}
+
+    def get(self, key: TokenKey, touch: bool = True) -> Optional[TokenCache]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if entry.expires_at <= datetime.now(tz=timezone.utc):
+            self._drop(key)
+            return None
+
+        if touch:
+            self._entries.move_to_end(key)
+            self._last_used[key] = time.monotonic()
+        return entry
+
+    def put(self, key: TokenKey, entry: TokenCache) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._last_used.setdefault(key, time.monotonic())
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+
+    def idle_seconds(self, key: TokenKey) -> float:
+        last_used = self._last_used.get(key)
+        if last_used is None:
+            return 0.0
+        return time.monotonic() - last_used
+
+    def most_recent(self) -> Optional[TokenKey]:
+        return next(reversed(self._entries), None)
+
+    def items(self) -> Iterator[tuple[TokenKey, TokenCache]]:
+        return iter(list(self._entries.items()))
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: TokenKey) -> None:
+        self._entries.pop(key, None)
+        self._last_used.pop(key, None)
+        self._refresh_locks.pop(key, None)
+
+    def _evict(self, key: TokenKey) -> None:
+        self._drop(key)
+        if self._on_evict is not None:
+            self._on_evict(key)
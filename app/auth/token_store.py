@@ -0,0 +1,252 @@
+"""
+Shared token store for multi-process deployments.
+
+With ``uvicorn --workers N`` every worker has its own ``OAuthManager``.
+``SQLiteTokenStore`` keeps tokens in one SQLite file that all workers read,
+and guards refreshes with a per-identity advisory file lock (``flock``) so
+exactly one worker logs in to OpenEMR while the others wait and then pick
+up the new token.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+from app.auth.models import TokenCache
+from app.auth.token_cache import TokenCacheStore, TokenKey, TokenStore
+from app.config.settings import Settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    key_hash     TEXT PRIMARY KEY,
+    token_url    TEXT NOT NULL,
+    client_id    TEXT NOT NULL,
+    username     TEXT NOT NULL,
+    scope        TEXT,
+    token        TEXT NOT NULL,
+    expires_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_updated_at ON tokens (updated_at);
+"""
+
+
+def _key_hash(key: TokenKey) -> str:
+    return hashlib.sha256(json.dumps(list(key)).encode("utf-8")).hexdigest()
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Token store backed by a SQLite file shared between worker processes.
+
+    - Reads always go to the database so every worker sees the latest token.
+    - Eviction keeps the ``max_entries`` most recently issued identities;
+      idle tracking (which stops background refresh) is per worker.
+    - Client secrets are never written; only issued tokens are. Tokens are
+      stored as-is, so the database, its -wal/-shm files and the lock
+      directory are created owner-only.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        on_evict: Optional[Callable[[TokenKey], None]] = None,
+    ):
+        if fcntl is None:
+            raise RuntimeError("The sqlite token store requires a POSIX platform (fcntl)")
+
+        super().__init__()
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._on_evict = on_evict
+        self._last_used: dict[TokenKey, float] = {}
+        self._lock_dir = self.path.parent / f"{self.path.name}.locks"
+        self._db_lock = threading.Lock()
+
+        self._lock_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        os.chmod(self._lock_dir, 0o700)
+        # SQLite would create -wal/-shm with the process umask; create them
+        # first (empty files are valid) and tighten pre-existing ones.
+        for suffix in ("", "-wal", "-shm"):
+            file_path = f"{self.path}{suffix}"
+            os.close(os.open(file_path, os.O_WRONLY | os.O_CREAT, 0o600))
+            os.chmod(file_path, 0o600)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, key: TokenKey, touch: bool = True) -> Optional[TokenCache]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT token, expires_at FROM tokens WHERE key_hash = ?",
+                (_key_hash(key),),
+            ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if row[1] <= now:
+            # Expired, not evicted: the owner keeps the credentials to re-issue.
+            # Re-check expiry so a token another worker just stored survives.
+            with self._db_lock:
+                self._conn.execute(
+                    "DELETE FROM tokens WHERE key_hash = ? AND expires_at <= ?",
+                    (_key_hash(key), now),
+                )
+            self._last_used.pop(key, None)
+            return None
+
+        if touch:
+            self._last_used[key] = time.monotonic()
+        return TokenCache.model_validate_json(row[0])
+
+    def put(self, key: TokenKey, entry: TokenCache) -> None:
+        now = time.time()
+        self._last_used.setdefault(key, time.monotonic())
+
+        with self._db_lock:
+            self._conn.execute(
+                """
+                INSERT INTO tokens
+                    (key_hash, token_url, client_id, username, scope, token, expires_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key_hash) DO UPDATE SET
+                    token = excluded.token,
+                    expires_at = excluded.expires_at,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    _key_hash(key),
+                    key.token_url,
+                    key.client_id,
+                    key.username,
+                    key.scope,
+                    entry.model_dump_json(),
+                    entry.expires_at.timestamp(),
+                    now,
+                ),
+            )
+            self._conn.execute("DELETE FROM tokens WHERE expires_at <= ?", (now,))
+            evicted = self._conn.execute(
+                """
+                SELECT token_url, client_id, username, scope FROM tokens
+                WHERE key_hash NOT IN (
+                    SELECT key_hash FROM tokens ORDER BY updated_at DESC LIMIT ?
+                )
+                """,
+                (self.max_entries,),
+            ).fetchall()
+
+        for row in evicted:
+            self._evict(TokenKey(*row))
+
+    def idle_seconds(self, key: TokenKey) -> float:
+        last_used = self._last_used.get(key)
+        if last_used is None:
+            return 0.0
+        return time.monotonic() - last_used
+
+    def most_recent(self) -> Optional[TokenKey]:
+        with self._db_lock:
+            row = self._conn.execute(
+                """
+                SELECT token_url, client_id, username, scope FROM tokens
+                WHERE expires_at > ?
+                ORDER BY updated_at DESC LIMIT 1
+                """,
+                (time.time(),),
+            ).fetchone()
+        return TokenKey(*row) if row else None
+
+    def items(self) -> Iterator[tuple[TokenKey, TokenCache]]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                """
+                SELECT token_url, client_id, username, scope, token FROM tokens
+                WHERE expires_at > ?
+                ORDER BY updated_at
+                """,
+                (time.time(),),
+            ).fetchall()
+        return iter(
+            [(TokenKey(*row[:4]), TokenCache.model_validate_json(row[4])) for row in rows]
+        )
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, TokenKey):
+            return False
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM tokens WHERE key_hash = ? AND expires_at > ?",
+                (_key_hash(key), time.time()),
+            ).fetchone()
+        return row is not None
+
+    @asynccontextmanager
+    async def refresh_lock(self, key: TokenKey) -> AsyncIterator[None]:
+        # In-process lock first so only one coroutine per worker holds a
+        # thread blocked on the cross-process file lock.
+        async with super().refresh_lock(key):
+            lock_path = self._lock_dir / f"{_key_hash(key)}.lock"
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._conn.close()
+
+    def _delete(self, key: TokenKey) -> None:
+        with self._db_lock:
+            self._conn.execute("DELETE FROM tokens WHERE key_hash = ?", (_key_hash(key),))
+        self._last_used.pop(key, None)
+
+    def _evict(self, key: TokenKey) -> None:
+        self._delete(key)
+        if self._on_evict is not None:
+            self._on_evict(key)
+
+
+def build_token_store(
+    settings: Settings,
+    on_evict: Optional[Callable[[TokenKey], None]] = None,
+) -> TokenStore:
+    backend = settings.token_store_backend.lower()
+
+    if backend == "memory":
+        return TokenCacheStore(
+            max_entries=settings.token_cache_max_entries,
+            on_evict=on_evict,
+        )
+
+    if backend == "sqlite":
+        Path(settings.token_store_path).parent.mkdir(parents=True, exist_ok=True)
+        return SQLiteTokenStore(
+            path=settings.token_store_path,
+            max_entries=settings.token_cache_max_entries,
+            on_evict=on_evict,
+        )
+
+    raise ValueError(f"Unknown TOKEN_STORE_BACKEND: {settings.token_store_backend}")
@@ -1,6 +1,14 @@
-from pydantic import Field
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+from pydantic import Field, ValidationError
 from pydantic_settings import BaseSettings
 
+logger = logging.getLogger("config.settings")
+
 
 class Settings(BaseSettings):
     # ---- Core ----
@@ -8,6 +16,38 @@ class Settings(BaseSettings):
     environment: str = "local"
     auth_mode: str = "system"
 
+    # ---- Admin ----
+    # Shared secret for admin endpoints (X-Admin-Token). Unset = disabled.
+    admin_token: str | None = None
+    # How often get_settings() checks .env for changes. 0 disables.
+    env_watch_interval_seconds: float = Field(default=5.0, ge=0)
+
+    # ---- Logging ----
+    log_level: str = "INFO"
+    # "json" (one object per line) or "text".
+    log_format: str = "json"
+    # Records waiting for the writer thread; when full, new records are dropped.
+    log_queue_size: int = Field(default=10000, ge=1)
+    # Fraction of DEBUG/INFO records kept per logger prefix, e.g. {"pd.mirth": 0.1}.
+    # WARNING and above are never sampled.
+    log_sample_rates: dict[str, float] = Field(default_factory=dict)
+    # Longer string fields (and messages) are truncated.
+    log_max_field_chars: int = Field(default=1024, ge=16)
+    # Extra fields replaced with "[REDACTED]", at any nesting depth.
+    log_redact_fields: list[str] = Field(default_factory=lambda: [
+        "password", "client_secret", "access_token", "refresh_token", "authorization",
+        "patient_reference", "demographics", "first_name", "last_name", "dob", "payload",
+    ])
+
+    # ---- Request profiling (admin only) ----
+    # Captured profiles are kept in a ring of the newest profile_max_files.
+    profile_dir: str = "./data/profiles"
+    profile_max_files: int = Field(default=50, ge=1)
+    # Stack sampling interval for the collapsed-stack (flamegraph) output.
+    profile_sample_interval_seconds: float = Field(default=0.005, gt=0)
+    # Upper bound for POST /api/profiling/arm windows.
+    profile_max_arm_seconds: float = Field(default=900.0, gt=0)
+
     # ---- OAuth (Phase 1 – owned by FastAPI, not Mirth) ----
     oauth_token_url: str | None = None
     oauth_client_id: str | None = None
@@ -17,10 +57,100 @@ class Settings(BaseSettings):
     oauth_scope: str | None = None
 
     expires_soon_seconds: int = Field(default=120, ge=30)
+    token_cache_max_entries: int = Field(default=32, ge=1)
+    # Identities unused for this long stop being refreshed in the background.
+    token_cache_idle_seconds: int = Field(default=3600, ge=0)
+    # "memory" (per process) or "sqlite" (shared by all workers on the host).
+    token_store_backend: str = "memory"
+    token_store_path: str = "./data/auth/tokens.sqlite3"
+
+    # ---- Upstream HTTP connection pools ----
+    http_max_connections: int = Field(default=100, ge=1)
+    http_max_keepalive_connections: int = Field(default=20, ge=0)
+    http_keepalive_expiry_seconds: float = Field(default=30.0, ge=0)
+    http2_enabled: bool = False
+    openemr_timeout_seconds: float = Field(default=15.0, gt=0)
+    mirth_timeout_seconds: float = Field(default=10.0, gt=0)
+    # Fail fast when Mirth is unreachable instead of waiting the full timeout.
+    mirth_connect_timeout_seconds: float = Field(default=3.0, gt=0)
+
+    # ---- Mirth dispatch (retries / circuit breaker / concurrency) ----
+    mirth_max_attempts: int = Field(default=3, ge=1)
+    mirth_retry_base_seconds: float = Field(default=0.25, ge=0)
+    mirth_retry_max_seconds: float = Field(default=5.0, ge=0)
+    # Upper bound on the whole dispatch, retries included.
+    mirth_dispatch_deadline_seconds: float = Field(default=20.0, gt=0)
+    mirth_breaker_failure_threshold: int = Field(default=5, ge=1)
+    mirth_breaker_reset_seconds: float = Field(default=30.0, gt=0)
+    mirth_max_in_flight: int = Field(default=20, ge=1)
+    # How long a trigger waits for a free Mirth slot before failing fast.
+    mirth_acquire_timeout_seconds: float = Field(default=2.0, ge=0)
 
     # ---- Patient Discovery ----
     pd_endpoint_url: str | None = None
     pd_storage_dir: str = "./data/pd"
+    # "sqlite" (pd.sqlite3 inside pd_storage_dir) or "json" (legacy files).
+    pd_storage_backend: str = "sqlite"
+    # Background writer: max queued operations / operations per commit.
+    pd_write_queue_size: int = Field(default=10000, ge=1)
+    pd_write_batch_size: int = Field(default=256, ge=1)
+    # Callback bodies: hard size limit / in-memory threshold before spooling to disk.
+    pd_callback_max_bytes: int = Field(default=50 * 1024 * 1024, ge=1)
+    pd_callback_spool_bytes: int = Field(default=1024 * 1024, ge=0)
+    # Response payload blob store: "gzip", "lzma", "none" (uncompressed) or "off" (inline).
+    pd_blob_codec: str = "gzip"
+    pd_blob_compress_level: int = Field(default=6, ge=0, le=9)
+    # "sync" posts to Mirth inside the request; "async" queues the trigger
+    # durably (pd_storage_dir/outbound.sqlite3) for the dispatcher pool.
+    pd_trigger_mode: str = "sync"
+    # Identical patient_reference triggers join the in-flight one and reuse a
+    # successful result for this long (0 disables; "force": true bypasses).
+    pd_trigger_dedupe_ttl_seconds: float = Field(default=30.0, ge=0)
+    pd_trigger_cache_max_entries: int = Field(default=10000, ge=1)
+    pd_outbound_workers: int = Field(default=4, ge=1)
+    # Dispatch rounds per item before it is marked FORWARD_FAILED.
+    pd_outbound_max_attempts: int = Field(default=10, ge=1)
+    pd_outbound_retry_base_seconds: float = Field(default=2.0, ge=0)
+    pd_outbound_retry_max_seconds: float = Field(default=300.0, ge=0)
+    # Claimed items return to the queue if not finished within the lease.
+    pd_outbound_lease_seconds: float = Field(default=120.0, gt=0)
+    pd_outbound_poll_seconds: float = Field(default=5.0, gt=0)
+    # POST /api/pd/trigger/batch: max references per request / concurrent dispatches.
+    pd_batch_max_items: int = Field(default=50000, ge=1)
+    pd_batch_concurrency: int = Field(default=16, ge=1)
+    # Long-poll / SSE: max wait, storage re-check interval (callbacks handled
+    # by other workers), SSE keep-alive interval.
+    pd_wait_max_seconds: float = Field(default=60.0, gt=0)
+    pd_events_max_seconds: float = Field(default=600.0, gt=0)
+    pd_wait_storage_poll_seconds: float = Field(default=2.0, gt=0)
+    pd_events_heartbeat_seconds: float = Field(default=15.0, gt=0)
+    # Lifecycle latency: executions without a callback this long after the
+    # trigger are flagged; rolling percentiles cover the last window.
+    pd_callback_sla_seconds: float = Field(default=300.0, gt=0)
+    pd_lifecycle_window_seconds: float = Field(default=3600.0, gt=0)
+    pd_lifecycle_max_samples: int = Field(default=10000, ge=1)
+
+    # ---- Patient search ----
+    # Repeat searches (same normalized demographics) reuse the execution.
+    patient_search_dedupe_ttl_seconds: float = Field(default=300.0, ge=0)
+    patient_search_cache_max_entries: int = Field(default=10000, ge=1)
+    # POST /api/patient/search/bulk: upload limit (the roster is held in
+    # memory, never spooled to disk), rows validated per batch, concurrent
+    # searches.
+    patient_search_bulk_max_bytes: int = Field(default=32 * 1024 * 1024, ge=1)
+    patient_search_bulk_batch_size: int = Field(default=500, ge=1)
+    patient_search_bulk_concurrency: int = Field(default=16, ge=1)
+
+    # ---- PD artifacts (env=<environment>/YYYY/MM/DD partitions) ----
+    pd_artifact_dir: str = "./data/pd_artifacts"
+    # Days to keep per environment, e.g. {"prod": 365}; 0 keeps forever.
+    pd_artifact_retention_days: dict[str, int] = Field(default_factory=dict)
+    pd_artifact_default_retention_days: int = Field(default=90, ge=0)
+    # Partitions at least this many days old are compacted into a segment.
+    pd_artifact_compact_after_days: int = Field(default=1, ge=1)
+    pd_artifact_compress_segments: bool = True
+    # Seconds between maintenance passes. 0 disables the background job.
+    pd_artifact_maintenance_interval_seconds: float = Field(default=3600.0, ge=0)
 
     class Config:
         env_file = ".env"
@@ -28,5 +158,96 @@ class Settings(BaseSettings):
         extra = "ignore"
 
 
+# -------------------------------------------------------------------
+# Cached settings snapshot
+# -------------------------------------------------------------------
+# Settings are parsed once and shared. The snapshot is swapped atomically
+# when .env changes (checked at most every env_watch_interval_seconds)
+# or when reload_settings() is called explicitly. An invalid .env or
+# environment keeps the previous snapshot in service.
+
+_settings: Settings | None = None
+_env_mtime: float | None = None
+_last_check: float = 0.0
+_reload_lock = threading.Lock()
+_subscribers: list[Callable[[Settings], None]] = []
+
+
+def _read_env_mtime() -> float | None:
+    try:
+        return os.stat(Settings.Config.env_file).st_mtime
+    except OSError:
+        return None
+
+
 def get_settings() -> Settings:
-    return Settings()
+    global _last_check
+
+    settings = _settings
+    if settings is None:
+        return reload_settings()
+
+    interval = settings.env_watch_interval_seconds
+    now = time.monotonic()
+    if interval and now - _last_check >= interval:
+        _last_check = now
+        if _read_env_mtime() != _env_mtime:
+            try:
+                return reload_settings()
+            except ValidationError:
+                # Logged by reload_settings; retried once .env changes again.
+                pass
+
+    return settings
+
+
+def reload_settings() -> Settings:
+    """
+    Re-read environment + .env, swap the shared snapshot and notify
+    subscribers. Returns the new snapshot.
+
+    Raises ``ValidationError`` when the configuration is invalid; the
+    previous snapshot (if any) stays in place.
+    """
+    global _settings, _env_mtime, _last_check
+
+    with _reload_lock:
+        mtime = _read_env_mtime()
+        try:
+            settings = Settings()
+        except ValidationError as e:
+            if _settings is not None:
+                # Do not re-read the same broken file on every check.
+                _env_mtime, _last_check = mtime, time.monotonic()
+                logger.error(
+                    "Invalid settings, keeping the previous snapshot",
+                    extra={"errors": e.errors(include_url=False, include_input=False)},
+                )
+            raise
+        previous = _settings
+        _settings, _env_mtime, _last_check = settings, mtime, time.monotonic()
+        subscribers = list(_subscribers)
+
+    if previous is not None:
+        logger.info("Settings reloaded")
+        for callback in subscribers:
+            try:
+                callback(settings)
+            except Exception:
+                logger.exception("Settings reload subscriber failed")
+
+    return settings
+
+
+def subscribe_settings(callback: Callable[[Settings], None]) -> None:
+    """
+    Register a callback invoked with the new snapshot after each reload.
+    """
+    with _reload_lock:
+        _subscribers.append(callback)
+
+
+def unsubscribe_settings(callback: Callable[[Settings], None]) -> None:
+    with _reload_lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
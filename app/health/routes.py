@@ -1,9 +1,13 @@
 """System health endpoints."""
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime, timezone
+from pydantic import ValidationError
 
 from app.config.settings import Settings, get_settings
+from app.pd.dispatch import get_mirth_dispatcher
+from app.pd.outbound import async_trigger_enabled, get_outbound_dispatcher
+from app.pd.storage import get_storage_writer
 
 router = APIRouter(prefix="/api/health", tags=["health"])
 
@@ -22,9 +26,13 @@ def health_check(settings: Settings = Depends(get_settings)) -> dict:
         "status": "ok",
         "service": "interop-control-api",
         "environment": settings.environment,
+        "storage_queue_depth": get_storage_writer().depth,
+        "mirth": get_mirth_dispatcher().health(),
+        "outbound_queue_depth": get_outbound_dispatcher().depth() if async_trigger_enabled(settings) else None,
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
-from app.config.settings import get_settings
+from app.auth.dependencies import require_admin
+from app.config.settings import get_settings, reload_settings
 
 @router.get("/debug/settings")
 def debug_settings():
@@ -34,3 +42,23 @@ def debug_settings():
         "oauth_token_url": s.oauth_token_url,
         "pd_endpoint_url": s.pd_endpoint_url,
     }
+
+
+@router.post("/settings/reload")
+def reload_settings_endpoint(_: bool = Depends(require_admin)) -> dict:
+    """
+    Re-read environment + .env and swap the cached settings snapshot.
+    Invalid configuration is rejected with 422; the current snapshot stays.
+    """
+    try:
+        settings = reload_settings()
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=e.errors(include_url=False, include_input=False, include_context=False),
+        )
+    return {
+        "status": "reloaded",
+        "environment": settings.environment,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
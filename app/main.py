@@ -1,16 +1,55 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.auth.dependencies import close_oauth_manager
+from app.config.settings import get_settings
 from app.auth.token_routes import router as auth_router
 from app.health.routes import router as health_router
+from app.metrics.middleware import MetricsMiddleware
+from app.metrics.routes import router as metrics_router
 from app.pd.routes import router as pd_router
+from app.profiling.middleware import ProfilingMiddleware
+from app.profiling.routes import router as profiling_router
+from app.pd.outbound import async_trigger_enabled, close_outbound_dispatcher, get_outbound_dispatcher
+from app.pd.storage import close_execution_store, close_storage_writer, get_storage_writer
+from app.patient.bulk_routes import router as patient_bulk_router
 from app.patient.search_routes import router as patient_search_router
+from app.pd.trigger_routes import batch_router as pd_batch_router
 from app.pd.trigger_routes import router as pd_trigger_router
+from app.utils.http_clients import close_http_clients, get_http_clients
+from app.utils.log_pipeline import close_log_pipeline, get_log_pipeline
+from app.utils.pd_artifacts import close_artifact_maintenance, get_artifact_maintenance
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Queue-based logging: records are written by a background thread.
+    get_log_pipeline().start()
+    # Pooled upstream clients live for the whole application lifetime.
+    get_http_clients()
+    get_storage_writer().start()
+    # Retention + compaction of PD artifact partitions.
+    get_artifact_maintenance().start()
+    # Async trigger mode: resume queued Mirth dispatches from the last run.
+    if async_trigger_enabled(get_settings()):
+        get_outbound_dispatcher().start()
+    yield
+    await close_outbound_dispatcher()
+    await close_artifact_maintenance()
+    await close_oauth_manager()
+    await close_http_clients()
+    # Flush queued PD writes before the store is closed.
+    await close_storage_writer()
+    close_execution_store()
+    close_log_pipeline()
 
 
 app = FastAPI(
     title="Interop Control API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -20,9 +59,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Admin-triggered request profiling (X-Profile header / armed routes).
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so timings include CORS and every other middleware.
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
 app.include_router(auth_router)
 app.include_router(pd_router)
 app.include_router(patient_search_router)
-app.include_router(pd_trigger_router)
\ No newline at end of file
+app.include_router(patient_bulk_router)
+app.include_router(pd_trigger_router)
+app.include_router(pd_batch_router)
@@ -0,0 +1,73 @@
+"""Prometheus scrape endpoint."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.config.settings import get_settings
+from app.metrics.registry import REGISTRY
+from app.pd.dispatch import get_mirth_dispatcher
+from app.pd.outbound import async_trigger_enabled, get_outbound_dispatcher
+from app.pd.storage import get_storage_writer
+from app.utils.log_pipeline import get_log_pipeline
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+CIRCUIT_STATES = ("closed", "half_open", "open")
+
+
+# -------------------------------------------------------------------
+# Scrape-time gauges (read from the owning components, not tracked twice)
+# -------------------------------------------------------------------
+
+def _storage_queue_depth() -> dict:
+    return {(): get_storage_writer().depth}
+
+
+def _outbound_queue_depth() -> dict:
+    if not async_trigger_enabled(get_settings()):
+        return {}
+    return {(): get_outbound_dispatcher().depth()}
+
+
+def _mirth_circuit_state() -> dict:
+    state = get_mirth_dispatcher().breaker.state
+    return {(name,): int(name == state) for name in CIRCUIT_STATES}
+
+
+def _log_queue() -> dict:
+    pipeline = get_log_pipeline()
+    return {("queued",): pipeline.depth, ("dropped",): pipeline.dropped}
+
+
+REGISTRY.gauge(
+    "log_pipeline_records",
+    "Log records waiting for the writer thread, and records dropped because the queue was full.",
+    ("state",),
+    collect=_log_queue,
+)
+REGISTRY.gauge(
+    "pd_storage_queue_depth",
+    "PD writes queued for the background storage writer.",
+    collect=_storage_queue_depth,
+)
+REGISTRY.gauge(
+    "pd_outbound_queue_depth",
+    "PD triggers waiting in the durable outbound queue (async trigger mode).",
+    collect=_outbound_queue_depth,
+)
+REGISTRY.gauge(
+    "mirth_circuit_state",
+    "Mirth circuit breaker state (1 for the current state).",
+    ("state",),
+    collect=_mirth_circuit_state,
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """
+    Request, upstream and queue metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,40 @@
+"""
+Upstream call metrics.
+
+``InstrumentedTransport`` wraps the transport of each pooled upstream
+client, so every OpenEMR (token fetch) and Mirth (PD dispatch) call is
+timed without touching the call sites. Latency is measured to response
+headers; the outcome is the HTTP status or the exception class.
+"""
+from __future__ import annotations
+
+import time
+
+import httpx
+
+from app.metrics.registry import UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS, UPSTREAM_SECONDS
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, upstream: str, transport: httpx.AsyncBaseTransport):
+        self.upstream = upstream
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        method = request.method
+        start = time.perf_counter()
+        UPSTREAM_IN_FLIGHT.inc(self.upstream)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException as e:
+            UPSTREAM_REQUESTS.inc(self.upstream, method, type(e).__name__)
+            raise
+        else:
+            UPSTREAM_REQUESTS.inc(self.upstream, method, str(response.status_code))
+            return response
+        finally:
+            UPSTREAM_IN_FLIGHT.dec(self.upstream)
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start, self.upstream, method)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -1,6 +1,8 @@
 import httpx
 import os
 
+from app.utils.http_clients import MIRTH, get_http_clients
+
 MIRTH_PD_ENDPOINT = os.getenv(
     "MIRTH_PD_ENDPOINT",
     "http://100.27.251.103:6662/pd/trigger/"
@@ -9,20 +11,21 @@ MIRTH_PD_ENDPOINT = os.getenv(
 async def send_pd_request(
     correlation_id: str,
     patient_reference: str,
+    client: httpx.AsyncClient | None = None,
 ) -> None:
     payload = {
         "correlation_id": correlation_id,
         "patient_reference": patient_reference,
     }
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.post(
-            MIRTH_PD_ENDPOINT,
-            json=payload,
-            headers={
-                "Content-Type": "application/json",
-                "X-Correlation-ID": correlation_id,
-            },
-        )
+    client = client or get_http_clients().get(MIRTH)
+    response = await client.post(
+        MIRTH_PD_ENDPOINT,
+        json=payload,
+        headers={
+            "Content-Type": "application/json",
+            "X-Correlation-ID": correlation_id,
+        },
+    )
 
-        response.raise_for_status()
+    response.raise_for_status()
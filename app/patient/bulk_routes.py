@@ -0,0 +1,225 @@
+"""
+Bulk patient search: one upload, many PD searches.
+
+The CSV or NDJSON upload is read into memory first (Starlette cannot
+read the request body once a streaming response has started). It holds
+demographics, so it is never spooled to disk; uploads over
+``patient_search_bulk_max_bytes`` are rejected with 413.
+Rows are then read and validated in batches with a ``TypeAdapter`` and
+valid ones are dispatched through ``submit_search`` with bounded
+concurrency. Results stream back as NDJSON: one line per row, a
+``progress`` line after every batch and a final ``summary``. No
+demographics are echoed.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+from collections import Counter
+from typing import Any, AsyncIterator, BinaryIO, Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+
+from app.config.settings import Settings, get_settings
+from app.patient.search_routes import PatientSearchRequest, submit_search
+
+router = APIRouter(prefix="/api/patient", tags=["patient-search"])
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+FORMATS = ("csv", "ndjson")
+
+_batch_adapter = TypeAdapter(list[PatientSearchRequest])
+
+# (row number, parsed row dict or an error message if it could not be parsed)
+_Row = tuple[int, Any]
+
+
+def _detect_format(content_type: str, requested: str | None) -> str:
+    if requested:
+        if requested not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+        return requested
+    content_type = content_type.lower()
+    if "csv" in content_type:
+        return "csv"
+    if any(kind in content_type for kind in ("ndjson", "jsonl", "json-seq")):
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Upload text/csv or application/x-ndjson (or pass ?format=)",
+    )
+
+
+async def _buffer_upload(request: Request, max_bytes: int) -> BinaryIO:
+    buffer = io.BytesIO()
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Upload exceeds {max_bytes} bytes",
+                )
+            buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer
+
+
+def _iter_rows(upload: BinaryIO, fmt: str) -> Iterator[_Row]:
+    """
+    Yield (row_number, raw_row); raw_row is a dict or an error string.
+    Row numbers are 1-based data rows (CSV header excluded).
+    """
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", errors="replace", newline="")
+
+    if fmt == "csv":
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [name.strip().lower() for name in header]
+        for number, values in enumerate(reader, start=1):
+            if not any(value.strip() for value in values):
+                continue
+            if len(values) > len(columns):
+                yield number, f"expected {len(columns)} columns, got {len(values)}"
+                continue
+            yield number, {
+                column: value.strip() or None
+                for column, value in zip(columns, values)
+            }
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f"invalid JSON: {e}"
+            continue
+        yield number, row if isinstance(row, dict) else "expected a JSON object"
+
+
+def _read_batch(rows: Iterator[_Row], size: int) -> list[_Row]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+def _validate(batch: list[_Row]) -> tuple[list[tuple[int, PatientSearchRequest]], list[dict]]:
+    """
+    Validate a batch in one adapter call. Only when it fails are the
+    offending rows (located from the error paths) split out and the rest
+    re-validated.
+    """
+    errors: list[dict] = []
+    candidates = []
+    for number, raw in batch:
+        if isinstance(raw, str):
+            errors.append({"row": number, "status": "invalid", "errors": [raw]})
+        else:
+            candidates.append((number, raw))
+
+    try:
+        models = _batch_adapter.validate_python([raw for _, raw in candidates])
+    except ValidationError as e:
+        bad: dict[int, list[str]] = {}
+        for error in e.errors(include_url=False, include_input=False):
+            index, *field = error["loc"]
+            bad.setdefault(index, []).append(f"{'.'.join(map(str, field)) or 'row'}: {error['msg']}")
+        for index, messages in sorted(bad.items()):
+            errors.append({"row": candidates[index][0], "status": "invalid", "errors": messages})
+        candidates = [row for index, row in enumerate(candidates) if index not in bad]
+        models = _batch_adapter.validate_python([raw for _, raw in candidates])
+
+    return [(number, model) for (number, _), model in zip(candidates, models)], errors
+
+
+def _line(item: dict) -> bytes:
+    return json.dumps(item, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+async def _process(settings: Settings, upload: BinaryIO, fmt: str) -> AsyncIterator[bytes]:
+    totals: Counter = Counter()
+    rows = _iter_rows(upload, fmt)
+    concurrency = min(settings.patient_search_bulk_concurrency, settings.mirth_max_in_flight)
+
+    async def submit(number: int, search: PatientSearchRequest) -> dict:
+        try:
+            return {"row": number, **await submit_search(settings, search)}
+        except Exception as e:
+            return {"row": number, "status": "error", "error": str(e) or type(e).__name__}
+
+    try:
+        while True:
+            batch = await asyncio.to_thread(_read_batch, rows, settings.patient_search_bulk_batch_size)
+            if not batch:
+                break
+
+            valid, invalid = _validate(batch)
+            for item in invalid:
+                totals["invalid"] += 1
+                yield _line(item)
+
+            # Bounded fan-out over this batch; results in completion order.
+            pending = iter(valid)
+            results: asyncio.Queue = asyncio.Queue()
+
+            async def worker() -> None:
+                for number, search in pending:
+                    await results.put(await submit(number, search))
+
+            workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(valid)))]
+            try:
+                for _ in range(len(valid)):
+                    item = await results.get()
+                    totals[item["status"]] += 1
+                    yield _line(item)
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+            totals["rows"] += len(batch)
+            yield _line({"progress": dict(totals)})
+
+        yield _line({"summary": dict(totals)})
+    finally:
+        upload.close()
+
+
+@router.post("/search/bulk")
+async def patient_search_bulk(
+    request: Request,
+    format: str | None = None,
+    settings: Settings = Depends(get_settings),
+) -> StreamingResponse:
+    """
+    Upload a roster (CSV with a header row, or NDJSON) of
+    ``first_name, last_name, dob, gender`` and run a patient search per
+    row. Invalid rows are reported and skipped; the upload continues.
+    """
+    if not settings.pd_endpoint_url:
+        raise HTTPException(
+            status_code=500,
+            detail="pd_endpoint_url is not configured",
+        )
+
+    fmt = _detect_format(request.headers.get("content-type", ""), format)
+    upload = await _buffer_upload(request, max_bytes=settings.patient_search_bulk_max_bytes)
+
+    return StreamingResponse(_process(settings, upload, fmt), media_type=NDJSON_MEDIA_TYPE)
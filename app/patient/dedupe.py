@@ -0,0 +1,63 @@
+"""
+De-duplication of patient searches without keeping PHI.
+
+Searches are keyed by an HMAC-SHA256 of the normalized demographics
+using a random salt generated per process, so keys cannot be reversed
+or matched against precomputed hashes, and nothing outside this process
+can link a key to a person. Only the key and the resulting execution
+live in the cache; the cleartext criteria are never stored.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import secrets
+import unicodedata
+from datetime import date
+from typing import Optional
+
+from app.config.settings import get_settings
+from app.pd.coalesce import TriggerCoalescer
+
+_SALT = secrets.token_bytes(32)
+
+GENDER_CODES = {"m": "M", "male": "M", "f": "F", "female": "F", "u": "U", "unknown": "U"}
+
+
+def _normalize_name(value: str) -> str:
+    # Fold case and accents, drop spaces/punctuation ("O'Brien" == "obrien").
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(ch for ch in decomposed.casefold() if ch.isalnum())
+
+
+def _normalize_gender(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    folded = value.strip().casefold()
+    return GENDER_CODES.get(folded, folded)
+
+
+def demographic_key(first_name: str, last_name: str, dob: date, gender: Optional[str]) -> str:
+    canonical = "\x1f".join(
+        (
+            _normalize_name(first_name),
+            _normalize_name(last_name),
+            dob.isoformat(),
+            _normalize_gender(gender),
+        )
+    )
+    return hmac.new(_SALT, canonical.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+_search_dedupe: TriggerCoalescer | None = None
+
+
+def get_search_dedupe() -> TriggerCoalescer:
+    global _search_dedupe
+    if _search_dedupe is None:
+        settings = get_settings()
+        _search_dedupe = TriggerCoalescer(
+            ttl_seconds=settings.patient_search_dedupe_ttl_seconds,
+            max_entries=settings.patient_search_cache_max_entries,
+        )
+    return _search_dedupe
@@ -1,9 +1,15 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from datetime import date
+from datetime import date, datetime
 import uuid
 import logging
 
+from app.config.settings import Settings, get_settings
+from app.patient.dedupe import demographic_key, get_search_dedupe
+from app.pd.dispatch import forward_execution
+from app.pd.storage import get_storage_writer
+from app.utils.log_pipeline import correlation_context
+
 router = APIRouter(prefix="/api/patient", tags=["patient-search"])
 
 logger = logging.getLogger("patient-search")
@@ -21,9 +27,12 @@ class PatientSearchRequest(BaseModel):
 
 
 class PatientSearchResponse(BaseModel):
+    # "submitted" (new PD execution), "existing" (repeat search within the
+    # de-duplication window) or "forward_failed".
     status: str
     execution_id: str
     criteria: dict
+    forwarded: bool | None = None
 
 
 # ============================
@@ -31,28 +40,90 @@ class PatientSearchResponse(BaseModel):
 # ============================
 
 @router.post("/search", response_model=PatientSearchResponse)
-async def patient_search(request: PatientSearchRequest):
+async def patient_search(
+    request: PatientSearchRequest,
+    settings: Settings = Depends(get_settings),
+):
     """
     Accepts patient demographics and triggers downstream Patient Discovery.
     This endpoint does NOT return PHI.
     """
 
-    execution_id = str(uuid.uuid4())
-
-    logger.info("Patient search received", extra={
-        "execution_id": execution_id,
-        "first_name": request.first_name,
-        "last_name": request.last_name,
-        "dob": str(request.dob),
-        "gender": request.gender,
-    })
+    if not settings.pd_endpoint_url:
+        raise HTTPException(
+            status_code=500,
+            detail="pd_endpoint_url is not configured",
+        )
 
-    # 🔒 Do NOT persist PHI
-    # 🔄 Do NOT normalize
-    # 📡 Just acknowledge orchestration
+    outcome = await submit_search(settings, request)
 
     return PatientSearchResponse(
-        status="submitted",
-        execution_id=execution_id,
         criteria=request.model_dump(),
+        **outcome,
     )
+
+
+async def submit_search(settings: Settings, request: PatientSearchRequest) -> dict:
+    """
+    De-duplicate and dispatch one search. Returns ``status``,
+    ``execution_id`` and ``forwarded`` (no criteria).
+    """
+    # 🔒 Do NOT persist PHI: only a salted hash of the demographics is kept
+    # (in memory), and the execution carries no patient reference.
+    search_key = demographic_key(request.first_name, request.last_name, request.dob, request.gender)
+
+    async def dispatch() -> dict:
+        return await _dispatch_search(settings, request)
+
+    result = await get_search_dedupe().run(search_key, dispatch)
+    repeat = result.get("cached") or result.get("coalesced")
+
+    with correlation_context(result["correlation_id"]):
+        logger.info("Patient search received", extra={
+            "execution_id": result["correlation_id"],
+            "search_key": search_key[:12],
+            "repeat": bool(repeat),
+        })
+
+    if repeat:
+        status = "existing"
+    elif result.get("forwarded"):
+        status = "submitted"
+    else:
+        status = "forward_failed"
+
+    return {
+        "status": status,
+        "execution_id": result["correlation_id"],
+        "forwarded": result.get("forwarded"),
+    }
+
+
+async def _dispatch_search(settings: Settings, request: PatientSearchRequest) -> dict:
+    """
+    Create the PD execution and send the demographics to Mirth.
+
+    Always dispatched inline (never through the durable outbound queue) so
+    the demographics exist only in transit.
+    """
+    correlation_id = str(uuid.uuid4())
+    triggered_at = datetime.utcnow().isoformat()
+
+    with correlation_context(correlation_id):
+        await get_storage_writer().create_execution(
+            wait=True,
+            correlation_id=correlation_id,
+            patient_reference=None,
+            status="TRIGGERED",
+            triggered_at=triggered_at,
+        )
+
+        result = await forward_execution(
+            settings.pd_endpoint_url,
+            {
+                "correlation_id": correlation_id,
+                "demographics": request.model_dump(mode="json"),
+            },
+            triggered_at,
+        )
+    return {"correlation_id": correlation_id, **result.to_dict()}
@@ -0,0 +1,297 @@
+"""
+Aggregates over the PD artifact partitions (``env=<environment>/YYYY/MM/DD``).
+
+Only partitions inside the requested date range are opened. Each day is
+reduced to a mergeable ``DayAggregate`` (counts plus a fixed-bucket latency
+histogram); aggregates for closed days are cached keyed on the partition's
+version (see ``partition_version``), so a repeated query only re-reads
+today's partition and any closed day that received late writes, rewrites
+or was compacted.
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from app.config.settings import Settings, get_settings
+from app.utils.pd_artifacts import (
+    iter_partition_artifacts,
+    iter_partitions,
+    partition_version,
+    read_pd_artifact,
+    write_pd_artifact,
+)
+
+logger = logging.getLogger("pd.analytics")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS_MS = (
+    10, 25, 50, 100, 250, 500,
+    1_000, 2_500, 5_000, 10_000, 30_000, 60_000,
+    120_000, 300_000, 600_000, 1_800_000, 3_600_000,
+)
+PERCENTILES = (50, 90, 95, 99)
+
+AGGREGATE_CACHE_MAX_DAYS = 2048
+# Partitions searched (back from today) for an earlier artifact of the
+# same exchange before recording an outcome.
+DEDUPE_LOOKBACK_DAYS = 7
+
+
+# -------------------------------------------------------------------
+# Recording
+# -------------------------------------------------------------------
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def record_pd_outcome(
+    correlation_id: str,
+    status: str,
+    execution: Optional[dict[str, Any]] = None,
+    **fields: Any,
+) -> None:
+    """
+    Write the NON-PHI artifact for a finished PD exchange. ``execution`` is
+    the stored record, used for the trigger timestamp; the patient
+    reference is never copied. Best effort: failures are only logged.
+
+    Idempotent per (correlation_id, status): a repeated outcome (e.g. a
+    retried Mirth callback) is not recorded again.
+    """
+    settings = get_settings()
+    execution = execution or {}
+    base_dir = Path(settings.pd_artifact_dir)
+
+    artifact: dict[str, Any] = {
+        "correlation_id": correlation_id,
+        "status": status,
+        "message_type": fields.pop("message_type", None) or execution.get("message_type"),
+        "triggered_at": execution.get("triggered_at"),
+        "completed_at": datetime.utcnow().isoformat(),
+    }
+    artifact.update(fields)
+
+    triggered = parse_timestamp(artifact["triggered_at"])
+    completed = parse_timestamp(artifact.get("received_at")) or parse_timestamp(artifact["completed_at"])
+    if triggered and completed:
+        artifact["latency_ms"] = round((completed - triggered).total_seconds() * 1000, 3)
+
+    try:
+        previous = _latest_artifact(base_dir, settings.environment, correlation_id, artifact["triggered_at"])
+    except (OSError, ValueError):
+        logger.exception("Failed to look up PD artifact %s", correlation_id)
+        previous = None
+    if previous is not None and previous.get("status") == status:
+        logger.info("PD outcome already recorded", extra={"correlation_id": correlation_id, "status": status})
+        return
+
+    try:
+        write_pd_artifact(base_dir, settings.environment, correlation_id, artifact)
+    except OSError:
+        logger.exception("Failed to write PD artifact %s", correlation_id)
+
+
+def _latest_artifact(
+    base_dir: Path,
+    environment: str,
+    correlation_id: str,
+    triggered_at: Optional[str],
+) -> Optional[dict[str, Any]]:
+    """
+    Most recent artifact for ``correlation_id``, searching from today back
+    to the trigger day (at most ``DEDUPE_LOOKBACK_DAYS``).
+    """
+    today = datetime.utcnow().date()
+    triggered = parse_timestamp(triggered_at)
+    oldest = today - timedelta(days=DEDUPE_LOOKBACK_DAYS - 1)
+    if triggered is not None and oldest <= triggered.date() <= today:
+        oldest = triggered.date()
+
+    day = today
+    while day >= oldest:
+        artifact = read_pd_artifact(base_dir, environment, correlation_id, day)
+        if artifact is not None:
+            return artifact
+        day -= timedelta(days=1)
+    return None
+
+
+# -------------------------------------------------------------------
+# Aggregation
+# -------------------------------------------------------------------
+
+@dataclass
+class DayAggregate:
+    total: int = 0
+    by_status: Counter = field(default_factory=Counter)
+    by_message_type: Counter = field(default_factory=Counter)
+    by_acknowledgement: Counter = field(default_factory=Counter)
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    latency_count: int = 0
+    latency_sum_ms: float = 0.0
+    latency_min_ms: Optional[float] = None
+    latency_max_ms: Optional[float] = None
+
+    def add(self, artifact: dict[str, Any]) -> None:
+        self.total += 1
+        self.by_status[artifact.get("status") or "UNKNOWN"] += 1
+        self.by_message_type[artifact.get("message_type") or "UNKNOWN"] += 1
+
+        ack = (artifact.get("summary") or {}).get("acknowledgement_code")
+        if ack:
+            self.by_acknowledgement[ack] += 1
+
+        latency = artifact.get("latency_ms")
+        if isinstance(latency, (int, float)) and latency >= 0:
+            self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency)] += 1
+            self.latency_count += 1
+            self.latency_sum_ms += latency
+            self.latency_min_ms = latency if self.latency_min_ms is None else min(self.latency_min_ms, latency)
+            self.latency_max_ms = latency if self.latency_max_ms is None else max(self.latency_max_ms, latency)
+
+    def merge(self, other: "DayAggregate") -> None:
+        self.total += other.total
+        self.by_status.update(other.by_status)
+        self.by_message_type.update(other.by_message_type)
+        self.by_acknowledgement.update(other.by_acknowledgement)
+        self.latency_buckets = [a + b for a, b in zip(self.latency_buckets, other.latency_buckets)]
+        self.latency_count += other.latency_count
+        self.latency_sum_ms += other.latency_sum_ms
+        if other.latency_count:
+            self.latency_min_ms = min(v for v in (self.latency_min_ms, other.latency_min_ms) if v is not None)
+            self.latency_max_ms = max(v for v in (self.latency_max_ms, other.latency_max_ms) if v is not None)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Estimate from the histogram, interpolating linearly inside the
+        bucket and clamping to the observed min/max.
+        """
+        if not self.latency_count:
+            return None
+
+        rank = pct / 100 * self.latency_count
+        cumulative = 0
+        for i, count in enumerate(self.latency_buckets):
+            if not count:
+                continue
+            if cumulative + count >= rank:
+                lower = LATENCY_BUCKETS_MS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.latency_max_ms
+                value = lower + (upper - lower) * max(rank - cumulative, 0) / count
+                return round(min(max(value, self.latency_min_ms), self.latency_max_ms), 3)
+            cumulative += count
+        return self.latency_max_ms
+
+    def latency_summary(self) -> dict[str, Any]:
+        summary: dict[str, Any] = {
+            "count": self.latency_count,
+            "min": self.latency_min_ms,
+            "max": self.latency_max_ms,
+            "mean": round(self.latency_sum_ms / self.latency_count, 3) if self.latency_count else None,
+        }
+        for pct in PERCENTILES:
+            summary[f"p{pct}"] = self.percentile(pct)
+        return summary
+
+
+def aggregate_partition(day_dir: Path) -> DayAggregate:
+    aggregate = DayAggregate()
+    for _, artifact in iter_partition_artifacts(day_dir):
+        aggregate.add(artifact)
+    return aggregate
+
+
+class PDStatsService:
+    """
+    Range queries over artifact partitions with a per-day aggregate cache.
+    """
+
+    def __init__(self, base_dir: str | Path, max_cached_days: int = AGGREGATE_CACHE_MAX_DAYS):
+        self.base_dir = Path(base_dir)
+        self.max_cached_days = max_cached_days
+        # (environment, day) -> (partition version, aggregate)
+        self._cache: OrderedDict[tuple[str, date], tuple[tuple[int, ...], DayAggregate]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self, environment: str, start: date, end: date, today: Optional[date] = None) -> dict[str, Any]:
+        today = today or datetime.utcnow().date()
+        total = DayAggregate()
+        days = []
+        cached_days = 0
+
+        for day, day_dir in iter_partitions(self.base_dir, environment, start=start, end=end):
+            aggregate, cached = self._day(environment, day, day_dir, closed=day < today)
+            cached_days += cached
+            total.merge(aggregate)
+            days.append({
+                "date": day.isoformat(),
+                "total": aggregate.total,
+                "by_status": dict(aggregate.by_status),
+            })
+
+        return {
+            "environment": environment,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "total": total.total,
+            "by_status": dict(total.by_status),
+            "by_message_type": dict(total.by_message_type),
+            "by_acknowledgement": dict(total.by_acknowledgement),
+            "latency_ms": total.latency_summary(),
+            "days": days,
+            "cached_days": cached_days,
+        }
+
+    def _day(self, environment: str, day: date, day_dir: Path, closed: bool) -> tuple[DayAggregate, bool]:
+        if not closed:
+            return aggregate_partition(day_dir), False
+
+        key = (environment, day)
+        try:
+            version = partition_version(day_dir)
+        except FileNotFoundError:
+            return DayAggregate(), False
+
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None and hit[0] == version:
+                self._cache.move_to_end(key)
+                return hit[1], True
+
+        aggregate = aggregate_partition(day_dir)
+
+        with self._lock:
+            self._cache[key] = (version, aggregate)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cached_days:
+                self._cache.popitem(last=False)
+
+        return aggregate, False
+
+
+# -------------------------------------------------------------------
+# Global service
+# -------------------------------------------------------------------
+
+_stats_service: PDStatsService | None = None
+
+
+def get_stats_service(settings: Settings | None = None) -> PDStatsService:
+    global _stats_service
+    settings = settings or get_settings()
+    if _stats_service is None or _stats_service.base_dir != Path(settings.pd_artifact_dir):
+        _stats_service = PDStatsService(settings.pd_artifact_dir)
+    return _stats_service
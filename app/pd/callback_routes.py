@@ -2,10 +2,15 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, Depends, Header, Request, Response, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, Request, Response, status
 
 from app.config.settings import Settings, get_settings
-from app.pd.storage import PDStorage
+from app.pd.analytics import record_pd_outcome
+from app.pd.events import get_execution_events
+from app.pd.ingest import ingest_body
+from app.pd.lifecycle import get_lifecycle_tracker, partner_of, phase_durations
+from app.pd.storage import PDStorage, get_storage_writer
+from app.utils.log_pipeline import correlation_context
 
 router = APIRouter()
 
@@ -13,42 +18,97 @@ router = APIRouter()
 @router.post("/callback")
 async def patient_discovery_callback(
     request: Request,
+    background_tasks: BackgroundTasks,
     settings: Settings = Depends(get_settings),
     x_correlation_id: str | None = Header(default=None),
+    content_length: int | None = Header(default=None),
 ) -> Response:
     correlation_id = x_correlation_id or str(uuid.uuid4())
-    storage = PDStorage()
+    with correlation_context(correlation_id):
+        storage = get_storage_writer()
+        # Arrival time: the gateway round trip ends here, not after the upload.
+        received_at = datetime.utcnow().isoformat()
 
-    raw_body = await request.body()
-    content_type = request.headers.get("content-type", "")
-    received_at = datetime.utcnow().isoformat()
+        # Stream the body into a spooled file; size, checksum and message
+        # type are computed while reading.
+        payload = await ingest_body(
+            request.stream(),
+            max_bytes=settings.pd_callback_max_bytes,
+            spool_bytes=settings.pd_callback_spool_bytes,
+            declared_length=content_length,
+        )
+        content_type = request.headers.get("content-type", "")
 
-    payload_text = raw_body.decode("utf-8", errors="ignore")
-    payload_type = "xml" if "xml" in content_type.lower() else "json"
+        payload_type = "xml" if "xml" in content_type.lower() else "json"
+        message_type = payload.message_type
 
-    message_type = "UNKNOWN"
-    if "PRPA_IN201305" in payload_text:
-        message_type = "PRPA_IN201305UV02"
-    elif "PRPA_IN201306" in payload_text:
-        message_type = "PRPA_IN201306UV02"
+        # Once queued, the writer owns the spooled file and closes it.
+        try:
+            await storage.save_pd_response(
+                correlation_id=correlation_id,
+                payload=payload.file,
+                payload_type=payload_type,
+                message_type=message_type,
+                size=payload.size,
+                sha256=payload.sha256,
+            )
+        except BaseException:
+            payload.close()
+            raise
 
-    storage.save_pd_response(
-        correlation_id=correlation_id,
-        payload=payload_text,
-        payload_type=payload_type,
-        message_type=message_type,
-    )
+        # Committed before waiters are woken, so they read the new status.
+        await storage.update_execution(
+            wait=True,
+            correlation_id=correlation_id,
+            update={
+                "status": "RESPONSE_RECEIVED",
+                "message_type": message_type,
+                "received_at": received_at,
+                "classified_at": datetime.utcnow().isoformat(),
+                "payload_bytes": payload.size,
+                "payload_sha256": payload.sha256,
+                "summary": payload.summary.to_dict(),
+            },
+        )
 
-    storage.update_execution(
-        correlation_id=correlation_id,
-        update={
-            "status": "RESPONSE_RECEIVED",
-            "message_type": message_type,
-            "received_at": received_at,
-        },
-    )
+        get_execution_events().publish(correlation_id)
+
+        # Analytics artifact is written after the ACK has been sent.
+        background_tasks.add_task(
+            _record_response,
+            correlation_id=correlation_id,
+            message_type=message_type,
+            received_at=received_at,
+            payload_bytes=payload.size,
+            summary=payload.summary.to_dict(),
+            sla_seconds=settings.pd_callback_sla_seconds,
+        )
 
     return Response(
         status_code=status.HTTP_202_ACCEPTED,
         content="ACK",
     )
+
+
+def _record_response(
+    correlation_id: str,
+    message_type: str | None,
+    summary: dict,
+    sla_seconds: float,
+    **fields,
+) -> None:
+    execution = PDStorage().get_execution(correlation_id) or {}
+    phases = phase_durations(execution)
+    sla_breached = phases.get("end_to_end", 0) > sla_seconds * 1000
+
+    get_lifecycle_tracker().record(message_type, partner_of(summary), phases, sla_breached)
+    record_pd_outcome(
+        correlation_id,
+        status="RESPONSE_RECEIVED",
+        execution=execution,
+        message_type=message_type,
+        summary=summary,
+        phases_ms=phases,
+        sla_breached=sla_breached,
+        **fields,
+    )
@@ -0,0 +1,109 @@
+"""
+Trigger-level de-duplication of PD requests for the same patient.
+
+``TriggerCoalescer`` keys triggers by the patient reference hash:
+- while a trigger is in flight, identical triggers await the same task
+  and get its correlation_id (``coalesced: true``);
+- a successful result (forwarded or queued) is then served from a
+  bounded TTL cache for ``pd_trigger_dedupe_ttl_seconds`` (``cached: true``).
+
+Failed forwards are never cached, so a retry goes to Mirth. State is per
+worker process.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config.settings import get_settings
+from app.storage.base import hash_patient_reference
+
+
+class TriggerCoalescer:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._inflight: dict[str, asyncio.Task] = {}
+        # key -> (expires_at, result)
+        self._results: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    async def run(
+        self,
+        patient_reference: str,
+        trigger: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        if not self.enabled:
+            return await trigger()
+
+        key = hash_patient_reference(patient_reference)
+
+        cached = self._get_cached(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        task = self._inflight.get(key)
+        if task is not None:
+            return {**await asyncio.shield(task), "coalesced": True}
+
+        # Run as a task so a disconnecting first caller does not cancel
+        # the trigger for everyone attached to it.
+        task = asyncio.create_task(trigger())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def invalidate(self, patient_reference: str) -> None:
+        self._results.pop(hash_patient_reference(patient_reference), None)
+
+    def clear(self) -> None:
+        self._results.clear()
+
+    # ------------------------------------------------------------------
+    # INTERNALS
+    # ------------------------------------------------------------------
+
+    def _get_cached(self, key: str) -> Optional[dict[str, Any]]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return result
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        result = task.result()
+        if not (result.get("forwarded") or result.get("queued")):
+            return
+
+        self._results[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+
+_coalescer: TriggerCoalescer | None = None
+
+
+def get_trigger_coalescer() -> TriggerCoalescer:
+    global _coalescer
+    if _coalescer is None:
+        settings = get_settings()
+        _coalescer = TriggerCoalescer(
+            ttl_seconds=settings.pd_trigger_dedupe_ttl_seconds,
+            max_entries=settings.pd_trigger_cache_max_entries,
+        )
+    return _coalescer
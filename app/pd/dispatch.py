@@ -0,0 +1,325 @@
+"""
+Resilient dispatch of PD triggers to Mirth.
+
+``MirthDispatcher`` wraps ``send_pd_request`` with:
+- a semaphore capping in-flight Mirth calls (callers wait a bounded time
+  for a slot, then fail fast as "saturated");
+- jittered exponential retries for retryable failures (transport errors,
+  408/429/502/503/504), honouring ``Retry-After`` and an overall deadline;
+- a circuit breaker that fails fast while Mirth is down (transport errors
+  and 5xx count as failures, 4xx does not) and lets a single probe
+  through once the reset window has passed.
+
+Upstream failures never raise; callers get a ``DispatchResult``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+
+from app.config.settings import Settings, get_settings
+from app.pd.analytics import record_pd_outcome
+from app.pd.events import get_execution_events
+from app.pd.mirth_client import send_pd_request
+from app.pd.storage import get_storage_writer
+
+logger = logging.getLogger("pd.dispatch")
+
+RETRYABLE_STATUS = {408, 429, 502, 503, 504}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class DispatchResult:
+    forwarded: bool
+    attempts: int
+    circuit: str
+    downstream_status: Optional[int] = None
+    error: Optional[str] = None
+    # Seconds until the breaker allows another attempt (fail-fast only).
+    retry_after: Optional[float] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. Not thread-safe; used from one event loop.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return OPEN
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(self.reset_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """Give up a half-open probe slot without judging Mirth's health."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                logger.warning("Mirth circuit opened after %d consecutive failures", self._failures)
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+
+class _Retryable(Exception):
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        upstream_failure: bool = True,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        # False when the attempt never reached Mirth (local saturation).
+        self.upstream_failure = upstream_failure
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+class MirthDispatcher:
+    def __init__(
+        self,
+        settings: Settings,
+        send: Callable[..., Awaitable[tuple[int, str]]] = send_pd_request,
+    ):
+        self.settings = settings
+        self._send = send
+        self._slots = asyncio.Semaphore(settings.mirth_max_in_flight)
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.mirth_breaker_failure_threshold,
+            reset_seconds=settings.mirth_breaker_reset_seconds,
+        )
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def health(self) -> dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "in_flight": self._in_flight,
+            "max_in_flight": self.settings.mirth_max_in_flight,
+        }
+
+    async def dispatch(self, endpoint_url: str, payload: dict) -> DispatchResult:
+        s = self.settings
+        deadline = time.monotonic() + s.mirth_dispatch_deadline_seconds
+        attempts = 0
+        last_error: Optional[str] = None
+        last_status: Optional[int] = None
+
+        while attempts < s.mirth_max_attempts:
+            if not self.breaker.allow():
+                return DispatchResult(
+                    forwarded=False,
+                    attempts=attempts,
+                    circuit=self.breaker.state,
+                    downstream_status=last_status,
+                    error=last_error or "Mirth circuit is open",
+                    retry_after=round(self.breaker.retry_after(), 3),
+                )
+
+            attempts += 1
+            try:
+                status_code = await self._attempt(endpoint_url, payload, deadline)
+            except _Retryable as e:
+                if e.upstream_failure:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release_probe()
+                last_error, last_status = str(e), e.status
+                delay = self._backoff(attempts, e.retry_after)
+                if attempts >= s.mirth_max_attempts or time.monotonic() + delay >= deadline:
+                    break
+                logger.info("Mirth attempt %d failed (%s); retrying in %.2fs", attempts, e, delay)
+                await asyncio.sleep(delay)
+                continue
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code >= 500:
+                    # The channel answered but is failing (e.g. 500 every time).
+                    self.breaker.record_failure()
+                else:
+                    # Mirth answered: the channel is up, the request was rejected.
+                    self.breaker.record_success()
+                return DispatchResult(
+                    forwarded=False,
+                    attempts=attempts,
+                    circuit=self.breaker.state,
+                    downstream_status=e.response.status_code,
+                    error=f"Mirth returned HTTP {e.response.status_code}",
+                )
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                # Unexpected error: count it against the channel and report.
+                self.breaker.record_failure()
+                return DispatchResult(
+                    forwarded=False,
+                    attempts=attempts,
+                    circuit=self.breaker.state,
+                    error=str(e) or type(e).__name__,
+                )
+
+            self.breaker.record_success()
+            return DispatchResult(
+                forwarded=True,
+                attempts=attempts,
+                circuit=self.breaker.state,
+                downstream_status=status_code,
+            )
+
+        return DispatchResult(
+            forwarded=False,
+            attempts=attempts,
+            circuit=self.breaker.state,
+            downstream_status=last_status,
+            error=last_error,
+        )
+
+    # ------------------------------------------------------------------
+    # INTERNALS
+    # ------------------------------------------------------------------
+
+    async def _attempt(self, endpoint_url: str, payload: dict, deadline: float) -> int:
+        wait = min(self.settings.mirth_acquire_timeout_seconds, max(deadline - time.monotonic(), 0.0))
+        if wait <= 0:
+            # wait_for(timeout=0) times out even when a slot is free; a
+            # free semaphore is acquired without suspending.
+            if self._slots.locked():
+                raise _Retryable("Mirth dispatch saturated", upstream_failure=False)
+            await self._slots.acquire()
+        else:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=wait)
+            except asyncio.TimeoutError:
+                raise _Retryable("Mirth dispatch saturated", upstream_failure=False)
+
+        self._in_flight += 1
+        try:
+            status_code, _ = await self._send(endpoint_url=endpoint_url, payload=payload)
+            return status_code
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in RETRYABLE_STATUS:
+                raise _Retryable(
+                    f"Mirth returned HTTP {e.response.status_code}",
+                    status=e.response.status_code,
+                    retry_after=_retry_after_seconds(e.response),
+                )
+            raise
+        except httpx.TransportError as e:
+            raise _Retryable(f"{type(e).__name__}: {e}" if str(e) else type(e).__name__)
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """
+        Full-jitter exponential backoff, never shorter than Retry-After.
+        """
+        s = self.settings
+        ceiling = min(s.mirth_retry_max_seconds, s.mirth_retry_base_seconds * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, s.mirth_retry_max_seconds))
+        return delay
+
+
+async def forward_execution(endpoint_url: str, payload: dict, triggered_at: str) -> DispatchResult:
+    """
+    Send one TRIGGERED execution to Mirth; record FORWARD_FAILED on failure.
+    """
+    correlation_id = payload["correlation_id"]
+    forwarded_at = datetime.utcnow().isoformat()
+    result = await get_mirth_dispatcher().dispatch(endpoint_url=endpoint_url, payload=payload)
+
+    if result.forwarded:
+        # Lifecycle phase timestamps; the status stays TRIGGERED until the
+        # callback arrives.
+        await get_storage_writer().update_execution(
+            correlation_id=correlation_id,
+            update={"forwarded_at": forwarded_at, "acknowledged_at": datetime.utcnow().isoformat()},
+        )
+    else:
+        await get_storage_writer().transition_status(
+            correlation_id=correlation_id,
+            from_statuses=["TRIGGERED"],
+            to_status="FORWARD_FAILED",
+            update={"forward_attempts": result.attempts, "forward_error": result.error},
+        )
+        get_execution_events().publish(correlation_id)
+        await asyncio.to_thread(
+            record_pd_outcome,
+            correlation_id,
+            status="FORWARD_FAILED",
+            execution={"triggered_at": triggered_at},
+            error=result.error,
+            attempts=result.attempts,
+        )
+
+    return result
+
+
+_dispatcher: MirthDispatcher | None = None
+
+
+def get_mirth_dispatcher() -> MirthDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = MirthDispatcher(get_settings())
+    return _dispatcher
@@ -0,0 +1,99 @@
+"""
+In-process change notifications for PD executions.
+
+Handlers that commit a status change (callback, failed forward, outbound
+queue) call ``publish(correlation_id)``; waiters registered on this
+worker wake immediately and re-read the record from storage, which stays
+the source of truth. Changes committed by another worker process are
+picked up by a slow storage re-check (``pd_wait_storage_poll_seconds``).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from app.pd.storage import PDStorage
+
+TERMINAL_STATUSES = frozenset({"RESPONSE_RECEIVED", "FORWARD_FAILED"})
+
+
+class ExecutionEvents:
+    def __init__(self) -> None:
+        self._waiters: dict[str, set[asyncio.Event]] = {}
+
+    @contextmanager
+    def subscribe(self, correlation_id: str) -> Iterator[asyncio.Event]:
+        event = asyncio.Event()
+        self._waiters.setdefault(correlation_id, set()).add(event)
+        try:
+            yield event
+        finally:
+            waiters = self._waiters.get(correlation_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[correlation_id]
+
+    def publish(self, correlation_id: str) -> int:
+        """
+        Wake every local waiter for ``correlation_id``. Call only after the
+        change is committed. Returns the number of waiters woken.
+        """
+        waiters = self._waiters.get(correlation_id, ())
+        for event in waiters:
+            event.set()
+        return len(waiters)
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def watch(
+        self,
+        correlation_id: str,
+        timeout: float,
+        poll_seconds: float,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yield the execution record now and after every change, until it
+        reaches a terminal status or ``timeout`` elapses. Yields nothing if
+        the execution does not exist.
+        """
+        deadline = time.monotonic() + timeout
+        storage = PDStorage()
+
+        # Subscribe before the first read so a change in between is not lost.
+        with self.subscribe(correlation_id) as changed:
+            last: Optional[dict[str, Any]] = None
+            while True:
+                changed.clear()
+                record = await asyncio.to_thread(storage.get_execution, correlation_id)
+                if record is None:
+                    return
+                if record != last:
+                    yield record
+                    last = record
+                if record.get("status") in TERMINAL_STATUSES:
+                    return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=min(remaining, poll_seconds))
+                except asyncio.TimeoutError:
+                    # Fall back to storage: the change may have landed on
+                    # another worker.
+                    pass
+
+
+_events: ExecutionEvents | None = None
+
+
+def get_execution_events() -> ExecutionEvents:
+    global _events
+    if _events is None:
+        _events = ExecutionEvents()
+    return _events
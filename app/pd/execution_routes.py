@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.config.settings import Settings, get_settings
+from app.pd.events import TERMINAL_STATUSES, get_execution_events
+from app.pd.models import ExecutionPage, ExecutionRecord, ExecutionWaitResult
+from app.pd.storage import PDStorage
+from app.storage.base import ExecutionQuery
+
+router = APIRouter()
+
+
+def _as_stored_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """
+    Executions store naive UTC ISO timestamps; normalise filters to match.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+# Sync handlers: FastAPI runs them in the threadpool, keeping storage
+# reads off the event loop.
+@router.get("/executions", response_model=ExecutionPage)
+def list_executions(
+    status: Optional[str] = None,
+    patient_reference_hash: Optional[str] = Query(
+        default=None,
+        description="Hex SHA-256 of the patient_reference",
+    ),
+    message_type: Optional[str] = None,
+    triggered_after: Optional[datetime] = None,
+    triggered_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+) -> ExecutionPage:
+    query = ExecutionQuery(
+        status=status,
+        patient_reference_hash=patient_reference_hash,
+        message_type=message_type,
+        triggered_after=_as_stored_timestamp(triggered_after),
+        triggered_before=_as_stored_timestamp(triggered_before),
+        cursor=cursor,
+        limit=limit,
+    )
+
+    storage = PDStorage()
+    if not storage.supports_queries:
+        raise HTTPException(
+            status_code=501,
+            detail="Execution queries require PD_STORAGE_BACKEND=sqlite",
+        )
+
+    try:
+        page = storage.list_executions(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ExecutionPage(
+        items=[ExecutionRecord(**item) for item in page.items],
+        next_cursor=page.next_cursor,
+    )
+
+
+@router.get("/executions/{correlation_id}", response_model=ExecutionRecord)
+def get_execution(correlation_id: str) -> ExecutionRecord:
+    record = PDStorage().get_execution(correlation_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    return ExecutionRecord(**record)
+
+
+PAYLOAD_MEDIA_TYPES = {"xml": "application/xml", "json": "application/json"}
+PAYLOAD_CHUNK = 64 * 1024
+
+
+@router.get("/executions/{correlation_id}/response")
+def get_execution_response(correlation_id: str) -> StreamingResponse:
+    """
+    Stream the stored callback payload, decompressed.
+    """
+    opened = PDStorage().open_pd_response(correlation_id)
+    if opened is None:
+        raise HTTPException(status_code=404, detail="Response not found")
+    response, stream = opened
+
+    def chunks():
+        with stream:
+            while chunk := stream.read(PAYLOAD_CHUNK):
+                yield chunk
+
+    headers = {"X-Message-Type": response.get("message_type") or "UNKNOWN"}
+    if response.get("sha256"):
+        headers["X-Payload-SHA256"] = response["sha256"]
+
+    return StreamingResponse(
+        chunks(),
+        media_type=PAYLOAD_MEDIA_TYPES.get(response.get("payload_type"), "application/octet-stream"),
+        headers=headers,
+    )
+
+
+# -------------------------------------------------------------------
+# Change notifications (long-poll + SSE)
+# -------------------------------------------------------------------
+
+@router.get("/executions/{correlation_id}/wait", response_model=ExecutionWaitResult)
+async def wait_for_execution(
+    correlation_id: str,
+    timeout: float = Query(default=30.0, gt=0),
+    settings: Settings = Depends(get_settings),
+) -> ExecutionWaitResult:
+    """
+    Long-poll until the execution reaches a terminal status
+    (RESPONSE_RECEIVED / FORWARD_FAILED) or ``timeout`` seconds pass
+    (capped at PD_WAIT_MAX_SECONDS). Returns the latest record either way.
+    """
+    record = None
+    async for record in get_execution_events().watch(
+        correlation_id,
+        timeout=min(timeout, settings.pd_wait_max_seconds),
+        poll_seconds=settings.pd_wait_storage_poll_seconds,
+    ):
+        pass
+
+    if record is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+    return ExecutionWaitResult(
+        completed=record.get("status") in TERMINAL_STATUSES,
+        execution=ExecutionRecord(**record),
+    )
+
+
+@router.get("/executions/{correlation_id}/events")
+async def stream_execution_events(
+    correlation_id: str,
+    request: Request,
+    timeout: float = Query(default=300.0, gt=0),
+    settings: Settings = Depends(get_settings),
+) -> StreamingResponse:
+    """
+    Server-Sent Events: one ``status`` event with the record now and on
+    every change, a final ``end`` event, and keep-alive comments.
+    """
+    events = get_execution_events()
+    watch = events.watch(
+        correlation_id,
+        timeout=min(timeout, settings.pd_events_max_seconds),
+        poll_seconds=settings.pd_wait_storage_poll_seconds,
+    )
+
+    first = await anext(watch, None)
+    if first is None:
+        await watch.aclose()
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+    return StreamingResponse(
+        _sse(first, watch, request, settings.pd_events_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(name: str, data: dict) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+async def _sse(
+    first: dict,
+    watch: AsyncIterator[dict],
+    request: Request,
+    heartbeat_seconds: float,
+) -> AsyncIterator[bytes]:
+    last = first
+    next_record: Optional[asyncio.Future] = None
+
+    try:
+        yield _sse_event("status", ExecutionRecord(**first).model_dump())
+        next_record = asyncio.ensure_future(anext(watch, None))
+        while True:
+            done, _ = await asyncio.wait({next_record}, timeout=heartbeat_seconds)
+            if not done:
+                if await request.is_disconnected():
+                    return
+                yield b": keep-alive\n\n"
+                continue
+
+            record = next_record.result()
+            if record is None:
+                break
+            last = record
+            yield _sse_event("status", ExecutionRecord(**record).model_dump())
+            next_record = asyncio.ensure_future(anext(watch, None))
+
+        yield _sse_event(
+            "end",
+            {"correlation_id": last["correlation_id"], "completed": last.get("status") in TERMINAL_STATUSES},
+        )
+    finally:
+        if next_record is not None and not next_record.done():
+            next_record.cancel()
+            try:
+                await next_record
+            except asyncio.CancelledError:
+                pass
+        await watch.aclose()
@@ -0,0 +1,191 @@
+"""
+Incremental extraction of a structured summary from HL7v3 PD messages.
+
+``HL7v3SummaryParser`` is fed the callback body chunk by chunk (expat, no
+DOM) and stops consuming input as soon as every field relevant to the
+message's interaction has been seen.
+
+In a PRPA_IN201306UV02 response the ``queryAck`` (query id, result count)
+follows every matched ``subject``, which make up nearly all of the body.
+Once the first subject starts, the Python element handlers are switched
+off: expat keeps checking the document, subject start tags are counted
+with a byte scan, and the handlers come back on at ``queryAck``.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+from xml.parsers import expat
+
+QUERY_INTERACTION_PREFIX = "PRPA_IN201305"
+QUERY_ID_PARENTS = ("queryAck", "queryByParameter")
+
+_SUBJECT_TAG = re.compile(rb"<(?:[\w.-]+:)?subject(?:[\s/][^>]*)?>")
+_QUERY_ACK_TAG = re.compile(rb"<(?:[\w.-]+:)?queryAck[\s/>]")
+# Longest partial tag carried over to the next chunk's scan.
+_MAX_CARRY = 4096
+
+
+@dataclass
+class HL7v3Summary:
+    interaction_id: Optional[str] = None
+    query_id: Optional[str] = None
+    sender_oid: Optional[str] = None
+    receiver_oid: Optional[str] = None
+    acknowledgement_code: Optional[str] = None
+    match_count: Optional[int] = None
+    complete: bool = False
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class HL7v3SummaryParser:
+    """
+    Feed bytes with ``feed``; check ``done`` to stop early; call ``close``
+    to get the summary.
+
+    Fields (local element names, any namespace / SOAP wrapping):
+    - interaction_id: ``interactionId/@extension``
+    - query_id: ``queryAck|queryByParameter/queryId/@extension`` (or ``@root``)
+    - sender_oid / receiver_oid: ``sender|receiver/device/id/@root``
+    - acknowledgement_code: ``acknowledgement/typeCode/@code``
+    - match_count: ``queryAck/resultTotalQuantity/@value``, else the
+      number of ``controlActProcess/subject`` elements
+    """
+
+    def __init__(self) -> None:
+        self.summary = HL7v3Summary()
+        self._parser = expat.ParserCreate(namespace_separator="}")
+        self._path: list[str] = []
+        self._subjects = 0
+        self._done = False
+        # Subjects started: skip them from the next chunk on.
+        self._skip_pending = False
+        self._skipping = False
+        self._carry = b""
+        self._handlers(True)
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: bytes) -> None:
+        if self._done:
+            return
+        try:
+            if self._skip_pending and not self._skipping:
+                self._handlers(False)
+            if self._skipping:
+                self._feed_skipping(chunk)
+            else:
+                self._parser.Parse(chunk, False)
+                self._keep_partial_tag(self._carry + chunk)
+        except expat.ExpatError as e:
+            self.summary.error = str(e)
+            self._done = True
+
+    def close(self) -> HL7v3Summary:
+        if not self._done:
+            try:
+                self._parser.Parse(b"", True)
+            except expat.ExpatError as e:
+                self.summary.error = str(e)
+
+        if self.summary.match_count is None and self._subjects and not self._is_query():
+            self.summary.match_count = self._subjects
+
+        self.summary.complete = self._has_required_fields()
+        self._done = True
+        return self.summary
+
+    # ------------------------------------------------------------------
+    # INTERNALS
+    # ------------------------------------------------------------------
+
+    def _handlers(self, enabled: bool) -> None:
+        self._parser.StartElementHandler = self._start if enabled else None
+        self._parser.EndElementHandler = self._end if enabled else None
+        self._skipping = not enabled
+
+    def _feed_skipping(self, chunk: bytes) -> None:
+        # ``carry`` is the unterminated tag the previous chunk ended with (its
+        # start event has not fired yet), so no subject is counted twice.
+        window = self._carry + chunk
+        ack = _QUERY_ACK_TAG.search(window)
+        end = ack.start() if ack else len(window)
+        self._subjects += len(_SUBJECT_TAG.findall(window, 0, end))
+
+        if ack is None:
+            self._parser.Parse(chunk, False)
+            self._keep_partial_tag(window)
+            return
+
+        split = max(ack.start() - len(self._carry), 0)
+        self._parser.Parse(chunk[:split], False)
+        # Every subject has ended; resume inside controlActProcess.
+        if "controlActProcess" in self._path:
+            del self._path[len(self._path) - self._path[::-1].index("controlActProcess"):]
+        self._skip_pending = False
+        self._carry = b""
+        self._handlers(True)
+        self._parser.Parse(chunk[split:], False)
+
+    def _keep_partial_tag(self, window: bytes) -> None:
+        tag = window.rfind(b"<")
+        partial = window[tag:] if tag != -1 and b">" not in window[tag:] else b""
+        self._carry = partial[-_MAX_CARRY:]
+
+    def _end(self, tag: str) -> None:
+        self._path.pop()
+
+    def _start(self, tag: str, attrs: dict[str, str]) -> None:
+        summary = self.summary
+        name = _local(tag)
+        parent = self._path[-1] if self._path else None
+        grandparent = self._path[-2] if len(self._path) > 1 else None
+        self._path.append(name)
+
+        if name == "interactionId" and summary.interaction_id is None:
+            summary.interaction_id = attrs.get("extension")
+        elif name == "queryId" and parent in QUERY_ID_PARENTS and summary.query_id is None:
+            summary.query_id = attrs.get("extension") or attrs.get("root")
+        elif name == "id" and parent == "device":
+            if grandparent == "sender" and summary.sender_oid is None:
+                summary.sender_oid = attrs.get("root")
+            elif grandparent == "receiver" and summary.receiver_oid is None:
+                summary.receiver_oid = attrs.get("root")
+        elif name == "typeCode" and parent == "acknowledgement" and summary.acknowledgement_code is None:
+            summary.acknowledgement_code = attrs.get("code")
+        elif name == "resultTotalQuantity" and parent == "queryAck" and summary.match_count is None:
+            try:
+                summary.match_count = int(attrs.get("value", ""))
+            except ValueError:
+                pass
+        elif name == "subject" and parent == "controlActProcess":
+            self._subjects += 1
+            self._skip_pending = True
+        elif name == "queryAck":
+            self._skip_pending = False
+
+        if self._has_required_fields():
+            self._done = True
+
+    def _is_query(self) -> bool:
+        interaction = self.summary.interaction_id or ""
+        return interaction.startswith(QUERY_INTERACTION_PREFIX)
+
+    def _has_required_fields(self) -> bool:
+        s = self.summary
+        if None in (s.interaction_id, s.sender_oid, s.receiver_oid, s.query_id):
+            return False
+        if self._is_query():
+            # Queries carry no acknowledgement or results.
+            return True
+        return s.acknowledgement_code is not None and s.match_count is not None
@@ -0,0 +1,120 @@
+"""
+Streaming ingestion of PD callback bodies.
+
+The body is read chunk by chunk into a spooled temporary file (memory up
+to a threshold, disk beyond it) while the size, SHA-256 checksum, HL7v3
+message type and summary (see ``app.pd.hl7v3``) are computed on the fly.
+Nothing holds a second full copy of the payload.
+"""
+from __future__ import annotations
+
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO
+
+from fastapi import HTTPException, status
+
+from app.pd.hl7v3 import HL7v3Summary, HL7v3SummaryParser
+
+# Checked in this order; the first one present anywhere in the body wins.
+MESSAGE_MARKERS = (
+    (b"PRPA_IN201305", "PRPA_IN201305UV02"),
+    (b"PRPA_IN201306", "PRPA_IN201306UV02"),
+)
+MESSAGE_TYPES = frozenset(message_type for _, message_type in MESSAGE_MARKERS)
+
+
+class MessageTypeSniffer:
+    """
+    Incremental substring classifier. Keeps a short tail of the previous
+    chunk so markers split across chunk boundaries are still found.
+    """
+
+    def __init__(self) -> None:
+        self._found: set[bytes] = set()
+        self._tail = b""
+        self._overlap = max(len(marker) for marker, _ in MESSAGE_MARKERS) - 1
+
+    def feed(self, chunk: bytes) -> None:
+        window = self._tail + chunk
+        for marker, _ in MESSAGE_MARKERS:
+            if marker not in self._found and marker in window:
+                self._found.add(marker)
+        self._tail = window[-self._overlap:]
+
+    @property
+    def message_type(self) -> str:
+        for marker, message_type in MESSAGE_MARKERS:
+            if marker in self._found:
+                return message_type
+        return "UNKNOWN"
+
+
+@dataclass
+class IngestedPayload:
+    file: BinaryIO
+    size: int
+    sha256: str
+    message_type: str
+    summary: HL7v3Summary
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def ingest_body(
+    chunks: AsyncIterator[bytes],
+    max_bytes: int,
+    spool_bytes: int,
+    declared_length: int | None = None,
+) -> IngestedPayload:
+    """
+    Consume ``chunks`` into a spooled file, enforcing ``max_bytes``.
+    The returned file is rewound; the caller owns closing it.
+    """
+    if declared_length is not None and declared_length > max_bytes:
+        raise _too_large(max_bytes)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    digest = hashlib.sha256()
+    sniffer = MessageTypeSniffer()
+    parser = HL7v3SummaryParser()
+    size = 0
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            digest.update(chunk)
+            sniffer.feed(chunk)
+            # The parser stops consuming once it has every summary field.
+            if not parser.done:
+                parser.feed(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    summary = parser.close()
+    # Prefer the declared interaction over the substring scan, but only a
+    # PD one: any other interactionId would leave the classification.
+    declared = summary.interaction_id
+    return IngestedPayload(
+        file=spool,
+        size=size,
+        sha256=digest.hexdigest(),
+        message_type=declared if declared in MESSAGE_TYPES else sniffer.message_type,
+        summary=summary,
+    )
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Callback body exceeds {max_bytes} bytes",
+    )
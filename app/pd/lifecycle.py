@@ -0,0 +1,185 @@
+"""
+End-to-end PD lifecycle latency: trigger -> Mirth ack -> callback.
+
+Executions carry one timestamp per phase (naive UTC ISO, like
+``triggered_at``):
+- ``triggered_at``: execution created;
+- ``forwarded_at``: dispatch to Mirth started;
+- ``acknowledged_at``: Mirth accepted the trigger (2xx);
+- ``received_at``: callback arrived;
+- ``classified_at``: callback payload stored and classified.
+
+When a callback is recorded, ``phase_durations`` turns these into
+millisecond segments. They are written to the PD artifact and added to a
+rolling window per (message_type, partner), where partner is the sender
+OID of the callback (the responding gateway). The window is per worker
+process; ``/api/pd/stats`` remains the cross-worker, historical view.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from app.config.settings import get_settings
+from app.pd.analytics import PERCENTILES, parse_timestamp
+from app.storage.base import ExecutionQuery, ExecutionStore
+
+# (segment, start phase, end phase)
+SEGMENTS = (
+    ("dispatch", "triggered_at", "forwarded_at"),
+    ("mirth_ack", "forwarded_at", "acknowledged_at"),
+    ("gateway", "acknowledged_at", "received_at"),
+    ("classify", "received_at", "classified_at"),
+    ("end_to_end", "triggered_at", "received_at"),
+)
+PHASES = ("triggered_at", "forwarded_at", "acknowledged_at", "received_at", "classified_at")
+
+# Statuses of executions still waiting for their callback.
+PENDING_STATUSES = ("QUEUED", "TRIGGERED", "FORWARDED")
+
+UNKNOWN = "UNKNOWN"
+
+
+def phase_durations(execution: dict[str, Any]) -> dict[str, float]:
+    """
+    Milliseconds per segment; segments with a missing (or out of order)
+    timestamp are left out.
+    """
+    stamps = {phase: parse_timestamp(execution.get(phase)) for phase in PHASES}
+    durations = {}
+    for segment, start, end in SEGMENTS:
+        if stamps[start] and stamps[end] and stamps[end] >= stamps[start]:
+            durations[segment] = round((stamps[end] - stamps[start]).total_seconds() * 1000, 3)
+    return durations
+
+
+def partner_of(summary: Optional[dict[str, Any]]) -> str:
+    return (summary or {}).get("sender_oid") or UNKNOWN
+
+
+def _latency_summary(values: list[float]) -> dict[str, Any]:
+    """Exact nearest-rank percentiles over the window's samples."""
+    values = sorted(values)
+    summary: dict[str, Any] = {
+        "count": len(values),
+        "min": values[0] if values else None,
+        "max": values[-1] if values else None,
+        "mean": round(sum(values) / len(values), 3) if values else None,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = values[max(math.ceil(pct / 100 * len(values)) - 1, 0)] if values else None
+    return summary
+
+
+class LifecycleTracker:
+    """
+    Rolling per-(message_type, partner) samples of the phase durations.
+    Thread-safe: callbacks are recorded from background tasks.
+    """
+
+    def __init__(self, window_seconds: float, max_samples: int):
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        # key -> deque of (monotonic time, durations, sla_breached)
+        self._samples: dict[tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        message_type: Optional[str],
+        partner: str,
+        durations: dict[str, float],
+        sla_breached: bool = False,
+    ) -> None:
+        key = (message_type or UNKNOWN, partner)
+        now = time.monotonic()
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.max_samples)
+            samples.append((now, durations, sla_breached))
+            self._expire(samples, now)
+
+    def summaries(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            for key in list(self._samples):
+                self._expire(self._samples[key], now)
+                if not self._samples[key]:
+                    del self._samples[key]
+            snapshot = {key: list(samples) for key, samples in self._samples.items()}
+
+        summaries = []
+        for (message_type, partner), samples in sorted(snapshot.items()):
+            summaries.append({
+                "message_type": message_type,
+                "partner": partner,
+                "count": len(samples),
+                "sla_breaches": sum(1 for _, _, breached in samples if breached),
+                "phases_ms": {
+                    segment: _latency_summary([d[segment] for _, d, _ in samples if segment in d])
+                    for segment, _, _ in SEGMENTS
+                },
+            })
+        return summaries
+
+    def _expire(self, samples: deque, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+
+
+def find_overdue(
+    store: ExecutionStore,
+    sla_seconds: float,
+    limit: int,
+    now: Optional[datetime] = None,
+    statuses: Iterable[str] = PENDING_STATUSES,
+) -> tuple[list[dict[str, Any]], bool]:
+    """
+    Executions still without a callback ``sla_seconds`` after the trigger,
+    most recently triggered first, and whether the list was cut at
+    ``limit``. Requires a backend with ``supports_queries``.
+    """
+    now = now or datetime.utcnow()
+    cutoff = (now - timedelta(seconds=sla_seconds)).isoformat()
+
+    overdue = []
+    truncated = False
+    for status in statuses:
+        page = store.list_executions(ExecutionQuery(status=status, triggered_before=cutoff, limit=limit))
+        overdue.extend(page.items)
+        truncated = truncated or page.next_cursor is not None
+
+    overdue.sort(key=lambda record: record.get("triggered_at") or "", reverse=True)
+    truncated = truncated or len(overdue) > limit
+
+    items = []
+    for record in overdue[:limit]:
+        triggered = parse_timestamp(record.get("triggered_at"))
+        items.append({
+            "correlation_id": record["correlation_id"],
+            "status": record.get("status"),
+            "triggered_at": record.get("triggered_at"),
+            "age_seconds": round((now - triggered).total_seconds(), 3) if triggered else None,
+            "last_phase": next((phase for phase in reversed(PHASES) if record.get(phase)), None),
+        })
+    return items, truncated
+
+
+_tracker: LifecycleTracker | None = None
+
+
+def get_lifecycle_tracker() -> LifecycleTracker:
+    global _tracker
+    if _tracker is None:
+        settings = get_settings()
+        _tracker = LifecycleTracker(
+            window_seconds=settings.pd_lifecycle_window_seconds,
+            max_samples=settings.pd_lifecycle_max_samples,
+        )
+    return _tracker
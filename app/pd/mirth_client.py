@@ -1,30 +1,30 @@
 import httpx
 import logging
-from app.config.settings import get_settings
 
-logger = logging.getLogger("pd.mirth")
-
-
-async def send_pd_request(payload: dict) -> tuple[int, str]:
-    settings = get_settings()
+from app.utils.http_clients import MIRTH, get_http_clients
 
-    logger.info("📡 Preparing HTTP POST to Mirth")
-    logger.info("📍 Mirth endpoint: %s", settings.PD_ENDPOINT_URL)
-    logger.info("📦 Payload: %s", payload)
-
-    async def send_pd_request(
-            endpoint_url: str,
-            payload: dict,
-    ) -> None:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(
-                endpoint_url,
-                json=payload,
-                headers={
-                    "Content-Type": "application/json",
-                },
-            )
-
-            response.raise_for_status()
+logger = logging.getLogger("pd.mirth")
 
 
+async def send_pd_request(
+    endpoint_url: str,
+    payload: dict,
+    client: httpx.AsyncClient | None = None,
+) -> tuple[int, str]:
+    # Payloads carry patient references / demographics: log the id only.
+    logger.debug("POST to Mirth", extra={
+        "endpoint": endpoint_url,
+        "correlation_id": payload.get("correlation_id"),
+    })
+
+    client = client or get_http_clients().get(MIRTH)
+    response = await client.post(
+        endpoint_url,
+        json=payload,
+        headers={
+            "Content-Type": "application/json",
+        },
+    )
+
+    response.raise_for_status()
+    return response.status_code, response.text
@@ -1,13 +1,113 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Any, Optional
+
+from app.storage.base import hash_patient_reference
 
 
 class PatientDiscoveryRequest(BaseModel):
     patient_reference: str
 
 
+class PatientDiscoveryBatchRequest(BaseModel):
+    patient_references: list[str] = Field(min_length=1)
+
+
 class PatientDiscoveryResponse(BaseModel):
     correlation_id: str
     forwarded: bool
     downstream_status: Optional[int]
     message: str
+
+
+class ExecutionRecord(BaseModel):
+    """
+    PD execution as stored; later pipeline stages add extra fields.
+    The cleartext patient_reference (PHI) is replaced by its hash.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    correlation_id: str
+    status: str
+    patient_reference_hash: Optional[str] = None
+    message_type: Optional[str] = None
+    triggered_at: Optional[str] = None
+    received_at: Optional[str] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _hash_patient_reference(cls, data: Any) -> Any:
+        if isinstance(data, dict) and "patient_reference" in data:
+            data = dict(data)
+            reference = data.pop("patient_reference")
+            if reference and not data.get("patient_reference_hash"):
+                data["patient_reference_hash"] = hash_patient_reference(reference)
+        return data
+
+
+class ExecutionWaitResult(BaseModel):
+    # False when the wait timed out before a terminal status.
+    completed: bool
+    execution: ExecutionRecord
+
+
+class ExecutionPage(BaseModel):
+    items: list[ExecutionRecord]
+    next_cursor: Optional[str] = None
+
+
+class LatencySummary(BaseModel):
+    count: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+
+class DayStats(BaseModel):
+    date: str
+    total: int
+    by_status: dict[str, int]
+
+
+class PDStats(BaseModel):
+    environment: str
+    start: str
+    end: str
+    total: int
+    by_status: dict[str, int]
+    by_message_type: dict[str, int]
+    by_acknowledgement: dict[str, int]
+    latency_ms: LatencySummary
+    days: list[DayStats]
+    cached_days: int
+
+
+class LifecycleSummary(BaseModel):
+    message_type: str
+    # Sender OID of the callback (the responding gateway).
+    partner: str
+    count: int
+    sla_breaches: int
+    # dispatch, mirth_ack, gateway, classify, end_to_end
+    phases_ms: dict[str, LatencySummary]
+
+
+class OverdueExecution(BaseModel):
+    correlation_id: str
+    status: Optional[str] = None
+    triggered_at: Optional[str] = None
+    age_seconds: Optional[float] = None
+    last_phase: Optional[str] = None
+
+
+class LifecycleStats(BaseModel):
+    window_seconds: float
+    sla_seconds: float
+    summaries: list[LifecycleSummary]
+    # None when the storage backend cannot list executions.
+    overdue: Optional[list[OverdueExecution]] = None
+    overdue_truncated: bool = False
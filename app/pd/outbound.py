@@ -0,0 +1,248 @@
+"""
+Background dispatcher pool for the async trigger mode.
+
+``PD_TRIGGER_MODE=async`` makes ``POST /api/pd/trigger/`` record the
+execution as QUEUED, enqueue it in the durable ``OutboundQueue`` and
+return. ``OutboundDispatcher`` runs ``pd_outbound_workers`` tasks that
+claim items and send them through the shared ``MirthDispatcher`` (so the
+breaker and in-flight cap still apply). Each round either completes the
+item (FORWARDED / FORWARD_FAILED) or reschedules it with backoff.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from app.config.settings import Settings, get_settings
+from app.pd.dispatch import RETRYABLE_STATUS, DispatchResult, MirthDispatcher, get_mirth_dispatcher
+from app.pd.analytics import record_pd_outcome
+from app.pd.events import get_execution_events
+from app.pd.storage import PDStorage, get_storage_writer
+from app.storage.outbound import OutboundItem, OutboundQueue
+from app.utils.log_pipeline import correlation_context
+
+logger = logging.getLogger("pd.outbound")
+
+OUTBOUND_FILENAME = "outbound.sqlite3"
+
+ASYNC_MODE = "async"
+
+# Statuses the queue may move an execution out of. A callback that raced
+# ahead of the FORWARDED update (RESPONSE_RECEIVED) is never overwritten.
+_PENDING_STATUSES = ["QUEUED"]
+
+
+class OutboundDispatcher:
+    def __init__(
+        self,
+        settings: Settings,
+        queue: OutboundQueue,
+        dispatcher: Optional[MirthDispatcher] = None,
+    ):
+        self.settings = settings
+        self.queue = queue
+        self._dispatcher = dispatcher
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._stopping = False
+
+    @property
+    def dispatcher(self) -> MirthDispatcher:
+        return self._dispatcher or get_mirth_dispatcher()
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._workers)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"pd-outbound-{i}")
+            for i in range(self.settings.pd_outbound_workers)
+        ]
+        # Items left over from a previous run are picked up immediately.
+        self._wakeup.set()
+
+    async def enqueue(self, correlation_id: str, endpoint_url: str, payload: dict[str, Any]) -> None:
+        await asyncio.to_thread(self.queue.enqueue, correlation_id, endpoint_url, payload)
+        if not self.running:
+            self.start()
+        self._wakeup.set()
+
+    async def enqueue_many(self, items: list[tuple[str, str, dict[str, Any]]]) -> None:
+        await asyncio.to_thread(self.queue.enqueue_many, items)
+        if not self.running:
+            self.start()
+        self._wakeup.set()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Let in-flight dispatches finish (up to ``timeout``), then cancel.
+        Unfinished items stay in the queue for the next start.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if not self._workers:
+            return
+        done, pending = await asyncio.wait(self._workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._workers = []
+
+    def depth(self) -> int:
+        return self.queue.depth()
+
+    # ------------------------------------------------------------------
+    # WORKERS
+    # ------------------------------------------------------------------
+
+    async def _worker(self, index: int) -> None:
+        while not self._stopping:
+            try:
+                item = await asyncio.to_thread(self.queue.claim, self.settings.pd_outbound_lease_seconds)
+            except Exception:
+                logger.exception("Outbound claim failed")
+                item = None
+
+            if item is None:
+                await self._idle()
+                continue
+
+            # Another item may be waiting: let an idle sibling pick it up.
+            self._wakeup.set()
+
+            try:
+                with correlation_context(item.correlation_id):
+                    await self._process(item)
+            except asyncio.CancelledError:
+                # Shutdown mid-dispatch: hand the item back untouched.
+                self.queue.release(item.correlation_id)
+                raise
+            except Exception:
+                logger.exception("Outbound dispatch of %s failed", item.correlation_id)
+                await asyncio.to_thread(
+                    self.queue.retry_later,
+                    item.correlation_id,
+                    self._backoff(item.attempts),
+                    "internal error",
+                )
+
+    async def _idle(self) -> None:
+        self._wakeup.clear()
+        timeout = self.settings.pd_outbound_poll_seconds
+        try:
+            ready_in = await asyncio.to_thread(self.queue.next_available_in)
+        except Exception:
+            ready_in = None
+        if ready_in is not None:
+            timeout = min(timeout, ready_in) if ready_in > 0 else 0
+        if timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _process(self, item: OutboundItem) -> None:
+        forwarded_at = datetime.utcnow().isoformat()
+        result = await self.dispatcher.dispatch(item.endpoint_url, item.payload)
+        writer = get_storage_writer()
+
+        if result.forwarded:
+            await writer.transition_status(
+                correlation_id=item.correlation_id,
+                from_statuses=_PENDING_STATUSES,
+                to_status="FORWARDED",
+                update={
+                    **self._result_fields(item, result),
+                    "forwarded_at": forwarded_at,
+                    "acknowledged_at": datetime.utcnow().isoformat(),
+                },
+            )
+            get_execution_events().publish(item.correlation_id)
+            await asyncio.to_thread(self.queue.complete, item.correlation_id)
+            return
+
+        permanent = result.downstream_status is not None and result.downstream_status not in RETRYABLE_STATUS
+        if permanent or item.attempts >= self.settings.pd_outbound_max_attempts:
+            logger.warning(
+                "Giving up on %s after %d rounds: %s", item.correlation_id, item.attempts, result.error
+            )
+            await writer.transition_status(
+                correlation_id=item.correlation_id,
+                from_statuses=_PENDING_STATUSES,
+                to_status="FORWARD_FAILED",
+                update=self._result_fields(item, result),
+            )
+            get_execution_events().publish(item.correlation_id)
+            await asyncio.to_thread(self.queue.complete, item.correlation_id)
+            await asyncio.to_thread(_record_failure, item, result)
+            return
+
+        delay = max(self._backoff(item.attempts), result.retry_after or 0.0)
+        await asyncio.to_thread(self.queue.retry_later, item.correlation_id, delay, result.error)
+        await writer.update_execution(
+            correlation_id=item.correlation_id,
+            update={"forward_rounds": item.attempts, "forward_error": result.error},
+        )
+
+    def _backoff(self, rounds: int) -> float:
+        s = self.settings
+        return min(s.pd_outbound_retry_max_seconds, s.pd_outbound_retry_base_seconds * (2 ** (rounds - 1)))
+
+    @staticmethod
+    def _result_fields(item: OutboundItem, result: DispatchResult) -> dict[str, Any]:
+        return {
+            "forward_rounds": item.attempts,
+            "forward_attempts": result.attempts,
+            "downstream_status": result.downstream_status,
+            "forward_error": result.error,
+        }
+
+
+def _record_failure(item: OutboundItem, result: DispatchResult) -> None:
+    record_pd_outcome(
+        item.correlation_id,
+        status="FORWARD_FAILED",
+        execution=PDStorage().get_execution(item.correlation_id),
+        error=result.error,
+        attempts=result.attempts,
+        rounds=item.attempts,
+    )
+
+
+# -------------------------------------------------------------------
+# Global dispatcher pool
+# -------------------------------------------------------------------
+
+_outbound: OutboundDispatcher | None = None
+
+
+def async_trigger_enabled(settings: Settings) -> bool:
+    return settings.pd_trigger_mode.lower() == ASYNC_MODE
+
+
+def get_outbound_dispatcher() -> OutboundDispatcher:
+    global _outbound
+    if _outbound is None:
+        settings = get_settings()
+        _outbound = OutboundDispatcher(
+            settings,
+            OutboundQueue(Path(settings.pd_storage_dir) / OUTBOUND_FILENAME),
+        )
+    return _outbound
+
+
+async def close_outbound_dispatcher() -> None:
+    global _outbound
+    if _outbound is not None:
+        await _outbound.stop()
+        _outbound.queue.close()
+        _outbound = None
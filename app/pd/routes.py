@@ -1,9 +1,13 @@
 from fastapi import APIRouter
 
 from app.pd.callback_routes import router as callback_router
+from app.pd.execution_routes import router as execution_router
+from app.pd.stats_routes import router as stats_router
 from app.pd.trigger_routes import router as trigger_router
 
 router = APIRouter(prefix="/api/pd", tags=["patient-discovery"])
 
 router.include_router(callback_router)
+router.include_router(execution_router)
+router.include_router(stats_router)
 router.include_router(trigger_router)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.config.settings import Settings, get_settings
+from app.pd.analytics import get_stats_service
+from app.pd.lifecycle import find_overdue, get_lifecycle_tracker
+from app.pd.models import LifecycleStats, PDStats
+from app.pd.storage import PDStorage
+
+router = APIRouter()
+
+DEFAULT_RANGE_DAYS = 7
+MAX_RANGE_DAYS = 366
+
+
+# Sync handler: partition reads run in the threadpool.
+@router.get("/stats", response_model=PDStats)
+def get_pd_stats(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    environment: Optional[str] = None,
+    settings: Settings = Depends(get_settings),
+) -> PDStats:
+    """
+    Counts, status breakdowns and latency percentiles for PD exchanges
+    recorded between ``start`` and ``end`` (inclusive, UTC days).
+    Defaults to the last 7 days of the current environment.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range exceeds {MAX_RANGE_DAYS} days")
+
+    stats = get_stats_service(settings).stats(environment or settings.environment, start, end)
+    return PDStats(**stats)
+
+
+@router.get("/stats/lifecycle", response_model=LifecycleStats)
+def get_pd_lifecycle(
+    overdue_limit: int = Query(default=100, ge=0, le=1000),
+    settings: Settings = Depends(get_settings),
+) -> LifecycleStats:
+    """
+    Rolling phase latency percentiles (trigger -> Mirth ack -> callback)
+    per message type and partner over the last
+    ``pd_lifecycle_window_seconds`` on this worker, plus the executions
+    still without a callback past ``pd_callback_sla_seconds``.
+    """
+    overdue, truncated = None, False
+    backend = PDStorage().backend
+    # Without execution queries (json backend) ``overdue`` stays null.
+    if overdue_limit and backend.supports_queries:
+        overdue, truncated = find_overdue(
+            backend,
+            sla_seconds=settings.pd_callback_sla_seconds,
+            limit=overdue_limit,
+        )
+
+    return LifecycleStats(
+        window_seconds=settings.pd_lifecycle_window_seconds,
+        sla_seconds=settings.pd_callback_sla_seconds,
+        summaries=get_lifecycle_tracker().summaries(),
+        overdue=overdue,
+        overdue_truncated=truncated,
+    )
@@ -1,57 +1,166 @@
-import json
+from __future__ import annotations
+
+import io
 from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Optional
+
+from app.config.settings import Settings, get_settings
+from app.storage.base import ExecutionPage, ExecutionQuery, ExecutionStore
+from app.storage.blobs import BlobStore
+from app.storage.json_files import JSONFileStore
+from app.storage.sqlite import SQLiteExecutionStore
+from app.storage.writer import StorageWriter
+
+SQLITE_FILENAME = "pd.sqlite3"
+BLOB_DIRNAME = "blobs"
+
+
+def build_blob_store(settings: Settings) -> BlobStore | None:
+    if settings.pd_blob_codec.lower() == "off":
+        return None
+    return BlobStore(
+        Path(settings.pd_storage_dir) / BLOB_DIRNAME,
+        codec=settings.pd_blob_codec.lower(),
+        level=settings.pd_blob_compress_level,
+    )
+
+
+def build_execution_store(settings: Settings) -> ExecutionStore:
+    backend = settings.pd_storage_backend.lower()
+    blobs = build_blob_store(settings)
+
+    if backend == "sqlite":
+        return SQLiteExecutionStore(Path(settings.pd_storage_dir) / SQLITE_FILENAME, blobs=blobs)
+
+    if backend == "json":
+        return JSONFileStore(settings.pd_storage_dir, blobs=blobs)
+
+    raise ValueError(f"Unknown PD_STORAGE_BACKEND: {settings.pd_storage_backend}")
+
+
+_execution_store: ExecutionStore | None = None
+
+
+def get_execution_store() -> ExecutionStore:
+    global _execution_store
+    if _execution_store is None:
+        _execution_store = build_execution_store(get_settings())
+    return _execution_store
+
+
+def close_execution_store() -> None:
+    global _execution_store
+    if _execution_store is not None:
+        _execution_store.close()
+        _execution_store = None
 
-BASE_DIR = Path("data/pd")
-BASE_DIR.mkdir(parents=True, exist_ok=True)
+
+_storage_writer: StorageWriter | None = None
+
+
+def get_storage_writer() -> StorageWriter:
+    """
+    Shared background writer used by request handlers so storage I/O
+    never runs on the event loop.
+    """
+    global _storage_writer
+    if _storage_writer is None:
+        settings = get_settings()
+        _storage_writer = StorageWriter(
+            get_execution_store(),
+            max_queue=settings.pd_write_queue_size,
+            max_batch=settings.pd_write_batch_size,
+        )
+    return _storage_writer
+
+
+async def close_storage_writer() -> None:
+    """
+    Flush every queued write, then stop the writer thread.
+    """
+    global _storage_writer
+    if _storage_writer is not None:
+        await _storage_writer.aclose()
+        _storage_writer = None
 
 
 class PDStorage:
+    """
+    Facade used by the PD routes. Delegates to the configured backend
+    (``PD_STORAGE_BACKEND``: ``sqlite`` by default, ``json`` for the
+    legacy one-file-per-record layout).
+    """
+
+    def __init__(self, backend: ExecutionStore | None = None):
+        self.backend = backend or get_execution_store()
+
     def save_pd_response(
         self,
         correlation_id: str,
-        payload: str,
+        payload: str | BinaryIO,
         payload_type: str,
         message_type: str,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None,
     ) -> None:
-        path = BASE_DIR / f"{correlation_id}_response.json"
-        path.write_text(
-            json.dumps(
-                {
-                    "payload_type": payload_type,
-                    "message_type": message_type,
-                    "payload": payload,
-                },
-                indent=2,
-            ),
-            encoding="utf-8",
+        self.backend.save_pd_response(
+            correlation_id=correlation_id,
+            payload=payload,
+            payload_type=payload_type,
+            message_type=message_type,
+            size=size,
+            sha256=sha256,
         )
 
     def update_execution(self, correlation_id: str, update: dict) -> None:
-        path = BASE_DIR / f"{correlation_id}_execution.json"
-        if not path.exists():
-            return
+        self.backend.update_execution(correlation_id, update)
 
-        data = json.loads(path.read_text(encoding="utf-8"))
-        data.update(update)
-        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    def transition_status(
+        self,
+        correlation_id: str,
+        from_statuses: Iterable[str],
+        to_status: str,
+        update: Optional[dict] = None,
+    ) -> bool:
+        return self.backend.transition_status(correlation_id, from_statuses, to_status, update)
 
     def create_execution(
         self,
         correlation_id: str,
-        patient_reference: str,
+        patient_reference: Optional[str],
         status: str,
         triggered_at: str,
     ) -> None:
-        path = BASE_DIR / f"{correlation_id}_execution.json"
-        path.write_text(
-            json.dumps(
-                {
-                    "correlation_id": correlation_id,
-                    "patient_reference": patient_reference,
-                    "status": status,
-                    "triggered_at": triggered_at,
-                },
-                indent=2,
-            ),
-            encoding="utf-8",
+        self.backend.create_execution(
+            correlation_id=correlation_id,
+            patient_reference=patient_reference,
+            status=status,
+            triggered_at=triggered_at,
         )
+
+    def get_execution(self, correlation_id: str) -> Optional[dict[str, Any]]:
+        return self.backend.get_execution(correlation_id)
+
+    @property
+    def supports_queries(self) -> bool:
+        return self.backend.supports_queries
+
+    def list_executions(self, query: ExecutionQuery) -> ExecutionPage:
+        return self.backend.list_executions(query)
+
+    def open_pd_response(self, correlation_id: str) -> Optional[tuple[dict[str, Any], BinaryIO]]:
+        """
+        Response metadata and a readable (decompressed) payload stream.
+        The caller closes the stream.
+        """
+        response = self.backend.get_pd_response(correlation_id)
+        if response is None:
+            return None
+
+        blob = response.pop("blob", None)
+        if blob is not None:
+            if self.backend.blobs is None:
+                raise RuntimeError("Response is stored as a blob but no blob store is configured")
+            return response, self.backend.blobs.open(blob)
+
+        return response, io.BytesIO(response.pop("payload") or b"")
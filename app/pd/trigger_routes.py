@@ -1,19 +1,37 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, Depends, Request, HTTPException
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.config.settings import Settings, get_settings
-from app.pd.storage import PDStorage
-from app.pd.mirth_client import send_pd_request
+from app.pd.analytics import record_pd_outcome
+from app.pd.coalesce import get_trigger_coalescer
+from app.pd.events import get_execution_events
+from app.pd.storage import get_storage_writer
+from app.pd.dispatch import forward_execution
+from app.pd.models import PatientDiscoveryBatchRequest
+from app.pd.outbound import async_trigger_enabled, get_outbound_dispatcher
+from app.utils.log_pipeline import correlation_context
 
 router = APIRouter(prefix="/api/pd", tags=["patient-discovery"])
+# Mounted on the app only: ``router`` is also nested in the PD router,
+# which serves the single trigger a second time under /api/pd/api/pd.
+batch_router = APIRouter(prefix="/api/pd", tags=["patient-discovery"])
+
+logger = logging.getLogger("pd.trigger")
 
 
 @router.post("/trigger/")
 async def trigger_patient_discovery(
     request: Request,
+    response: Response,
     settings: Settings = Depends(get_settings),
 ) -> dict:
     body = await request.json()
@@ -28,38 +46,218 @@ async def trigger_patient_discovery(
             detail="pd_endpoint_url is not configured",
         )
 
+    async def trigger() -> dict:
+        return await _trigger_one(settings, patient_reference)
+
+    if body.get("force"):
+        # Explicit re-query: skip de-duplication.
+        result = await trigger()
+    else:
+        result = await get_trigger_coalescer().run(patient_reference, trigger)
+
+    if result.get("queued"):
+        response.status_code = 202
+    return result
+
+
+async def _trigger_one(settings: Settings, patient_reference: str) -> dict:
     correlation_id = str(uuid.uuid4())
-    storage = PDStorage()
+    triggered_at = datetime.utcnow().isoformat()
+    mirth_payload = {
+        "patient_reference": patient_reference,
+        "correlation_id": correlation_id,
+    }
 
-    storage.create_execution(
-        correlation_id=correlation_id,
-        patient_reference=patient_reference,
-        status="TRIGGERED",
-        triggered_at=datetime.utcnow().isoformat(),
-    )
+    with correlation_context(correlation_id):
+        queued = async_trigger_enabled(settings)
 
-    try:
-        print("📡 Posting PD trigger to Mirth:", settings.pd_endpoint_url)
+        # Wait for the record to be committed so a fast callback (possibly on
+        # another worker) always finds it.
+        await get_storage_writer().create_execution(
+            wait=True,
+            correlation_id=correlation_id,
+            patient_reference=patient_reference,
+            status="QUEUED" if queued else "TRIGGERED",
+            triggered_at=triggered_at,
+        )
 
-        await send_pd_request(
-            endpoint_url=settings.pd_endpoint_url,
-            payload={
-                "patient_reference": patient_reference,
+        if queued:
+            # Durable hand-off: the dispatcher pool forwards it to Mirth.
+            await get_outbound_dispatcher().enqueue(correlation_id, settings.pd_endpoint_url, mirth_payload)
+            return {
                 "correlation_id": correlation_id,
-            },
+                "status": "QUEUED",
+                "forwarded": False,
+                "queued": True,
+            }
+
+        result = await forward_execution(settings.pd_endpoint_url, mirth_payload, triggered_at)
+
+        if not result.forwarded:
+            logger.warning("PD trigger not forwarded to Mirth", extra={
+                "attempts": result.attempts,
+                "circuit": result.circuit,
+                "error": result.error,
+            })
+        else:
+            logger.info("PD trigger forwarded to Mirth", extra={"attempts": result.attempts})
+
+    return {"correlation_id": correlation_id, **result.to_dict()}
+
+
+@batch_router.post("/trigger/batch")
+async def trigger_patient_discovery_batch(
+    body: PatientDiscoveryBatchRequest,
+    settings: Settings = Depends(get_settings),
+) -> StreamingResponse:
+    """
+    Trigger PD for many patients at once.
+
+    Executions are created in bulk, then forwarded to Mirth with at most
+    ``pd_batch_concurrency`` dispatches in flight (or handed to the
+    outbound queue in async mode). One NDJSON line is streamed per
+    reference as it completes, carrying its ``index`` in the request.
+    """
+    references = body.patient_references
+    if len(references) > settings.pd_batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.pd_batch_max_items} patient_references per batch",
         )
+    if not all(ref.strip() for ref in references):
+        raise HTTPException(status_code=400, detail="patient_references must not be blank")
 
-        print("✅ Mirth trigger sent")
+    if not settings.pd_endpoint_url:
+        raise HTTPException(
+            status_code=500,
+            detail="pd_endpoint_url is not configured",
+        )
 
-    except Exception as e:
-        print("🔥 MIRTH CALL FAILED:", repr(e))
-        return {
-            "correlation_id": correlation_id,
-            "forwarded": False,
-            "error": str(e),
-        }
+    queued = async_trigger_enabled(settings)
+    triggered_at = datetime.utcnow().isoformat()
+    items = [(str(uuid.uuid4()), reference) for reference in references]
 
-    return {
-        "correlation_id": correlation_id,
-        "forwarded": True,
-    }
+    # The writer applies ops in order, so waiting on the last create means
+    # the whole batch is committed (in group commits) before any dispatch.
+    writer = get_storage_writer()
+    for position, (correlation_id, reference) in enumerate(items):
+        await writer.create_execution(
+            wait=position == len(items) - 1,
+            correlation_id=correlation_id,
+            patient_reference=reference,
+            status="QUEUED" if queued else "TRIGGERED",
+            triggered_at=triggered_at,
+        )
+
+    payloads = [
+        {"patient_reference": reference, "correlation_id": correlation_id}
+        for correlation_id, reference in items
+    ]
+
+    if queued:
+        await get_outbound_dispatcher().enqueue_many(
+            [(payload["correlation_id"], settings.pd_endpoint_url, payload) for payload in payloads]
+        )
+        lines = (
+            _ndjson({"index": index, "correlation_id": payload["correlation_id"], "status": "QUEUED", "queued": True})
+            for index, payload in enumerate(payloads)
+        )
+        return StreamingResponse(lines, status_code=202, media_type=NDJSON_MEDIA_TYPE)
+
+    return StreamingResponse(
+        _fan_out(settings, payloads, triggered_at),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _ndjson(item: dict) -> bytes:
+    return json.dumps(item, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+async def _fan_out(settings: Settings, payloads: list[dict], triggered_at: str) -> AsyncIterator[bytes]:
+    """
+    Dispatch with a fixed pool of workers and yield results as they finish.
+    Workers are cancelled if the client goes away; references that were
+    not dispatched by then are marked FORWARD_FAILED.
+    """
+    pending = iter(enumerate(payloads))
+    results: asyncio.Queue = asyncio.Queue()
+    finished: set[int] = set()
+
+    async def worker() -> None:
+        for index, payload in pending:
+            try:
+                with correlation_context(payload["correlation_id"]):
+                    result = (await forward_execution(settings.pd_endpoint_url, payload, triggered_at)).to_dict()
+            except Exception as e:
+                result = {"forwarded": False, "error": str(e) or type(e).__name__}
+            finished.add(index)
+            await results.put({"index": index, "correlation_id": payload["correlation_id"], **result})
+
+    workers = [
+        asyncio.create_task(worker())
+        # More workers than Mirth slots would only wait on the dispatcher.
+        for _ in range(min(settings.pd_batch_concurrency, settings.mirth_max_in_flight, len(payloads)))
+    ]
+    try:
+        for _ in range(len(payloads)):
+            yield _ndjson(await results.get())
+    finally:
+        for task in workers:
+            task.cancel()
+        unfinished = [payload for index, payload in enumerate(payloads) if index not in finished]
+        if unfinished:
+            # The response is being cancelled, so awaiting here could be
+            # interrupted again: settle the rest from a task of its own.
+            task = asyncio.create_task(_fail_unfinished(workers, unfinished, triggered_at))
+            _cleanup_tasks.add(task)
+            task.add_done_callback(_cleanup_tasks.discard)
+        else:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+# Strong references to running cleanups (the loop only keeps weak ones).
+_cleanup_tasks: set[asyncio.Task] = set()
+
+CANCELLED_ERROR = "Batch request cancelled before the trigger was forwarded"
+
+
+async def _fail_unfinished(workers: list[asyncio.Task], payloads: list[dict], triggered_at: str) -> None:
+    """
+    Mark batch references left TRIGGERED by a cancelled stream as
+    FORWARD_FAILED, once the cancelled workers have stopped.
+    """
+    await asyncio.gather(*workers, return_exceptions=True)
+
+    writer = get_storage_writer()
+    failed = []
+    for payload in payloads:
+        correlation_id = payload["correlation_id"]
+        if await writer.transition_status(
+            correlation_id=correlation_id,
+            from_statuses=["TRIGGERED"],
+            to_status="FORWARD_FAILED",
+            update={"forward_error": CANCELLED_ERROR},
+        ):
+            get_execution_events().publish(correlation_id)
+            failed.append(correlation_id)
+
+    logger.warning("PD batch cancelled by the client", extra={"not_dispatched": len(failed)})
+    await asyncio.to_thread(_record_cancelled, failed, triggered_at)
+
+
+def _record_cancelled(correlation_ids: list[str], triggered_at: str) -> None:
+    for correlation_id in correlation_ids:
+        record_pd_outcome(
+            correlation_id,
+            status="FORWARD_FAILED",
+            execution={"triggered_at": triggered_at},
+            error=CANCELLED_ERROR,
+        )
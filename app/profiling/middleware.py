@@ -0,0 +1,94 @@
+"""
+Pure ASGI hook that runs selected requests under ``RequestProfiler``.
+
+Unprofiled requests cost a scan of the header list for ``x-profile`` and,
+only while routes are armed, one route match.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import secrets
+from typing import Optional
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import get_settings
+from app.profiling.profiler import get_request_profiler
+
+logger = logging.getLogger("profiling")
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_HEADER = b"x-admin-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+def route_name(scope: Scope) -> Optional[str]:
+    for route in getattr(scope.get("app"), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "name", None)
+    return None
+
+
+def _header_requested(scope: Scope) -> bool:
+    """``X-Profile: 1`` plus a valid ``X-Admin-Token``."""
+    headers = dict(scope["headers"])
+    if headers.get(PROFILE_HEADER, b"").strip() not in (b"1", b"true"):
+        return False
+    admin_token = get_settings().admin_token
+    supplied = headers.get(ADMIN_HEADER)
+    return bool(admin_token and supplied) and secrets.compare_digest(supplied, admin_token.encode())
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler = get_request_profiler()
+        route = None
+        trigger = None
+        if profiler.capturing:
+            # One capture at a time (cProfile hooks the whole thread).
+            await self.app(scope, receive, send)
+            return
+
+        if profiler.armed:
+            route = route_name(scope)
+            if route and profiler.take_armed(route):
+                trigger = "armed"
+        if trigger is None and any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            if _header_requested(scope):
+                trigger = "header"
+                route = route or route_name(scope)
+
+        capture = None
+        if trigger is not None:
+            capture = profiler.begin(scope["method"], scope["path"], route, trigger)
+        if capture is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                capture.meta.status = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (PROFILE_ID_HEADER, capture.meta.id.encode())],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.end(capture)
+            try:
+                await asyncio.to_thread(profiler.save, capture)
+            except Exception:
+                logger.exception("Failed to save profile %s", capture.meta.id)
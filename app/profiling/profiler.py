@@ -0,0 +1,277 @@
+"""
+On-demand request profiling.
+
+A request is profiled when an admin asks for it (``X-Profile: 1`` with a
+valid ``X-Admin-Token``) or when its route was armed through
+``POST /api/profiling/arm`` for a bounded time / number of requests.
+
+Each capture runs two profilers on the event loop thread:
+- ``cProfile`` for exact call counts and timings (``.pstats``);
+- a stack sampler thread for collapsed stacks (``.collapsed``, one
+  ``frame;frame;frame count`` line per stack, for flamegraph.pl or
+  speedscope).
+
+Only one capture runs at a time (cProfile hooks the whole thread), so
+concurrent requests on the same loop show up in it too. Captures are
+written to ``profile_dir`` and only the newest ``profile_max_files`` are
+kept. Arming is per worker process.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Any, Optional
+
+from app.config.settings import Settings, get_settings
+
+PSTATS_SUFFIX = ".pstats"
+COLLAPSED_SUFFIX = ".collapsed"
+META_SUFFIX = ".json"
+
+PROFILE_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$")
+
+
+# -------------------------------------------------------------------
+# Stack sampling
+# -------------------------------------------------------------------
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples one thread's stack every ``interval`` seconds from a daemon
+    thread and counts identical stacks.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+
+# -------------------------------------------------------------------
+# Ring buffer on disk
+# -------------------------------------------------------------------
+
+@dataclass
+class ProfileMeta:
+    id: str
+    method: str
+    path: str
+    route: Optional[str]
+    trigger: str
+    started_at: str
+    duration_ms: float = 0.0
+    status: Optional[int] = None
+    samples: int = 0
+    files: list[str] = field(default_factory=list)
+
+
+class ProfileStore:
+    """
+    ``<id>.pstats`` / ``<id>.collapsed`` / ``<id>.json`` per capture. Ids
+    sort by capture time; saving past ``max_files`` deletes the oldest.
+    """
+
+    def __init__(self, directory: str | Path, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def save(self, meta: ProfileMeta, profile: cProfile.Profile, collapsed: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(self.directory / f"{meta.id}{PSTATS_SUFFIX}")
+        (self.directory / f"{meta.id}{COLLAPSED_SUFFIX}").write_text(collapsed, encoding="utf-8")
+        meta.files = [PSTATS_SUFFIX[1:], COLLAPSED_SUFFIX[1:]]
+        # Metadata last: a capture is listed only once it is complete.
+        tmp = self.directory / f".{meta.id}{META_SUFFIX}.tmp"
+        tmp.write_text(json.dumps(asdict(meta)), encoding="utf-8")
+        os.replace(tmp, self.directory / f"{meta.id}{META_SUFFIX}")
+        self.prune()
+
+    def ids(self) -> list[str]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            path.name[: -len(META_SUFFIX)]
+            for path in self.directory.glob(f"*{META_SUFFIX}")
+            if PROFILE_ID_RE.match(path.name[: -len(META_SUFFIX)])
+        )
+
+    def list_profiles(self) -> list[dict[str, Any]]:
+        items = []
+        for profile_id in reversed(self.ids()):
+            meta = self.meta(profile_id)
+            if meta is not None:
+                items.append(meta)
+        return items
+
+    def meta(self, profile_id: str) -> Optional[dict[str, Any]]:
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        try:
+            return json.loads((self.directory / f"{profile_id}{META_SUFFIX}").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def path(self, profile_id: str, suffix: str) -> Optional[Path]:
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}{suffix}"
+        return path if path.is_file() else None
+
+    def prune(self) -> None:
+        ids = self.ids()
+        for profile_id in ids[: max(len(ids) - self.max_files, 0)]:
+            # Metadata first so a half-deleted capture is never listed.
+            for suffix in (META_SUFFIX, PSTATS_SUFFIX, COLLAPSED_SUFFIX):
+                try:
+                    (self.directory / f"{profile_id}{suffix}").unlink()
+                except FileNotFoundError:
+                    pass
+
+
+# -------------------------------------------------------------------
+# Captures + arming
+# -------------------------------------------------------------------
+
+class Capture:
+    def __init__(self, meta: ProfileMeta, sample_interval: float):
+        self.meta = meta
+        self._start = time.perf_counter()
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), sample_interval)
+
+    def start(self) -> None:
+        self.sampler.start()
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+        self.sampler.stop()
+        self.meta.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+        self.meta.samples = sum(self.sampler.stacks.values())
+
+
+class RequestProfiler:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.store = ProfileStore(settings.profile_dir, settings.profile_max_files)
+        self._active: Optional[Capture] = None
+        # Armed route names -> remaining captures; cleared at _armed_until.
+        self._armed: dict[str, int] = {}
+        self._armed_until = 0.0
+
+    # ---- arming ----
+
+    def arm(self, routes: list[str], duration_seconds: float, max_requests: int) -> None:
+        self._armed = {route: max_requests for route in routes}
+        self._armed_until = time.monotonic() + duration_seconds
+
+    def disarm(self) -> None:
+        self._armed = {}
+        self._armed_until = 0.0
+
+    @property
+    def armed(self) -> dict[str, int]:
+        if self._armed and time.monotonic() >= self._armed_until:
+            self.disarm()
+        return self._armed
+
+    def status(self) -> dict[str, Any]:
+        armed = self.armed
+        return {
+            "armed": dict(armed),
+            "expires_in_seconds": round(max(self._armed_until - time.monotonic(), 0.0), 3) if armed else None,
+            "capturing": self.capturing,
+        }
+
+    @property
+    def capturing(self) -> bool:
+        return self._active is not None
+
+    def take_armed(self, route: str) -> bool:
+        """Consume one armed capture for ``route``, if any is left."""
+        remaining = self.armed.get(route)
+        if not remaining:
+            return False
+        if remaining == 1:
+            del self._armed[route]
+        else:
+            self._armed[route] = remaining - 1
+        return True
+
+    # ---- captures ----
+
+    def begin(self, method: str, path: str, route: Optional[str], trigger: str) -> Optional[Capture]:
+        """Start a capture, or return None if one is already running."""
+        if self._active is not None:
+            return None
+        now = datetime.utcnow()
+        meta = ProfileMeta(
+            id=f"{now:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}",
+            method=method,
+            path=path,
+            route=route,
+            trigger=trigger,
+            started_at=now.isoformat(),
+        )
+        capture = Capture(meta, self.settings.profile_sample_interval_seconds)
+        self._active = capture
+        capture.start()
+        return capture
+
+    def end(self, capture: Capture) -> None:
+        capture.stop()
+        if self._active is capture:
+            self._active = None
+
+    def save(self, capture: Capture) -> None:
+        self.store.save(capture.meta, capture.profile, capture.sampler.collapsed())
+
+
+_profiler: RequestProfiler | None = None
+
+
+def get_request_profiler() -> RequestProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = RequestProfiler(get_settings())
+    return _profiler
@@ -0,0 +1,111 @@
+"""Admin endpoints to arm request profiling and download captures."""
+
+import io
+import pstats
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from app.auth.dependencies import require_admin
+from app.config.settings import Settings, get_settings
+from app.profiling.profiler import COLLAPSED_SUFFIX, PSTATS_SUFFIX, get_request_profiler
+
+router = APIRouter(
+    prefix="/api/profiling",
+    tags=["profiling"],
+    dependencies=[Depends(require_admin)],
+)
+
+TEXT_STATS_LINES = 80
+
+
+class ArmRequest(BaseModel):
+    # Route (endpoint function) names, e.g. "patient_discovery_callback".
+    routes: list[str] = Field(min_length=1)
+    duration_seconds: float = Field(default=300.0, gt=0)
+    # Captures per route before it disarms itself.
+    max_requests: int = Field(default=10, ge=1)
+
+
+@router.get("")
+def profiling_status() -> dict:
+    return get_request_profiler().status()
+
+
+@router.post("/arm")
+def arm_profiling(
+    body: ArmRequest,
+    request: Request,
+    settings: Settings = Depends(get_settings),
+) -> dict:
+    """
+    Profile the next ``max_requests`` requests to each of ``routes`` on
+    this worker, for at most ``duration_seconds``.
+    """
+    known = {getattr(route, "name", None) for route in request.app.routes}
+    unknown = sorted(set(body.routes) - known)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown routes: {', '.join(unknown)}")
+    if body.duration_seconds > settings.profile_max_arm_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"duration_seconds must not exceed {settings.profile_max_arm_seconds}",
+        )
+
+    profiler = get_request_profiler()
+    profiler.arm(body.routes, body.duration_seconds, body.max_requests)
+    return profiler.status()
+
+
+@router.delete("/arm")
+def disarm_profiling() -> dict:
+    profiler = get_request_profiler()
+    profiler.disarm()
+    return profiler.status()
+
+
+# Sync handlers: profile files are read in the threadpool.
+@router.get("/profiles")
+def list_profiles() -> list[dict]:
+    return get_request_profiler().store.list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str) -> dict:
+    meta = get_request_profiler().store.meta(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return meta
+
+
+@router.get("/profiles/{profile_id}/pstats")
+def download_pstats(profile_id: str) -> FileResponse:
+    """Raw ``pstats`` dump (``python -m pstats <file>``, snakeviz)."""
+    path = get_request_profiler().store.path(profile_id, PSTATS_SUFFIX)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+@router.get("/profiles/{profile_id}/collapsed")
+def download_collapsed(profile_id: str) -> FileResponse:
+    """Collapsed stacks for flamegraph.pl / speedscope."""
+    path = get_request_profiler().store.path(profile_id, COLLAPSED_SUFFIX)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+@router.get("/profiles/{profile_id}/text")
+def profile_text(profile_id: str, sort: str = "cumulative") -> PlainTextResponse:
+    """Top functions from the pstats dump, as ``pstats`` prints them."""
+    path = get_request_profiler().store.path(profile_id, PSTATS_SUFFIX)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if sort not in pstats.SortKey._value2member_map_:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats(sort).print_stats(TEXT_STATS_LINES)
+    return PlainTextResponse(out.getvalue())
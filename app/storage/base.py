@@ -0,0 +1,164 @@
+"""
+Storage backend interface for Patient Discovery executions and responses.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Iterable, Optional
+
+from app.storage.blobs import BlobRef, BlobStore
+
+# (method name, keyword arguments) as queued by StorageWriter.
+StorageOp = tuple[str, dict[str, Any]]
+
+WRITE_OPS = frozenset(
+    {"create_execution", "update_execution", "transition_status", "save_pd_response"}
+)
+
+
+
+def hash_patient_reference(patient_reference: str) -> str:
+    """
+    Stable lookup key for a patient reference (hex SHA-256).
+    """
+    return hashlib.sha256(patient_reference.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ExecutionQuery:
+    """
+    Filters for ``ExecutionStore.list_executions``. Time bounds compare
+    against ``triggered_at`` (ISO-8601, UTC) and are inclusive.
+    """
+
+    status: Optional[str] = None
+    patient_reference_hash: Optional[str] = None
+    message_type: Optional[str] = None
+    triggered_after: Optional[str] = None
+    triggered_before: Optional[str] = None
+    limit: int = 50
+    cursor: Optional[str] = None
+
+
+@dataclass
+class ExecutionPage:
+    items: list[dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+class ExecutionStore(ABC):
+    """
+    Persistence backend behind ``PDStorage``.
+
+    Execution records are plain dicts (``correlation_id``,
+    ``patient_reference``, ``status``, ``triggered_at`` and whatever later
+    updates add). Backends must make ``update_execution`` and
+    ``transition_status`` atomic per correlation_id.
+
+    With a ``BlobStore`` configured, response payloads are written there
+    (compressed, deduplicated) and only a ``BlobRef`` is kept in the
+    response row and as ``response_blob`` on the execution record.
+
+    Listing (``list_executions``) is optional: backends that serve it set
+    ``supports_queries``; callers check it before querying.
+    """
+
+    blobs: Optional[BlobStore] = None
+    supports_queries: bool = False
+
+    @abstractmethod
+    def create_execution(
+        self,
+        correlation_id: str,
+        patient_reference: Optional[str],
+        status: str,
+        triggered_at: str,
+    ) -> None:
+        ...
+
+    @abstractmethod
+    def update_execution(self, correlation_id: str, update: dict) -> None:
+        """
+        Merge ``update`` into an existing record. No-op if it does not exist.
+        """
+        ...
+
+    @abstractmethod
+    def transition_status(
+        self,
+        correlation_id: str,
+        from_statuses: Iterable[str],
+        to_status: str,
+        update: Optional[dict] = None,
+    ) -> bool:
+        """
+        Move a record to ``to_status`` only if its current status is one of
+        ``from_statuses``. Returns True when the transition was applied.
+        """
+        ...
+
+    @abstractmethod
+    def save_pd_response(
+        self,
+        correlation_id: str,
+        payload: str | BinaryIO,
+        payload_type: str,
+        message_type: str,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None,
+    ) -> None:
+        """
+        ``payload`` is either text or a binary file object, which backends
+        copy in chunks (from its start) rather than reading whole.
+        """
+        ...
+
+    @abstractmethod
+    def get_pd_response(self, correlation_id: str) -> Optional[dict[str, Any]]:
+        """
+        Response metadata plus either ``payload`` (inline, legacy) or
+        ``blob`` (a ``BlobRef``). Use ``PDStorage.open_pd_response`` to read.
+        """
+        ...
+
+    @abstractmethod
+    def get_execution(self, correlation_id: str) -> Optional[dict[str, Any]]:
+        ...
+
+    def list_executions(self, query: ExecutionQuery) -> ExecutionPage:
+        """
+        Newest-first page of executions matching ``query``, served from
+        indexes (never a directory scan). ``next_cursor`` is an opaque
+        token for the following page. Only when ``supports_queries``.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support execution queries")
+
+    def apply_batch(self, ops: list[StorageOp]) -> list[Any]:
+        """
+        Apply several write operations, returning one result per op.
+        Backends override this to commit the whole batch at once.
+        """
+        return [getattr(self, name)(**kwargs) for name, kwargs in ops]
+
+    def close(self) -> None:
+        pass
+
+    def _stage_blob(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """
+        Move a ``save_pd_response`` payload into the blob store ahead of the
+        metadata write, so compression and file I/O happen outside any
+        database transaction.
+        """
+        payload = kwargs.get("payload")
+        if self.blobs is None or payload is None:
+            return kwargs
+
+        if isinstance(payload, str):
+            ref = self.blobs.put(io.BytesIO(payload.encode("utf-8")))
+        else:
+            ref = self.blobs.put(payload, digest=kwargs.get("sha256"), size=kwargs.get("size"))
+
+        return {**kwargs, "payload": None, "blob": ref, "size": ref.size, "sha256": ref.digest}
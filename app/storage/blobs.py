@@ -0,0 +1,152 @@
+"""
+Compressed, content-addressed blob store for PD response payloads.
+
+Blobs are addressed by the SHA-256 of their *uncompressed* content, so
+identical payloads (e.g. Mirth retries) are stored once. Files live at
+``<root>/<d[0:2]>/<d[2:4]>/<digest>.<ext>`` and are written to a temp file
+and renamed into place, so readers never see partial blobs.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import lzma
+import os
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+# codec -> file extension
+CODECS = {"gzip": "gz", "lzma": "xz", "none": "raw"}
+
+_COPY_CHUNK = 64 * 1024
+
+
+@dataclass(frozen=True)
+class BlobRef:
+    digest: str
+    codec: str
+    size: int
+    stored_size: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "BlobRef":
+        return cls(**{key: data[key] for key in ("digest", "codec", "size", "stored_size")})
+
+
+class BlobStore:
+    def __init__(self, root: str | Path, codec: str = "gzip", level: int = 6):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown blob codec: {codec}")
+        self.root = Path(root)
+        self.codec = codec
+        self.level = level
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(
+        self,
+        payload: BinaryIO,
+        digest: Optional[str] = None,
+        size: Optional[int] = None,
+    ) -> BlobRef:
+        """
+        Store ``payload`` (read from its start) unless a blob with the same
+        content already exists. ``digest``/``size`` may be passed when the
+        caller already computed them while receiving the payload.
+        """
+        if digest is None or size is None:
+            digest, size = self._hash(payload)
+
+        existing = self._find(digest)
+        if existing is not None:
+            codec, path = existing
+            return BlobRef(digest=digest, codec=codec, size=size, stored_size=path.stat().st_size)
+
+        target = self.path_for(digest, self.codec)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        payload.seek(0)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                with self._writer(raw) as out:
+                    shutil.copyfileobj(payload, out, _COPY_CHUNK)
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_name, target)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+        return BlobRef(digest=digest, codec=self.codec, size=size, stored_size=target.stat().st_size)
+
+    def open(self, ref: BlobRef) -> BinaryIO:
+        """
+        Open a blob for reading; decompression is transparent.
+        """
+        path = self.path_for(ref.digest, ref.codec)
+        if ref.codec == "gzip":
+            return gzip.open(path, "rb")
+        if ref.codec == "lzma":
+            return lzma.open(path, "rb")
+        return path.open("rb")
+
+    def delete(self, ref: BlobRef) -> None:
+        self.path_for(ref.digest, ref.codec).unlink(missing_ok=True)
+
+    def path_for(self, digest: str, codec: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / f"{digest}.{CODECS[codec]}"
+
+    # ------------------------------------------------------------------
+    # INTERNALS
+    # ------------------------------------------------------------------
+
+    def _writer(self, raw: BinaryIO) -> BinaryIO:
+        if self.codec == "gzip":
+            # mtime=0 keeps identical content byte-identical on disk.
+            return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.level, mtime=0)
+        if self.codec == "lzma":
+            return lzma.LZMAFile(raw, mode="wb", preset=self.level)
+        return _Unclosed(raw)
+
+    @staticmethod
+    def _hash(payload: BinaryIO) -> tuple[str, int]:
+        payload.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        while chunk := payload.read(_COPY_CHUNK):
+            digest.update(chunk)
+            size += len(chunk)
+        return digest.hexdigest(), size
+
+    def _find(self, digest: str) -> Optional[tuple[str, Path]]:
+        """
+        Locate a stored blob by digest, whichever codec it was written with.
+        """
+        for codec in CODECS:
+            path = self.path_for(digest, codec)
+            if path.exists():
+                return codec, path
+        return None
+
+
+class _Unclosed:
+    """Context wrapper that leaves the underlying file open on exit."""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+
+    def write(self, data: bytes) -> int:
+        return self._raw.write(data)
+
+    def __enter__(self) -> "_Unclosed":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
@@ -0,0 +1,145 @@
+"""
+Legacy storage backend: one JSON file per execution / response.
+"""
+from __future__ import annotations
+
+import json
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Optional
+
+from app.storage.base import ExecutionStore
+from app.storage.blobs import BlobRef, BlobStore
+
+
+class JSONFileStore(ExecutionStore):
+    """
+    Writes ``{correlation_id}_execution.json`` and
+    ``{correlation_id}_response.json`` into a flat directory.
+
+    Read-modify-write updates are serialised within this process only;
+    use the SQLite backend when several workers share the directory.
+    """
+
+    def __init__(self, base_dir: str | Path, blobs: Optional[BlobStore] = None):
+        self.base_dir = Path(base_dir)
+        self.blobs = blobs
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def save_pd_response(
+        self,
+        correlation_id: str,
+        payload: str | BinaryIO,
+        payload_type: str,
+        message_type: str,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None,
+    ) -> None:
+        staged = self._stage_blob({"payload": payload, "size": size, "sha256": sha256})
+        payload, size, sha256 = staged["payload"], staged["size"], staged["sha256"]
+        blob: Optional[BlobRef] = staged.get("blob")
+
+        record: dict[str, Any] = {
+            "payload_type": payload_type,
+            "message_type": message_type,
+        }
+
+        if blob is not None:
+            record["blob"] = blob.to_dict()
+        elif isinstance(payload, str):
+            record["payload"] = payload
+        else:
+            # Streamed payloads are copied as-is next to the metadata file
+            # instead of being embedded (and escaped) inside the JSON.
+            payload_path = self.base_dir / f"{correlation_id}_response.payload"
+            payload.seek(0)
+            with payload_path.open("wb") as out:
+                shutil.copyfileobj(payload, out)
+            record["payload_file"] = payload_path.name
+
+        if size is not None:
+            record["size"] = size
+        if sha256 is not None:
+            record["sha256"] = sha256
+
+        path = self.base_dir / f"{correlation_id}_response.json"
+        path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+
+        if blob is not None:
+            self.update_execution(correlation_id, {"response_blob": blob.to_dict()})
+
+    def get_pd_response(self, correlation_id: str) -> Optional[dict[str, Any]]:
+        path = self.base_dir / f"{correlation_id}_response.json"
+        if not path.exists():
+            return None
+
+        record = json.loads(path.read_text(encoding="utf-8"))
+        response: dict[str, Any] = {
+            "correlation_id": correlation_id,
+            "payload_type": record.get("payload_type"),
+            "message_type": record.get("message_type"),
+            "size": record.get("size"),
+            "sha256": record.get("sha256"),
+        }
+        if "blob" in record:
+            response["blob"] = BlobRef.from_dict(record["blob"])
+        elif "payload_file" in record:
+            response["payload"] = (self.base_dir / record["payload_file"]).read_bytes()
+        else:
+            response["payload"] = record.get("payload", "").encode("utf-8")
+        return response
+
+    def update_execution(self, correlation_id: str, update: dict) -> None:
+        with self._lock:
+            data = self.get_execution(correlation_id)
+            if data is None:
+                return
+
+            data.update(update)
+            self._write_execution(correlation_id, data)
+
+    def transition_status(
+        self,
+        correlation_id: str,
+        from_statuses: Iterable[str],
+        to_status: str,
+        update: Optional[dict] = None,
+    ) -> bool:
+        with self._lock:
+            data = self.get_execution(correlation_id)
+            if data is None or data.get("status") not in set(from_statuses):
+                return False
+
+            data.update(update or {})
+            data["status"] = to_status
+            self._write_execution(correlation_id, data)
+            return True
+
+    def create_execution(
+        self,
+        correlation_id: str,
+        patient_reference: Optional[str],
+        status: str,
+        triggered_at: str,
+    ) -> None:
+        self._write_execution(
+            correlation_id,
+            {
+                "correlation_id": correlation_id,
+                "patient_reference": patient_reference,
+                "status": status,
+                "triggered_at": triggered_at,
+            },
+        )
+
+    def get_execution(self, correlation_id: str) -> Optional[dict[str, Any]]:
+        path = self.base_dir / f"{correlation_id}_execution.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _write_execution(self, correlation_id: str, data: dict) -> None:
+        path = self.base_dir / f"{correlation_id}_execution.json"
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
@@ -0,0 +1,113 @@
+"""
+Import legacy per-file PD JSON records into the SQLite execution store.
+
+Usage:
+    python -m app.storage.migrate [--source DIR] [--target FILE] [--delete]
+
+Safe to re-run: records already present in the database are left as is.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from contextlib import ExitStack
+from pathlib import Path
+
+from app.config.settings import get_settings
+from app.pd.storage import SQLITE_FILENAME, build_blob_store
+from app.storage.blobs import BlobRef, BlobStore
+from app.storage.sqlite import SQLiteExecutionStore
+
+EXECUTION_SUFFIX = "_execution.json"
+RESPONSE_SUFFIX = "_response.json"
+
+
+def migrate(
+    source: Path,
+    target: Path,
+    delete: bool = False,
+    blobs: BlobStore | None = None,
+) -> dict[str, int]:
+    store = SQLiteExecutionStore(target, blobs=blobs)
+    counts = {"executions": 0, "responses": 0, "skipped": 0, "failed": 0}
+
+    try:
+        for path in sorted(source.glob(f"*{EXECUTION_SUFFIX}")):
+            correlation_id = path.name[: -len(EXECUTION_SUFFIX)]
+            try:
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                counts["failed"] += 1
+                continue
+
+            record.setdefault("correlation_id", correlation_id)
+            record.setdefault("status", "UNKNOWN")
+            record.setdefault("triggered_at", "")
+            if store.import_execution(record):
+                counts["executions"] += 1
+            else:
+                counts["skipped"] += 1
+
+            if delete:
+                path.unlink()
+
+        for path in sorted(source.glob(f"*{RESPONSE_SUFFIX}")):
+            correlation_id = path.name[: -len(RESPONSE_SUFFIX)]
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                counts["failed"] += 1
+                continue
+
+            blob = BlobRef.from_dict(data["blob"]) if "blob" in data else None
+            if blob is not None and blobs is None:
+                # Keep the only reference to the payload until a blob store
+                # is configured to read it from.
+                counts["failed"] += 1
+                continue
+
+            payload_path = source / data["payload_file"] if "payload_file" in data else None
+            with ExitStack() as stack:
+                if blob is not None:
+                    payload = None
+                elif payload_path is not None:
+                    payload = stack.enter_context(payload_path.open("rb"))
+                else:
+                    payload = data.get("payload", "")
+                imported = store.import_response(
+                    correlation_id=correlation_id,
+                    payload=payload,
+                    payload_type=data.get("payload_type", "json"),
+                    message_type=data.get("message_type", "UNKNOWN"),
+                    size=data.get("size"),
+                    sha256=data.get("sha256"),
+                    blob=blob,
+                )
+            counts["responses" if imported else "skipped"] += 1
+
+            if delete:
+                path.unlink()
+                if payload_path is not None:
+                    payload_path.unlink()
+    finally:
+        store.close()
+
+    return counts
+
+
+def main() -> None:
+    settings = get_settings()
+    default_dir = Path(settings.pd_storage_dir)
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", type=Path, default=default_dir, help="Directory of legacy JSON files")
+    parser.add_argument("--target", type=Path, default=default_dir / SQLITE_FILENAME, help="SQLite database file")
+    parser.add_argument("--delete", action="store_true", help="Remove JSON files once imported")
+    args = parser.parse_args()
+
+    counts = migrate(args.source, args.target, delete=args.delete, blobs=build_blob_store(settings))
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Durable outbound queue for PD triggers (async trigger mode).
+
+Items live in their own SQLite (WAL) file so queued work survives a
+restart regardless of the execution storage backend. Workers *claim*
+items with a lease; an item whose lease expires (crashed or killed
+worker, possibly in another process) becomes claimable again, which is
+how pending work resumes on startup.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbound (
+    correlation_id  TEXT PRIMARY KEY,
+    endpoint_url    TEXT NOT NULL,
+    payload         TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    available_at    REAL NOT NULL,
+    lease_until     REAL,
+    last_error      TEXT,
+    enqueued_at     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbound_available ON outbound (available_at);
+"""
+
+
+@dataclass
+class OutboundItem:
+    correlation_id: str
+    endpoint_url: str
+    payload: dict[str, Any]
+    # Dispatch rounds already made (each round may retry internally).
+    attempts: int
+    enqueued_at: str
+
+
+class OutboundQueue:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # Payloads carry patient references.
+        os.chmod(self.path, 0o600)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, correlation_id: str, endpoint_url: str, payload: dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO outbound
+                    (correlation_id, endpoint_url, payload, available_at, enqueued_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    correlation_id,
+                    endpoint_url,
+                    json.dumps(payload),
+                    time.time(),
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+
+    def enqueue_many(self, items: list[tuple[str, str, dict[str, Any]]]) -> None:
+        """
+        Enqueue (correlation_id, endpoint_url, payload) items in one transaction.
+        """
+        now = time.time()
+        enqueued_at = datetime.now(timezone.utc).isoformat()
+        with self._transaction() as conn:
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO outbound
+                    (correlation_id, endpoint_url, payload, available_at, enqueued_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (correlation_id, endpoint_url, json.dumps(payload), now, enqueued_at)
+                    for correlation_id, endpoint_url, payload in items
+                ],
+            )
+
+    def claim(self, lease_seconds: float) -> Optional[OutboundItem]:
+        """
+        Lease the oldest available item, or return None.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                """
+                SELECT correlation_id, endpoint_url, payload, attempts, enqueued_at
+                FROM outbound
+                WHERE available_at <= ? AND (lease_until IS NULL OR lease_until <= ?)
+                ORDER BY available_at
+                LIMIT 1
+                """,
+                (now, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE outbound SET lease_until = ?, attempts = attempts + 1 WHERE correlation_id = ?",
+                (now + lease_seconds, row[0]),
+            )
+
+        return OutboundItem(
+            correlation_id=row[0],
+            endpoint_url=row[1],
+            payload=json.loads(row[2]),
+            attempts=row[3] + 1,
+            enqueued_at=row[4],
+        )
+
+    def complete(self, correlation_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM outbound WHERE correlation_id = ?", (correlation_id,))
+
+    def retry_later(self, correlation_id: str, delay: float, error: Optional[str] = None) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                UPDATE outbound SET available_at = ?, lease_until = NULL, last_error = ?
+                WHERE correlation_id = ?
+                """,
+                (time.time() + delay, error, correlation_id),
+            )
+
+    def release(self, correlation_id: str) -> None:
+        """
+        Return a claimed item without counting the attempt (shutdown).
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                UPDATE outbound SET lease_until = NULL, attempts = MAX(attempts - 1, 0)
+                WHERE correlation_id = ?
+                """,
+                (correlation_id,),
+            )
+
+    def next_available_in(self) -> Optional[float]:
+        """
+        Seconds until the next item becomes claimable (0 if one is ready).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(MAX(available_at, COALESCE(lease_until, 0))) FROM outbound"
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(row[0] - time.time(), 0.0)
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbound").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
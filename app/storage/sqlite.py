@@ -0,0 +1,510 @@
+"""
+SQLite (WAL) storage backend for Patient Discovery executions.
+
+One database file replaces the flat directory of JSON files. Executions
+are indexed by correlation_id, status and timestamps, and every update
+runs in its own transaction so concurrent callbacks cannot lose writes.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Optional
+
+from app.storage.blobs import BlobRef, BlobStore
+from app.storage.base import (
+    ExecutionPage,
+    ExecutionQuery,
+    ExecutionStore,
+    StorageOp,
+    hash_patient_reference,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    correlation_id     TEXT PRIMARY KEY,
+    patient_reference  TEXT,
+    status             TEXT NOT NULL,
+    message_type       TEXT,
+    triggered_at       TEXT,
+    received_at        TEXT,
+    updated_at         TEXT NOT NULL,
+    data               TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS responses (
+    correlation_id  TEXT PRIMARY KEY,
+    payload_type    TEXT NOT NULL,
+    message_type    TEXT NOT NULL,
+    payload         TEXT NOT NULL,
+    stored_at       TEXT NOT NULL
+);
+"""
+
+# Columns added after the initial schema: (name, type).
+_ADDED_COLUMNS = (
+    ("executions", "patient_reference_hash", "TEXT"),
+    ("responses", "size", "INTEGER"),
+    ("responses", "sha256", "TEXT"),
+    ("responses", "blob_digest", "TEXT"),
+    ("responses", "blob_codec", "TEXT"),
+    ("responses", "stored_size", "INTEGER"),
+)
+
+# Chunk size for streaming file payloads into SQLite blobs.
+_COPY_CHUNK = 64 * 1024
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS executions_status ON executions (status, triggered_at, correlation_id);
+CREATE INDEX IF NOT EXISTS executions_triggered_at ON executions (triggered_at, correlation_id);
+CREATE INDEX IF NOT EXISTS executions_received_at ON executions (received_at);
+CREATE INDEX IF NOT EXISTS executions_patient ON executions (patient_reference_hash, triggered_at, correlation_id);
+CREATE INDEX IF NOT EXISTS executions_message_type ON executions (message_type, triggered_at, correlation_id);
+"""
+
+# Record fields mirrored into indexed columns.
+_COLUMNS = ("patient_reference", "status", "message_type", "triggered_at", "received_at")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _reference_hash(record: dict[str, Any]) -> Optional[str]:
+    reference = record.get("patient_reference")
+    return hash_patient_reference(reference) if reference else None
+
+
+def _encode_cursor(triggered_at: str, correlation_id: str) -> str:
+    raw = json.dumps([triggered_at, correlation_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        triggered_at, correlation_id = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    return triggered_at, correlation_id
+
+
+class SQLiteExecutionStore(ExecutionStore):
+    """
+    ``ExecutionStore`` backed by a single SQLite database in WAL mode.
+
+    The full record is kept as JSON in ``data``; the fields used for
+    lookups are mirrored into indexed columns on every write.
+    """
+
+    supports_queries = True
+
+    def __init__(self, path: str | Path, blobs: Optional[BlobStore] = None):
+        self.path = Path(path)
+        self.blobs = blobs
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL fsyncs the WAL on every commit; StorageWriter batches
+        # writes so that cost is paid once per group of operations.
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self._upgrade_schema()
+
+        # Separate connection for queries so reads never wait behind a
+        # group commit (WAL readers do not block on the writer).
+        self._read_lock = threading.Lock()
+        self._read_conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._read_conn.execute("PRAGMA busy_timeout=5000")
+
+    # ------------------------------------------------------------------
+    # ExecutionStore
+    # ------------------------------------------------------------------
+
+    def create_execution(
+        self,
+        correlation_id: str,
+        patient_reference: Optional[str],
+        status: str,
+        triggered_at: str,
+    ) -> None:
+        with self._transaction() as conn:
+            self._create_execution(conn, correlation_id, patient_reference, status, triggered_at)
+
+    def update_execution(self, correlation_id: str, update: dict) -> None:
+        with self._transaction() as conn:
+            self._update_execution(conn, correlation_id, update)
+
+    def transition_status(
+        self,
+        correlation_id: str,
+        from_statuses: Iterable[str],
+        to_status: str,
+        update: Optional[dict] = None,
+    ) -> bool:
+        with self._transaction() as conn:
+            return self._transition_status(conn, correlation_id, from_statuses, to_status, update)
+
+    def save_pd_response(
+        self,
+        correlation_id: str,
+        payload: str | BinaryIO,
+        payload_type: str,
+        message_type: str,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None,
+    ) -> None:
+        kwargs = self._stage_blob(
+            {"payload": payload, "size": size, "sha256": sha256}
+        )
+        with self._transaction() as conn:
+            self._save_pd_response(
+                conn,
+                correlation_id,
+                payload_type=payload_type,
+                message_type=message_type,
+                **kwargs,
+            )
+
+    def apply_batch(self, ops: list[StorageOp]) -> list[Any]:
+        """
+        Group commit: apply every op inside one transaction, so the batch
+        costs a single fsync. Raises (and rolls back) if any op fails.
+        Payload blobs are written before the transaction opens.
+        """
+        ops = [
+            (name, self._stage_blob(kwargs) if name == "save_pd_response" else kwargs)
+            for name, kwargs in ops
+        ]
+        with self._transaction() as conn:
+            return [getattr(self, f"_{name}")(conn, **kwargs) for name, kwargs in ops]
+
+    def get_pd_response(self, correlation_id: str) -> Optional[dict[str, Any]]:
+        with self._read_lock:
+            row = self._read_conn.execute(
+                """
+                SELECT payload_type, message_type, size, sha256, stored_at,
+                       blob_digest, blob_codec, stored_size, payload
+                FROM responses WHERE correlation_id = ?
+                """,
+                (correlation_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        response: dict[str, Any] = {
+            "correlation_id": correlation_id,
+            "payload_type": row[0],
+            "message_type": row[1],
+            "size": row[2],
+            "sha256": row[3],
+            "stored_at": row[4],
+        }
+        if row[5] is not None:
+            response["blob"] = BlobRef(digest=row[5], codec=row[6], size=row[2], stored_size=row[7])
+        else:
+            response["payload"] = row[8].encode("utf-8") if isinstance(row[8], str) else row[8]
+        return response
+
+    def get_execution(self, correlation_id: str) -> Optional[dict[str, Any]]:
+        with self._read_lock:
+            return self._load(self._read_conn, correlation_id)
+
+    def list_executions(self, query: ExecutionQuery) -> ExecutionPage:
+        clauses: list[str] = []
+        params: list[Any] = []
+
+        for column, value in (
+            ("status", query.status),
+            ("patient_reference_hash", query.patient_reference_hash),
+            ("message_type", query.message_type),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        if query.triggered_after is not None:
+            clauses.append("triggered_at >= ?")
+            params.append(query.triggered_after)
+        if query.triggered_before is not None:
+            clauses.append("triggered_at <= ?")
+            params.append(query.triggered_before)
+
+        if query.cursor is not None:
+            last_triggered_at, last_id = _decode_cursor(query.cursor)
+            clauses.append("(triggered_at < ? OR (triggered_at = ? AND correlation_id < ?))")
+            params.extend([last_triggered_at, last_triggered_at, last_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f"SELECT triggered_at, correlation_id, data FROM executions {where} "
+            "ORDER BY triggered_at DESC, correlation_id DESC LIMIT ?"
+        )
+        # Fetch one extra row to know whether another page exists.
+        params.append(query.limit + 1)
+
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, params).fetchall()
+
+        page = ExecutionPage(items=[json.loads(row[2]) for row in rows[: query.limit]])
+        if len(rows) > query.limit:
+            last = rows[query.limit - 1]
+            page.next_cursor = _encode_cursor(last[0], last[1])
+        return page
+
+    def close(self) -> None:
+        with self._read_lock:
+            self._read_conn.close()
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Migration helpers
+    # ------------------------------------------------------------------
+
+    def import_execution(self, record: dict[str, Any]) -> bool:
+        """
+        Insert a complete record unless one already exists.
+        Returns True when the record was inserted.
+        """
+        with self._transaction() as conn:
+            if self._load(conn, record["correlation_id"]) is not None:
+                return False
+            self._upsert(conn, record)
+            return True
+
+    def import_response(
+        self,
+        correlation_id: str,
+        payload: str | BinaryIO | None,
+        payload_type: str,
+        message_type: str,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None,
+        blob: Optional[BlobRef] = None,
+    ) -> bool:
+        """
+        Insert a response unless one is already stored. A payload that is
+        already in the blob store is passed as ``blob`` and kept by reference.
+        """
+        with self._read_lock:
+            exists = self._read_conn.execute(
+                "SELECT 1 FROM responses WHERE correlation_id = ?",
+                (correlation_id,),
+            ).fetchone()
+        if exists:
+            return False
+
+        if blob is not None:
+            kwargs = {"payload": None, "blob": blob, "size": blob.size, "sha256": blob.digest}
+        else:
+            kwargs = self._stage_blob({"payload": payload, "size": size, "sha256": sha256})
+        with self._transaction() as conn:
+            self._save_pd_response(
+                conn,
+                correlation_id,
+                payload_type=payload_type,
+                message_type=message_type,
+                **kwargs,
+            )
+        return True
+
+    # ------------------------------------------------------------------
+    # INTERNALS
+    # ------------------------------------------------------------------
+
+    def _upgrade_schema(self) -> None:
+        existing = {
+            table: {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for table in ("executions", "responses")
+        }
+        for table, name, column_type in _ADDED_COLUMNS:
+            if name not in existing[table]:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+        if "patient_reference_hash" not in existing["executions"]:
+            rows = self._conn.execute(
+                "SELECT correlation_id, patient_reference FROM executions "
+                "WHERE patient_reference IS NOT NULL"
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE executions SET patient_reference_hash = ? WHERE correlation_id = ?",
+                [(hash_patient_reference(ref), cid) for cid, ref in rows],
+            )
+
+        self._conn.executescript(_INDEXES)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Serialise writers in-process and take the database write lock up
+        front (BEGIN IMMEDIATE) so read-modify-write cycles are atomic
+        across processes too.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def _create_execution(
+        self,
+        conn: sqlite3.Connection,
+        correlation_id: str,
+        patient_reference: Optional[str],
+        status: str,
+        triggered_at: str,
+    ) -> None:
+        self._upsert(
+            conn,
+            {
+                "correlation_id": correlation_id,
+                "patient_reference": patient_reference,
+                "status": status,
+                "triggered_at": triggered_at,
+            },
+        )
+
+    def _update_execution(
+        self,
+        conn: sqlite3.Connection,
+        correlation_id: str,
+        update: dict,
+    ) -> None:
+        record = self._load(conn, correlation_id)
+        if record is None:
+            return
+        record.update(update)
+        self._upsert(conn, record)
+
+    def _transition_status(
+        self,
+        conn: sqlite3.Connection,
+        correlation_id: str,
+        from_statuses: Iterable[str],
+        to_status: str,
+        update: Optional[dict] = None,
+    ) -> bool:
+        record = self._load(conn, correlation_id)
+        if record is None or record.get("status") not in set(from_statuses):
+            return False
+        record.update(update or {})
+        record["status"] = to_status
+        self._upsert(conn, record)
+        return True
+
+    def _save_pd_response(
+        self,
+        conn: sqlite3.Connection,
+        correlation_id: str,
+        payload: str | BinaryIO | None,
+        payload_type: str,
+        message_type: str,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None,
+        blob: Optional[BlobRef] = None,
+    ) -> None:
+        streamed = payload is not None and not isinstance(payload, str)
+        if blob is not None:
+            # Payload lives in the blob store; keep only the reference.
+            value: Any = sqlite3.Binary(b"")
+        elif streamed:
+            if size is None:
+                size = payload.seek(0, 2)
+            payload.seek(0)
+            # Reserve the blob, then stream into it so the payload is
+            # never held in memory as a whole.
+            value = sqlite3.Binary(b"") if size == 0 else None
+        else:
+            value = payload
+
+        conn.execute(
+            """
+            INSERT INTO responses
+                (correlation_id, payload_type, message_type, payload, size, sha256,
+                 blob_digest, blob_codec, stored_size, stored_at)
+            VALUES (?, ?, ?, COALESCE(?, zeroblob(?)), ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (correlation_id) DO UPDATE SET
+                payload_type = excluded.payload_type,
+                message_type = excluded.message_type,
+                payload = excluded.payload,
+                size = excluded.size,
+                sha256 = excluded.sha256,
+                blob_digest = excluded.blob_digest,
+                blob_codec = excluded.blob_codec,
+                stored_size = excluded.stored_size,
+                stored_at = excluded.stored_at
+            """,
+            (
+                correlation_id,
+                payload_type,
+                message_type,
+                value,
+                0 if blob is not None else size or 0,
+                size,
+                sha256,
+                blob.digest if blob else None,
+                blob.codec if blob else None,
+                blob.stored_size if blob else None,
+                _now(),
+            ),
+        )
+
+        if blob is not None:
+            self._update_execution(conn, correlation_id, {"response_blob": blob.to_dict()})
+            return
+
+        if streamed and size:
+            (rowid,) = conn.execute(
+                "SELECT rowid FROM responses WHERE correlation_id = ?",
+                (correlation_id,),
+            ).fetchone()
+            with conn.blobopen("responses", "payload", rowid) as blob:
+                while chunk := payload.read(_COPY_CHUNK):
+                    blob.write(chunk)
+
+    @staticmethod
+    def _load(conn: sqlite3.Connection, correlation_id: str) -> Optional[dict[str, Any]]:
+        row = conn.execute(
+            "SELECT data FROM executions WHERE correlation_id = ?",
+            (correlation_id,),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, record: dict[str, Any]) -> None:
+        conn.execute(
+            """
+            INSERT INTO executions
+                (correlation_id, patient_reference, status, message_type,
+                 triggered_at, received_at, patient_reference_hash, updated_at, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (correlation_id) DO UPDATE SET
+                patient_reference = excluded.patient_reference,
+                patient_reference_hash = excluded.patient_reference_hash,
+                status = excluded.status,
+                message_type = excluded.message_type,
+                triggered_at = excluded.triggered_at,
+                received_at = excluded.received_at,
+                updated_at = excluded.updated_at,
+                data = excluded.data
+            """,
+            (
+                record["correlation_id"],
+                *(record.get(column) for column in _COLUMNS),
+                _reference_hash(record),
+                _now(),
+                json.dumps(record),
+            ),
+        )
@@ -0,0 +1,213 @@
+"""
+Background group-commit writer for PD storage.
+
+Route handlers enqueue write operations instead of doing file / database
+I/O on the event loop. A single writer thread drains the bounded queue,
+applies up to ``max_batch`` operations per ``ExecutionStore.apply_batch``
+call (one transaction / fsync per batch for SQLite) and resolves the
+callers' futures. Operations are applied in submission order.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import threading
+from typing import Any, Optional
+
+from app.storage.base import WRITE_OPS, ExecutionStore, StorageOp
+
+logger = logging.getLogger("storage.writer")
+
+_STOP = object()
+
+
+class _Pending:
+    __slots__ = ("op", "loop", "future")
+
+    def __init__(
+        self,
+        op: StorageOp,
+        loop: Optional[asyncio.AbstractEventLoop],
+        future: Optional[asyncio.Future],
+    ):
+        self.op = op
+        self.loop = loop
+        self.future = future
+
+
+class StorageWriter:
+    """
+    Bounded write queue drained by one background thread.
+
+    - ``submit`` awaits (off the event loop) when the queue is full, so
+      bursts apply backpressure instead of growing memory.
+    - ``wait=True`` returns the op's result once it is committed;
+      otherwise the call returns as soon as the op is queued.
+    - ``aclose`` stops intake, drains everything queued and joins the
+      thread, guaranteeing queued writes reach storage on shutdown.
+    """
+
+    def __init__(self, store: ExecutionStore, max_queue: int = 10000, max_batch: int = 256):
+        self.store = store
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="pd-storage-writer", daemon=True)
+        self._thread.start()
+
+    async def submit(self, name: str, wait: bool = False, **kwargs: Any) -> Any:
+        if name not in WRITE_OPS:
+            raise ValueError(f"Unsupported storage operation: {name}")
+        if self._closed:
+            raise RuntimeError("Storage writer is closed")
+
+        if not self.running:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future() if wait else None
+        pending = _Pending((name, kwargs), loop, future)
+
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, pending)
+
+        if future is not None:
+            return await future
+        return None
+
+    # Convenience wrappers mirroring PDStorage.
+
+    async def create_execution(self, wait: bool = False, **kwargs: Any) -> None:
+        await self.submit("create_execution", wait=wait, **kwargs)
+
+    async def update_execution(self, wait: bool = False, **kwargs: Any) -> None:
+        await self.submit("update_execution", wait=wait, **kwargs)
+
+    async def transition_status(self, **kwargs: Any) -> bool:
+        return await self.submit("transition_status", wait=True, **kwargs)
+
+    async def save_pd_response(self, wait: bool = False, **kwargs: Any) -> None:
+        await self.submit("save_pd_response", wait=wait, **kwargs)
+
+    async def flush(self) -> None:
+        """
+        Wait until everything queued before this call has been applied.
+        """
+        if not self.running:
+            return
+        await asyncio.to_thread(self._queue.join)
+
+    async def aclose(self) -> None:
+        self._closed = True
+        if not self.running:
+            return
+        await asyncio.to_thread(self._queue.put, _STOP)
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # WRITER THREAD
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        stopping = False
+        while True:
+            batch: list[_Pending] = []
+            seen_stop = False
+            if not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    seen_stop = True
+                else:
+                    batch.append(item)
+
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    # Keep draining: STOP is enqueued after every op that
+                    # was accepted before close.
+                    seen_stop = True
+                    continue
+                batch.append(item)
+
+            if batch:
+                self._apply(batch)
+
+            for _ in range(len(batch) + (1 if seen_stop else 0)):
+                self._queue.task_done()
+
+            stopping = stopping or seen_stop
+            # After STOP, go on in max_batch chunks until the queue is empty.
+            if stopping and len(batch) < self.max_batch:
+                return
+
+    def _apply(self, batch: list[_Pending]) -> None:
+        try:
+            self._apply_batch(batch)
+        finally:
+            # Streamed payloads (spooled temp files) are owned by the writer
+            # once queued.
+            for pending in batch:
+                payload = pending.op[1].get("payload")
+                if hasattr(payload, "close"):
+                    payload.close()
+
+    def _apply_batch(self, batch: list[_Pending]) -> None:
+        try:
+            results = self.store.apply_batch([pending.op for pending in batch])
+        except Exception:
+            # Isolate the failing op(s) so one bad write does not drop
+            # the rest of the group.
+            logger.exception("Batched storage write failed; retrying ops individually")
+            for pending in batch:
+                try:
+                    result = self.store.apply_batch([pending.op])[0]
+                except Exception as e:
+                    logger.exception("Storage operation %s failed", pending.op[0])
+                    self._resolve(pending, error=e)
+                else:
+                    self._resolve(pending, result=result)
+            return
+
+        for pending, result in zip(batch, results):
+            self._resolve(pending, result=result)
+
+    @staticmethod
+    def _resolve(pending: _Pending, result: Any = None, error: Optional[BaseException] = None) -> None:
+        future = pending.future
+        if future is None or pending.loop is None:
+            return
+
+        def _set() -> None:
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        try:
+            pending.loop.call_soon_threadsafe(_set)
+        except RuntimeError:
+            # Caller's loop has already shut down.
+            pass
@@ -0,0 +1,110 @@
+"""
+Long-lived, pooled HTTP clients for upstream systems.
+
+One ``httpx.AsyncClient`` is kept per upstream (OpenEMR, Mirth) for the
+lifetime of the application so keep-alive connections are reused instead
+of paying TCP/TLS setup on every request.
+"""
+from __future__ import annotations
+
+import importlib.util
+import logging
+
+import httpx
+
+from app.config.settings import Settings, get_settings
+from app.metrics.upstream import InstrumentedTransport
+
+logger = logging.getLogger("http.clients")
+
+OPENEMR = "openemr"
+MIRTH = "mirth"
+
+
+class HTTPClientRegistry:
+    """
+    Lazily creates and owns one pooled client per upstream.
+
+    ``transports`` lets callers (benchmarks, local stubs) route an upstream
+    through a custom transport without touching the call sites.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        transports: dict[str, httpx.AsyncBaseTransport] | None = None,
+    ):
+        self.settings = settings
+        self._transports = dict(transports or {})
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = self._build(upstream)
+            self._clients[upstream] = client
+        return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    # ------------------------------------------------------------------
+    # INTERNALS
+    # ------------------------------------------------------------------
+
+    def _build(self, upstream: str) -> httpx.AsyncClient:
+        timeouts = {
+            OPENEMR: self.settings.openemr_timeout_seconds,
+            MIRTH: self.settings.mirth_timeout_seconds,
+        }
+        if upstream not in timeouts:
+            raise KeyError(f"Unknown upstream: {upstream}")
+
+        limits = httpx.Limits(
+            max_connections=self.settings.http_max_connections,
+            max_keepalive_connections=self.settings.http_max_keepalive_connections,
+            keepalive_expiry=self.settings.http_keepalive_expiry_seconds,
+        )
+
+        timeout = httpx.Timeout(timeouts[upstream])
+        if upstream == MIRTH:
+            timeout = httpx.Timeout(timeouts[upstream], connect=self.settings.mirth_connect_timeout_seconds)
+
+        http2 = self._http2_available()
+        transport = self._transports.get(upstream) or httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+
+        return httpx.AsyncClient(
+            timeout=timeout,
+            limits=limits,
+            http2=http2,
+            # Per-upstream latency / outcome metrics for /metrics.
+            transport=InstrumentedTransport(upstream, transport),
+        )
+
+    def _http2_available(self) -> bool:
+        if not self.settings.http2_enabled:
+            return False
+        # HTTP/2 support is an optional extra (httpx[http2]).
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed")
+            return False
+        return True
+
+
+_registry: HTTPClientRegistry | None = None
+
+
+def get_http_clients() -> HTTPClientRegistry:
+    global _registry
+    if _registry is None:
+        _registry = HTTPClientRegistry(get_settings())
+    return _registry
+
+
+async def close_http_clients() -> None:
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
@@ -0,0 +1,246 @@
+"""
+Non-blocking, structured application logging.
+
+Loggers hand records to a bounded in-memory queue (``QueueHandler``); a
+``QueueListener`` thread formats and writes them, so a slow or blocked
+stdout (container log backpressure) never stalls the event loop. When
+the queue is full, records are dropped and counted instead of blocking.
+
+On the calling side each record gets the current ``correlation_id``
+(a context variable bound per request / dispatch), and DEBUG/INFO
+records of high-volume loggers can be sampled. On the writer thread,
+records are rendered as one JSON object per line with sensitive extra
+fields redacted and long strings truncated.
+"""
+from __future__ import annotations
+
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+from app.config.settings import Settings, get_settings
+
+REDACTED = "[REDACTED]"
+
+correlation_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else came from ``extra=``.
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "correlation_id"}
+
+
+@contextmanager
+def correlation_context(correlation_id: Optional[str]) -> Iterator[None]:
+    """
+    Tag log records emitted inside the block (and by tasks started in it)
+    with ``correlation_id``. Always scoped: handlers do not necessarily run
+    in a task of their own (e.g. under ``httpx.ASGITransport``), so a bare
+    ``set`` would leak the id into unrelated logs.
+    """
+    token = correlation_id_var.set(correlation_id)
+    try:
+        yield
+    finally:
+        correlation_id_var.reset(token)
+
+
+# -------------------------------------------------------------------
+# Caller-side filters
+# -------------------------------------------------------------------
+
+class CorrelationFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "correlation_id", None) is None:
+            record.correlation_id = correlation_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a deterministic fraction (every n-th record) of DEBUG/INFO records
+    per logger prefix; the longest matching prefix wins.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        # prefix -> keep every n-th record
+        self._every = {prefix: max(round(1 / rate), 1) if rate > 0 else 0 for prefix, rate in rates.items()}
+        self._prefixes = sorted(self._every, key=len, reverse=True)
+        self._counts: dict[str, int] = {}
+        self._resolved: dict[str, Optional[str]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self._prefixes:
+            return True
+
+        name = record.name
+        if name not in self._resolved:
+            self._resolved[name] = next(
+                (p for p in self._prefixes if name == p or name.startswith(p + ".")),
+                None,
+            )
+        prefix = self._resolved[name]
+        if prefix is None:
+            return True
+
+        every = self._every[prefix]
+        if every == 0:
+            return False
+        count = self._counts.get(prefix, 0)
+        self._counts[prefix] = count + 1
+        return count % every == 0
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback now (the objects may change
+        # before the writer thread gets to them), but keep the record
+        # unformatted: formatting is the writer thread's job.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Blocking: on shutdown the queue may be full; wait for it to drain.
+        self.queue.put(self._sentinel)
+
+
+# -------------------------------------------------------------------
+# Writer-side formatting
+# -------------------------------------------------------------------
+
+class JSONFormatter(logging.Formatter):
+    def __init__(self, redact_fields: list[str], max_field_chars: int):
+        super().__init__()
+        self.redact_fields = frozenset(field.lower() for field in redact_fields)
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": self._truncate(record.getMessage()),
+        }
+        correlation_id = getattr(record, "correlation_id", None)
+        if correlation_id:
+            entry["correlation_id"] = correlation_id
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = self._clean(key, value)
+
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+    def _clean(self, key: str, value: Any) -> Any:
+        if key.lower() in self.redact_fields:
+            return REDACTED
+        if isinstance(value, dict):
+            return {k: self._clean(str(k), v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._clean(key, v) for v in value]
+        if isinstance(value, (str, bytes)):
+            return self._truncate(value if isinstance(value, str) else value.decode("utf-8", "replace"))
+        return value
+
+    def _truncate(self, text: str) -> str:
+        if len(text) <= self.max_field_chars:
+            return text
+        return f"{text[: self.max_field_chars]}...(+{len(text) - self.max_field_chars} chars)"
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s")
+
+
+# -------------------------------------------------------------------
+# Pipeline
+# -------------------------------------------------------------------
+
+class LogPipeline:
+    def __init__(self, settings: Settings, stream: Any = None):
+        self.settings = settings
+        self.stream = stream or sys.stdout
+        self.handler: Optional[_DroppingQueueHandler] = None
+        self.listener: Optional[_Listener] = None
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped if self.handler is not None else 0
+
+    @property
+    def depth(self) -> int:
+        return self.handler.queue.qsize() if self.handler is not None else 0
+
+    def start(self) -> None:
+        if self.listener is not None:
+            return
+        s = self.settings
+
+        writer = logging.StreamHandler(self.stream)
+        if s.log_format.lower() == "text":
+            writer.setFormatter(TextFormatter())
+        else:
+            writer.setFormatter(JSONFormatter(s.log_redact_fields, s.log_max_field_chars))
+
+        self.handler = _DroppingQueueHandler(queue.Queue(maxsize=s.log_queue_size))
+        self.handler.addFilter(CorrelationFilter())
+        if s.log_sample_rates:
+            self.handler.addFilter(SamplingFilter(s.log_sample_rates))
+
+        self.listener = _Listener(self.handler.queue, writer, respect_handler_level=True)
+        self.listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(s.log_level.upper())
+
+    def stop(self) -> None:
+        """Detach from the root logger and flush what is queued."""
+        if self.listener is None:
+            return
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        self.listener = None
+
+
+_pipeline: LogPipeline | None = None
+
+
+def get_log_pipeline() -> LogPipeline:
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(get_settings())
+    return _pipeline
+
+
+def close_log_pipeline() -> None:
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline = None
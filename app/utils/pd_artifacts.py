@@ -1,7 +1,20 @@
 from pathlib import Path
-from datetime import datetime
-from typing import Any
+from datetime import date, datetime, timedelta
+from typing import Any, Iterator, Optional
+import asyncio
+import gzip
 import json
+import logging
+import os
+import shutil
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger("pd.artifacts")
+
+SEGMENT_NAME = "segment.jsonl"
+COMPRESSED_SEGMENT_NAME = "segment.jsonl.gz"
+INDEX_NAME = "segment.idx.json"
 
 
 def write_pd_artifact(
@@ -17,13 +30,7 @@ def write_pd_artifact(
 
     now = datetime.utcnow()
 
-    artifact_dir = (
-        base_dir
-        / f"env={environment}"
-        / f"{now.year}"
-        / f"{now.month:02d}"
-        / f"{now.day:02d}"
-    )
+    artifact_dir = partition_dir(base_dir, environment, now.date())
 
     artifact_dir.mkdir(parents=True, exist_ok=True)
 
@@ -34,3 +41,339 @@ def write_pd_artifact(
     )
 
     return artifact_path
+
+
+def partition_dir(base_dir: Path, environment: str, day: date) -> Path:
+    return (
+        base_dir
+        / f"env={environment}"
+        / f"{day.year}"
+        / f"{day.month:02d}"
+        / f"{day.day:02d}"
+    )
+
+
+def iter_environments(base_dir: Path) -> Iterator[str]:
+    if not base_dir.exists():
+        return
+    for env_dir in sorted(base_dir.glob("env=*")):
+        if env_dir.is_dir():
+            yield env_dir.name[len("env="):]
+
+
+def iter_partitions(
+    base_dir: Path,
+    environment: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Iterator[tuple[date, Path]]:
+    """
+    Yield (day, directory) for every day partition, oldest first.
+    Year/month directories outside [start, end] are skipped without
+    listing their contents.
+    """
+    env_dir = base_dir / f"env={environment}"
+    if not env_dir.exists():
+        return
+
+    for year_dir in sorted(env_dir.iterdir()):
+        if not year_dir.name.isdigit():
+            continue
+        year = int(year_dir.name)
+        if (start and year < start.year) or (end and year > end.year):
+            continue
+
+        for month_dir in sorted(year_dir.iterdir()):
+            if not month_dir.name.isdigit():
+                continue
+            month = int(month_dir.name)
+            if start and (year, month) < (start.year, start.month):
+                continue
+            if end and (year, month) > (end.year, end.month):
+                continue
+
+            for day_dir in sorted(month_dir.iterdir()):
+                if not day_dir.name.isdigit():
+                    continue
+                try:
+                    day = date(year, month, int(day_dir.name))
+                except ValueError:
+                    continue
+                if (start and day < start) or (end and day > end):
+                    continue
+                yield day, day_dir
+
+
+# -------------------------------------------------------------------
+# Reading (loose files + compacted segments)
+# -------------------------------------------------------------------
+
+def _load_index(day_dir: Path) -> dict[str, Any]:
+    path = day_dir / INDEX_NAME
+    if not path.exists():
+        return {"compressed": False, "records": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _segment_path(day_dir: Path, compressed: bool) -> Path:
+    return day_dir / (COMPRESSED_SEGMENT_NAME if compressed else SEGMENT_NAME)
+
+
+def _decode_record(raw: bytes, compressed: bool) -> dict[str, Any]:
+    if compressed:
+        raw = gzip.decompress(raw)
+    return json.loads(raw)
+
+
+def read_pd_artifact(
+    base_dir: Path,
+    environment: str,
+    correlation_id: str,
+    day: date,
+) -> Optional[dict[str, Any]]:
+    """
+    Load one artifact from its day partition, whether it is still a loose
+    file or has been compacted into the day's segment.
+    """
+    day_dir = partition_dir(base_dir, environment, day)
+
+    try:
+        return json.loads((day_dir / f"{correlation_id}.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        # Not written, or already compacted into the segment.
+        pass
+
+    index = _load_index(day_dir)
+    entry = index["records"].get(correlation_id)
+    if entry is None:
+        return None
+
+    offset, length = entry
+    with _segment_path(day_dir, index["compressed"]).open("rb") as segment:
+        segment.seek(offset)
+        return _decode_record(segment.read(length), index["compressed"])
+
+
+def iter_partition_artifacts(day_dir: Path) -> Iterator[tuple[str, dict[str, Any]]]:
+    """
+    Yield (correlation_id, artifact) for everything in one partition. A
+    loose file supersedes a compacted record with the same id (it was
+    rewritten after compaction).
+    """
+    loose = sorted(path for path in day_dir.glob("*.json") if path.name != INDEX_NAME)
+    rewritten = {path.stem for path in loose}
+
+    index = _load_index(day_dir)
+    if index["records"]:
+        compressed = index["compressed"]
+        with _segment_path(day_dir, compressed).open("rb") as segment:
+            for correlation_id, (offset, length) in index["records"].items():
+                if correlation_id in rewritten:
+                    continue
+                segment.seek(offset)
+                yield correlation_id, _decode_record(segment.read(length), compressed)
+
+    for path in loose:
+        try:
+            yield path.stem, json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+
+
+def partition_version(day_dir: Path) -> tuple[int, int, int, int]:
+    """
+    Changes whenever an artifact in ``day_dir`` is added, removed, compacted
+    or rewritten in place: (directory mtime, file count, total size, newest
+    file mtime). Raises ``FileNotFoundError`` if the partition is gone.
+    """
+    count = size = newest = 0
+    with os.scandir(day_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            count += 1
+            size += stat.st_size
+            newest = max(newest, stat.st_mtime_ns)
+    return day_dir.stat().st_mtime_ns, count, size, newest
+
+
+# -------------------------------------------------------------------
+# Maintenance: compaction + retention
+# -------------------------------------------------------------------
+
+def compact_partition(day_dir: Path, compress: bool = False) -> int:
+    """
+    Append every loose artifact in ``day_dir`` to the day's segment and
+    record its (offset, length) in the index, then delete the loose files.
+
+    Compressed segments are a sequence of independent gzip members (still
+    a valid .gz file) so single records can be read by offset. The index
+    is replaced atomically after the segment is synced, so a crash leaves
+    at worst unindexed bytes at the segment tail and loose files that are
+    picked up again next run. Returns the number of artifacts compacted.
+    """
+    loose = sorted(p for p in day_dir.glob("*.json") if p.name != INDEX_NAME)
+    if not loose:
+        return 0
+
+    index = _load_index(day_dir)
+    if index["records"]:
+        # Existing segments keep their original encoding.
+        compress = index["compressed"]
+    index["compressed"] = compress
+
+    segment_path = _segment_path(day_dir, compress)
+    compacted: list[Path] = []
+
+    with segment_path.open("ab") as segment:
+        offset = segment.seek(0, os.SEEK_END)
+        for path in loose:
+            try:
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable artifact %s", path)
+                continue
+
+            raw = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+            if compress:
+                raw = gzip.compress(raw, mtime=0)
+
+            segment.write(raw)
+            index["records"][path.stem] = [offset, len(raw)]
+            offset += len(raw)
+            compacted.append(path)
+
+        segment.flush()
+        os.fsync(segment.fileno())
+
+    index_tmp = day_dir / f".{INDEX_NAME}.tmp"
+    index_tmp.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+    os.replace(index_tmp, day_dir / INDEX_NAME)
+
+    for path in compacted:
+        path.unlink(missing_ok=True)
+
+    return len(compacted)
+
+
+def prune_environment(base_dir: Path, environment: str, retention_days: int, today: date) -> int:
+    """
+    Delete day partitions older than ``retention_days`` and any
+    month/year directories left empty. Returns partitions removed.
+    """
+    cutoff = today - timedelta(days=retention_days)
+    removed = 0
+
+    for day, day_dir in list(iter_partitions(base_dir, environment, end=cutoff - timedelta(days=1))):
+        shutil.rmtree(day_dir, ignore_errors=True)
+        removed += 1
+
+    env_dir = base_dir / f"env={environment}"
+    for month_dir in sorted(env_dir.glob("*/*"), reverse=True):
+        if month_dir.is_dir() and not any(month_dir.iterdir()):
+            month_dir.rmdir()
+    for year_dir in sorted(env_dir.glob("*"), reverse=True):
+        if year_dir.is_dir() and not any(year_dir.iterdir()):
+            year_dir.rmdir()
+
+    return removed
+
+
+def run_artifact_maintenance(
+    base_dir: Path,
+    retention_days: dict[str, int],
+    default_retention_days: int,
+    compact_after_days: int,
+    compress: bool,
+    today: Optional[date] = None,
+) -> dict[str, int]:
+    """
+    One maintenance pass over every environment: prune expired partitions
+    (retention 0 = keep forever), then compact closed ones.
+    """
+    today = today or datetime.utcnow().date()
+    totals = {"pruned_partitions": 0, "compacted_artifacts": 0}
+
+    for environment in list(iter_environments(base_dir)):
+        retention = retention_days.get(environment, default_retention_days)
+        if retention > 0:
+            totals["pruned_partitions"] += prune_environment(base_dir, environment, retention, today)
+
+        closed_before = today - timedelta(days=compact_after_days)
+        for _, day_dir in iter_partitions(base_dir, environment, end=closed_before):
+            totals["compacted_artifacts"] += compact_partition(day_dir, compress=compress)
+
+    return totals
+
+
+class ArtifactMaintenance:
+    """
+    Background task running ``run_artifact_maintenance`` periodically in a
+    worker thread. Settings are re-read every pass so reloads apply.
+    """
+
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if get_settings().pd_artifact_maintenance_interval_seconds <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> dict[str, int]:
+        s = get_settings()
+        return await asyncio.to_thread(
+            run_artifact_maintenance,
+            Path(s.pd_artifact_dir),
+            s.pd_artifact_retention_days,
+            s.pd_artifact_default_retention_days,
+            s.pd_artifact_compact_after_days,
+            s.pd_artifact_compress_segments,
+        )
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                totals = await self.run_once()
+                logger.info("PD artifact maintenance: %s", totals)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("PD artifact maintenance failed")
+
+            interval = get_settings().pd_artifact_maintenance_interval_seconds
+            if interval <= 0:
+                return
+            await asyncio.sleep(interval)
+
+
+# -------------------------------------------------------------------
+# Global maintenance task
+# -------------------------------------------------------------------
+
+_maintenance: Optional[ArtifactMaintenance] = None
+
+
+def get_artifact_maintenance() -> ArtifactMaintenance:
+    global _maintenance
+    if _maintenance is None:
+        _maintenance = ArtifactMaintenance()
+    return _maintenance
+
+
+async def close_artifact_maintenance() -> None:
+    global _maintenance
+    if _maintenance is not None:
+        await _maintenance.stop()
+        _maintenance = None
@@ -0,0 +1,380 @@
+"""
+Benchmark harness for the Interop Control API.
+
+    python -m benchmarks.run [--mode asgi|uvicorn] [--requests N] [--concurrency C]
+                             [--scenario NAME ...] [--output results.json]
+                             [--compare baseline.json --threshold 10]
+
+Drives ``app.main:app`` in-process through ``httpx.ASGITransport`` (default)
+or over a local uvicorn server, with OpenEMR and Mirth replaced by stub
+transports (``benchmarks/stubs.py``) that inject latency and failures.
+Storage goes to a throw-away directory. Results (throughput, latency
+percentiles, status counts per scenario) are written as JSON; ``--compare``
+checks them against an earlier run and exits 1 on a regression.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import httpx
+
+PERCENTILES = (50, 90, 99)
+DEFAULT_SCENARIOS = (
+    "token_issue",
+    "token_cached",
+    "trigger",
+    "callback_small",
+    "callback_large",
+    "patient_search",
+)
+# Metrics compared against a baseline: (key, higher is better, minimum
+# requests in both runs). Below 100 samples p99 is just the maximum.
+COMPARED = (("throughput_rps", True, 1), ("p50_ms", False, 1), ("p99_ms", False, 100))
+# Scaled-down scenarios still run at least this many requests.
+MIN_SCALED_REQUESTS = 100
+
+
+# -------------------------------------------------------------------
+# Scenarios
+# -------------------------------------------------------------------
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    # (request index, setup context) -> httpx request kwargs
+    build: Callable[[int, Any], dict[str, Any]]
+    # Untimed preparation; receives the number of requests to prepare for.
+    setup: Optional[Callable[[httpx.AsyncClient, int], Awaitable[Any]]] = None
+    # Fraction of --requests to run (multi-MB payloads run fewer), but at
+    # least MIN_SCALED_REQUESTS.
+    scale: float = 1.0
+
+
+async def _create_executions(client: httpx.AsyncClient, count: int) -> list[str]:
+    ids = []
+    for index in range(count):
+        response = await client.post("/api/pd/trigger/", json={"patient_reference": f"bench-setup-{index}"})
+        response.raise_for_status()
+        ids.append(response.json()["correlation_id"])
+    return ids
+
+
+def build_scenarios(args: argparse.Namespace) -> dict[str, Scenario]:
+    from benchmarks.stubs import patient_search_body, pd_response_xml
+
+    run_id = datetime.now(timezone.utc).strftime("%H%M%S%f")
+    small_body = pd_response_xml("bench", args.small_payload_kb * 1024)
+    large_body = pd_response_xml("bench", int(args.large_payload_mb * 1024 * 1024))
+    xml_headers = {"content-type": "application/xml"}
+
+    async def issue_once(client: httpx.AsyncClient, count: int) -> None:
+        (await client.post("/api/auth/token")).raise_for_status()
+
+    def callback(body: bytes) -> Callable[[int, Any], dict[str, Any]]:
+        def build(index: int, ids: list[str]) -> dict[str, Any]:
+            return {"content": body, "headers": {**xml_headers, "X-Correlation-ID": ids[index]}}
+        return build
+
+    scenarios = [
+        Scenario("token_issue", "POST", "/api/auth/token", lambda i, _: {}),
+        Scenario("token_cached", "GET", "/api/auth/token", lambda i, _: {}, setup=issue_once),
+        Scenario(
+            "trigger", "POST", "/api/pd/trigger/",
+            lambda i, _: {"json": {"patient_reference": f"bench-{run_id}-{i}"}},
+        ),
+        Scenario("callback_small", "POST", "/api/pd/callback", callback(small_body), setup=_create_executions),
+        Scenario(
+            "callback_large", "POST", "/api/pd/callback", callback(large_body),
+            setup=_create_executions, scale=args.large_payload_scale,
+        ),
+        Scenario(
+            "patient_search", "POST", "/api/patient/search",
+            lambda i, _: {"content": patient_search_body(i), "headers": {"content-type": "application/json"}},
+        ),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+# -------------------------------------------------------------------
+# Runner
+# -------------------------------------------------------------------
+
+def percentile(ordered: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return round(ordered[rank], 3)
+
+
+def summarize(latencies_ms: list[float], statuses: Counter, errors: Counter, wall_seconds: float) -> dict[str, Any]:
+    ordered = sorted(latencies_ms)
+    completed = len(ordered)
+    summary: dict[str, Any] = {
+        "requests": completed + sum(errors.values()),
+        "ok": sum(count for status, count in statuses.items() if 200 <= int(status) < 300),
+        "statuses": dict(sorted(statuses.items())),
+        "errors": dict(errors),
+        "wall_seconds": round(wall_seconds, 4),
+        "throughput_rps": round(completed / wall_seconds, 2) if wall_seconds else None,
+        "mean_ms": round(sum(ordered) / completed, 3) if completed else None,
+        "min_ms": round(ordered[0], 3) if ordered else None,
+        "max_ms": round(ordered[-1], 3) if ordered else None,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = percentile(ordered, pct)
+    return summary
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict[str, Any]:
+    if scenario.scale < 1:
+        requests = max(int(requests * scenario.scale), min(MIN_SCALED_REQUESTS, requests), 1)
+    context = await scenario.setup(client, warmup + requests) if scenario.setup else None
+    indexes = itertools.count()
+
+    async def send() -> int:
+        response = await client.request(scenario.method, scenario.path, **scenario.build(next(indexes), context))
+        return response.status_code
+
+    for _ in range(warmup):
+        await send()
+
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    errors: Counter = Counter()
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = await send()
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[str(status)] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    result = summarize(latencies, statuses, errors, time.perf_counter() - started)
+    result["concurrency"] = min(concurrency, requests)
+    return result
+
+
+@contextlib.asynccontextmanager
+async def app_client(app: Any, mode: str, timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    if mode == "asgi":
+        # ASGITransport does not run the lifespan; run it around the client.
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+                yield client
+        return
+
+    import uvicorn
+
+    # Same event loop as the load generator: numbers include client cost.
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        await serving
+
+
+# -------------------------------------------------------------------
+# Environment + reporting
+# -------------------------------------------------------------------
+
+def configure_environment(workdir: Path, args: argparse.Namespace) -> None:
+    """Must run before anything imports the app settings."""
+    os.environ.update({
+        "ENVIRONMENT": "bench",
+        "AUTH_MODE": "system",
+        "OAUTH_TOKEN_URL": "http://openemr.stub/oauth2/default/token",
+        "OAUTH_CLIENT_ID": "bench-client",
+        "OAUTH_CLIENT_SECRET": "bench-secret",
+        "OAUTH_USERNAME": "bench",
+        "OAUTH_PASSWORD": "bench",
+        "PD_ENDPOINT_URL": "http://mirth.stub/pd/trigger/",
+        "PD_STORAGE_BACKEND": args.storage_backend,
+        "PD_STORAGE_DIR": str(workdir / "pd"),
+        "PD_ARTIFACT_DIR": str(workdir / "pd_artifacts"),
+        "PD_TRIGGER_MODE": args.trigger_mode,
+        "PROFILE_DIR": str(workdir / "profiles"),
+        "TOKEN_STORE_PATH": str(workdir / "tokens.sqlite3"),
+    })
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold_pct: float) -> list[str]:
+    """
+    Lines describing every metric that regressed by more than threshold_pct.
+    Metrics with too few requests in either run to be stable are skipped.
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        samples = min(previous.get("requests") or 0, current.get("requests") or 0)
+        for key, higher_is_better, min_samples in COMPARED:
+            old, new = previous.get(key), current.get(key)
+            if not old or new is None or samples < min_samples:
+                continue
+            change = (new - old) / old * 100
+            if (-change if higher_is_better else change) > threshold_pct:
+                regressions.append(f"{name}.{key}: {old} -> {new} ({change:+.1f}%)")
+    return regressions
+
+
+def print_table(results: dict[str, Any], stream: Any) -> None:
+    header = f"{'scenario':<16}{'req':>7}{'ok':>7}{'rps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header, file=stream)
+    for name, r in results["scenarios"].items():
+        print(
+            f"{name:<16}{r['requests']:>7}{r['ok']:>7}{r['throughput_rps'] or 0:>10.1f}"
+            f"{r['p50_ms'] or 0:>10.2f}{r['p90_ms'] or 0:>10.2f}{r['p99_ms'] or 0:>10.2f}{r['max_ms'] or 0:>10.2f}",
+            file=stream,
+        )
+
+
+# -------------------------------------------------------------------
+# Entry point
+# -------------------------------------------------------------------
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--scenario", action="append", choices=DEFAULT_SCENARIOS, dest="scenarios")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--storage-backend", choices=("sqlite", "json"), default="sqlite")
+    parser.add_argument("--trigger-mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--small-payload-kb", type=int, default=4)
+    parser.add_argument("--large-payload-mb", type=float, default=5.0)
+    parser.add_argument("--large-payload-scale", type=float, default=0.05,
+                        help="fraction of --requests used for callback_large (at least %d requests)" % MIN_SCALED_REQUESTS)
+    for upstream in ("openemr", "mirth"):
+        parser.add_argument(f"--{upstream}-latency-ms", type=float, default=0.0)
+        parser.add_argument(f"--{upstream}-jitter-ms", type=float, default=0.0)
+        parser.add_argument(f"--{upstream}-failure-rate", type=float, default=0.0)
+        parser.add_argument(f"--{upstream}-failure", default="503",
+                            help='HTTP status to return on injected failures, or "error" for a connection error')
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    parser.add_argument("--compare", type=Path, help="baseline results JSON")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    from app.config.settings import get_settings
+    from app.main import app
+    from benchmarks.stubs import Injection, build_stubs, install_stubs
+
+    stubs = build_stubs(
+        openemr=Injection(args.openemr_latency_ms, args.openemr_jitter_ms, args.openemr_failure_rate, args.openemr_failure),
+        mirth=Injection(args.mirth_latency_ms, args.mirth_jitter_ms, args.mirth_failure_rate, args.mirth_failure),
+    )
+    install_stubs(get_settings(), stubs)
+    scenarios = build_scenarios(args)
+
+    results: dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        },
+        "scenarios": {},
+        "upstreams": {},
+    }
+
+    async with app_client(app, args.mode, args.timeout) as client:
+        for name in args.scenarios or DEFAULT_SCENARIOS:
+            print(f"running {name} ...", file=sys.stderr)
+            results["scenarios"][name] = await run_scenario(
+                client, scenarios[name], args.requests, args.concurrency, args.warmup
+            )
+
+    for upstream, stub in stubs.items():
+        results["upstreams"][upstream] = {
+            "calls": stub.stats.calls,
+            "failures": stub.stats.failures,
+            "statuses": {str(status): count for status, count in sorted(stub.stats.status.items())},
+        }
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="interop-bench-") as workdir:
+        configure_environment(Path(workdir), args)
+        # The app's log pipeline writes to sys.stdout; keep stdout for the
+        # JSON results.
+        with contextlib.redirect_stdout(sys.stderr):
+            results = asyncio.run(run(args))
+
+    print_table(results, sys.stderr)
+    output = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Stub OpenEMR and Mirth upstreams for benchmarks.
+
+``StubTransport`` is an ``httpx`` transport plugged into
+``HTTPClientRegistry(transports=...)``, so the app's pooled clients talk to
+it in-process with no sockets. Latency (fixed + uniform jitter) and
+failures (an HTTP status or a connection error, at a given rate) are
+injected per call.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import httpx
+
+from app.config.settings import Settings
+from app.utils.http_clients import MIRTH, OPENEMR, HTTPClientRegistry
+
+
+@dataclass
+class Injection:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+    # An HTTP status to return, or "error" to raise a connection error.
+    failure: str = "503"
+
+    def delay(self) -> float:
+        return max(self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms), 0.0) / 1000
+
+    def fails(self) -> bool:
+        return self.failure_rate > 0 and random.random() < self.failure_rate
+
+
+@dataclass
+class StubStats:
+    calls: int = 0
+    failures: int = 0
+    status: dict[int, int] = field(default_factory=dict)
+
+
+class StubTransport(httpx.AsyncBaseTransport):
+    def __init__(self, handler: Callable[[httpx.Request], httpx.Response], injection: Injection):
+        self.handler = handler
+        self.injection = injection
+        self.stats = StubStats()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.calls += 1
+        await request.aread()
+
+        delay = self.injection.delay()
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.injection.fails():
+            self.stats.failures += 1
+            if self.injection.failure == "error":
+                raise httpx.ConnectError("stub upstream unavailable", request=request)
+            response = httpx.Response(int(self.injection.failure), text="stub failure")
+        else:
+            response = self.handler(request)
+
+        self.stats.status[response.status_code] = self.stats.status.get(response.status_code, 0) + 1
+        return response
+
+
+def openemr_token(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={
+            "access_token": f"stub-{time.monotonic_ns()}",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "scope": "openid",
+        },
+    )
+
+
+def mirth_accept(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, text="OK")
+
+
+def build_stubs(openemr: Injection, mirth: Injection) -> dict[str, StubTransport]:
+    return {
+        OPENEMR: StubTransport(openemr_token, openemr),
+        MIRTH: StubTransport(mirth_accept, mirth),
+    }
+
+
+def install_stubs(settings: Settings, stubs: dict[str, StubTransport]) -> None:
+    """Route the app's pooled upstream clients through the stubs."""
+    from app.utils import http_clients
+
+    http_clients._registry = HTTPClientRegistry(settings, transports=stubs)
+
+
+# -------------------------------------------------------------------
+# Payloads
+# -------------------------------------------------------------------
+
+_PD_RESPONSE_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<PRPA_IN201306UV02 xmlns="urn:hl7-org:v3" ITSVersion="XML_1.0">
+  <id root="2.16.840.1.113883.3.72.5.9.1" extension="{correlation_id}"/>
+  <interactionId root="2.16.840.1.113883.1.6" extension="PRPA_IN201306UV02"/>
+  <receiver typeCode="RCV"><device classCode="DEV" determinerCode="INSTANCE"><id root="2.16.840.1.113883.3.72.6.5.100"/></device></receiver>
+  <sender typeCode="SND"><device classCode="DEV" determinerCode="INSTANCE"><id root="2.16.840.1.113883.3.72.6.2"/></device></sender>
+  <acknowledgement><typeCode code="AA"/></acknowledgement>
+  <controlActProcess classCode="CACT" moodCode="EVN">
+"""
+
+_PD_RESPONSE_SUBJECT = """    <subject typeCode="SUBJ"><registrationEvent classCode="REG" moodCode="EVN"><subject1 typeCode="SBJ"><patient classCode="PAT"><id root="2.16.840.1.113883.3.72.5.9.1" extension="{index}"/><patientPerson><name><given>Stub</given><family>Patient{index}</family></name><administrativeGenderCode code="F"/><birthTime value="19800412"/><addr><streetAddressLine>{index} Benchmark Way</streetAddressLine><city>Testville</city><state>MA</state><postalCode>02101</postalCode></addr></patientPerson></patient></subject1></registrationEvent></subject>
+"""
+
+_PD_RESPONSE_TAIL = """    <queryAck><queryId root="2.16.840.1.113883.3.72.5.9.1" extension="{correlation_id}"/><queryResponseCode code="OK"/><resultTotalQuantity value="{count}"/></queryAck>
+  </controlActProcess>
+</PRPA_IN201306UV02>
+"""
+
+
+def pd_response_xml(correlation_id: str, target_bytes: int) -> bytes:
+    """
+    A PRPA_IN201306UV02 response padded with matches to ~``target_bytes``.
+    The queryAck comes last, as in real responses, so the parser has to
+    get past every subject.
+    """
+    subjects = []
+    size = len(_PD_RESPONSE_HEAD) + len(_PD_RESPONSE_TAIL)
+    while size < target_bytes:
+        subject = _PD_RESPONSE_SUBJECT.format(index=len(subjects))
+        subjects.append(subject)
+        size += len(subject)
+    return (
+        _PD_RESPONSE_HEAD.format(correlation_id=correlation_id)
+        + "".join(subjects)
+        + _PD_RESPONSE_TAIL.format(correlation_id=correlation_id, count=len(subjects))
+    ).encode("utf-8")
+
+
+def patient_search_body(index: int) -> str:
+    return json.dumps({
+        "first_name": f"Bench{index}",
+        "last_name": "Patient",
+        "dob": "1980-04-12",
+        "gender": "F" if index % 2 else "M",
+    })
+
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import httpx
+
+from app.config.settings import Settings
+from app.pd.dispatch import CLOSED, HALF_OPEN, OPEN, MirthDispatcher
+
+ENDPOINT = "http://mirth/pd/trigger/"
+
+
+class FakeMirth:
+    def __init__(self) -> None:
+        self.status = 200
+        self.calls = 0
+
+    async def __call__(self, endpoint_url: str, payload: dict) -> tuple[int, str]:
+        self.calls += 1
+        response = httpx.Response(self.status, request=httpx.Request("POST", endpoint_url))
+        response.raise_for_status()
+        return response.status_code, response.text
+
+
+def _dispatcher(mirth: FakeMirth, **overrides) -> MirthDispatcher:
+    settings = Settings(
+        mirth_max_attempts=1,
+        mirth_breaker_failure_threshold=2,
+        mirth_breaker_reset_seconds=0.05,
+        **overrides,
+    )
+    return MirthDispatcher(settings, send=mirth)
+
+
+def test_breaker_opens_on_5xx_and_closes_after_probe():
+    mirth = FakeMirth()
+
+    async def scenario():
+        dispatcher = _dispatcher(mirth)
+        breaker = dispatcher.breaker
+
+        mirth.status = 500
+        first = await dispatcher.dispatch(ENDPOINT, {})
+        assert (first.forwarded, first.downstream_status, breaker.state) == (False, 500, CLOSED)
+        await dispatcher.dispatch(ENDPOINT, {})
+        assert breaker.state == OPEN
+
+        # Open: fail fast without calling Mirth.
+        failed_fast = await dispatcher.dispatch(ENDPOINT, {})
+        assert (failed_fast.forwarded, failed_fast.attempts, mirth.calls) == (False, 0, 2)
+
+        # Half-open: a failing probe re-opens the circuit.
+        time.sleep(0.06)
+        assert breaker.state == HALF_OPEN
+        await dispatcher.dispatch(ENDPOINT, {})
+        assert breaker.state == OPEN
+
+        # A successful probe closes it.
+        time.sleep(0.06)
+        mirth.status = 200
+        probe = await dispatcher.dispatch(ENDPOINT, {})
+        assert probe.forwarded and breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_breaker_stays_closed_on_4xx():
+    mirth = FakeMirth()
+    mirth.status = 400
+
+    async def scenario():
+        dispatcher = _dispatcher(mirth)
+        for _ in range(5):
+            result = await dispatcher.dispatch(ENDPOINT, {})
+            assert (result.forwarded, result.downstream_status) == (False, 400)
+        assert dispatcher.breaker.state == CLOSED
+        assert mirth.calls == 5
+
+    asyncio.run(scenario())
+
+
+def test_zero_acquire_timeout_uses_free_slot_and_fails_fast_when_saturated():
+    mirth = FakeMirth()
+    release = asyncio.Event()
+
+    async def scenario():
+        dispatcher = _dispatcher(mirth, mirth_acquire_timeout_seconds=0, mirth_max_in_flight=1)
+        assert (await dispatcher.dispatch(ENDPOINT, {})).forwarded
+
+        async def slow(endpoint_url: str, payload: dict) -> tuple[int, str]:
+            await release.wait()
+            return await mirth(endpoint_url, payload)
+
+        dispatcher._send = slow
+        holder = asyncio.create_task(dispatcher.dispatch(ENDPOINT, {}))
+        await asyncio.sleep(0)
+        saturated = await dispatcher.dispatch(ENDPOINT, {})
+        release.set()
+        assert (await holder).forwarded
+        assert not saturated.forwarded and saturated.error == "Mirth dispatch saturated"
+
+    asyncio.run(scenario())
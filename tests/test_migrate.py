@@ -0,0 +1,30 @@
+import hashlib
+
+from app.storage.blobs import BlobStore
+from app.storage.json_files import JSONFileStore
+from app.storage.migrate import migrate
+from app.storage.sqlite import SQLiteExecutionStore
+
+PAYLOAD = b"<PRPA_IN201306UV02/>" * 100
+
+
+def test_migrate_keeps_blob_backed_response(tmp_path):
+    source = tmp_path / "json"
+    blobs = BlobStore(tmp_path / "blobs")
+    legacy = JSONFileStore(source, blobs=blobs)
+    legacy.create_execution(correlation_id="c1", patient_reference="p1", status="COMPLETED", triggered_at="")
+    legacy.save_pd_response("c1", PAYLOAD.decode(), payload_type="xml", message_type="PRPA_IN201306UV02")
+
+    counts = migrate(source, tmp_path / "pd.sqlite3", delete=True, blobs=blobs)
+    assert (counts["executions"], counts["responses"], counts["failed"]) == (1, 1, 0)
+    assert not list(source.glob("*.json"))
+
+    store = SQLiteExecutionStore(tmp_path / "pd.sqlite3", blobs=blobs)
+    try:
+        response = store.get_pd_response("c1")
+    finally:
+        store.close()
+    assert response["size"] == len(PAYLOAD)
+    assert response["sha256"] == hashlib.sha256(PAYLOAD).hexdigest()
+    with blobs.open(response["blob"]) as stream:
+        assert stream.read() == PAYLOAD
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.auth.oauth_manager import OAuthManager
+from app.config.settings import Settings
+from app.utils import http_clients
+
+
+@pytest.fixture
+def lifetime():
+    return {"expires_in": 3600}
+
+
+@pytest.fixture
+def openemr(monkeypatch, lifetime):
+    issued = []
+
+    def token(request: httpx.Request) -> httpx.Response:
+        issued.append(f"token-{len(issued) + 1}")
+        return httpx.Response(200, json={"access_token": issued[-1], **lifetime})
+
+    registry = http_clients.HTTPClientRegistry(Settings(), transports={"openemr": httpx.MockTransport(token)})
+    monkeypatch.setattr(http_clients, "_registry", registry)
+    return issued
+
+
+def _settings(tmp_path, **overrides) -> Settings:
+    return Settings(
+        oauth_token_url="http://openemr/oauth2/default/token",
+        oauth_client_id="client",
+        oauth_client_secret="secret",
+        oauth_username="user",
+        oauth_password="pass",
+        token_store_path=str(tmp_path / "tokens.sqlite3"),
+        **overrides,
+    )
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_get_token_reissues_expired_token(openemr, backend, tmp_path):
+    settings = _settings(tmp_path, token_store_backend=backend)
+
+    async def scenario():
+        manager = OAuthManager(settings)
+        try:
+            first = await manager.issue_token_from_env()
+            key = manager._system_key
+
+            # Expire the cached token in place.
+            expired = manager._cache.get(key).model_copy(
+                update={"expires_at": datetime.now(tz=timezone.utc) - timedelta(seconds=1)}
+            )
+            manager._cache.put(key, expired)
+
+            second = await manager.get_token()
+            return first, second
+        finally:
+            await manager.aclose()
+            manager._cache.close()
+
+    first, second = asyncio.run(scenario())
+
+    assert first.access_token == "token-1"
+    assert second.access_token == "token-2"
+    assert openemr == ["token-1", "token-2"]
+
+
+def test_background_refresh_rearms_after_each_refresh(openemr, lifetime, tmp_path):
+    # Lifetime just past the refresh window: renewed about a second after issue.
+    lifetime["expires_in"] = 31
+    settings = _settings(tmp_path, expires_soon_seconds=30)
+
+    async def scenario():
+        manager = OAuthManager(settings)
+        try:
+            await manager.issue_token_from_env()
+            key = manager._system_key
+            for issued in (2, 3):
+                while len(openemr) < issued:
+                    await asyncio.sleep(0.05)
+                # Let the refresh task finish and arm the next one.
+                await asyncio.sleep(0.05)
+                task = manager._refresh_tasks.get(key)
+                assert task is not None and not task.done()
+            return (await manager.get_token()).access_token
+        finally:
+            await manager.aclose()
+
+    assert asyncio.run(asyncio.wait_for(scenario(), timeout=10)) == "token-3"